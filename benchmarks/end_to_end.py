@@ -0,0 +1,401 @@
+"""
+End-to-End Benchmark - emulated Pico -> bridge -> many HTTP and stream clients
+Starts pico_emulator.py on a pseudo-terminal, hardware_bridge.py (or
+bridge_core.py) reading it like a real Pico, then N dashboard pollers
+(/live long-polls) and M /stream clients. Reports samples/sec ingested,
+requests/sec served, p50/p95/p99 sample-to-client latency, and the bridge
+process's CPU% and RSS, and writes them as JSON so runs can be compared
+between commits. Linux only (pty emulator, /proc for CPU and RSS).
+
+Usage:
+    python benchmarks/end_to_end.py --rate 1000 --pollers 20 --streams 5 --output before.json
+    python benchmarks/end_to_end.py --rate 1000 --pollers 20 --streams 5 --output after.json
+    python benchmarks/end_to_end.py --compare before.json after.json
+
+Latency is measured from the moment the emulator stamps a sample (host
+clock, --wall-clock) to the moment a client has parsed it, so it includes
+the serial link, parsing, publishing and the HTTP hop.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from poll_latency import percentile
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from bridge_metrics import TICKS_PERIOD  # noqa: E402
+
+RESULTS_VERSION = 1
+STARTUP_TIMEOUT = 20.0  # [sec] for the bridge to connect and publish its first sample
+
+# (section, key, label, True if higher is better) shown by --compare
+COMPARED = (
+    ('ingest', 'samples_per_sec', 'samples/s ingested', True),
+    ('http', 'requests_per_sec', 'requests/s served', True),
+    ('poll_latency_ms', 'p50', 'poll latency p50 (ms)', False),
+    ('poll_latency_ms', 'p99', 'poll latency p99 (ms)', False),
+    ('stream_latency_ms', 'p50', 'stream latency p50 (ms)', False),
+    ('stream_latency_ms', 'p99', 'stream latency p99 (ms)', False),
+    ('stream', 'samples_per_sec', 'stream samples/s per client', True),
+    ('bridge', 'cpu_percent', 'bridge CPU %', False),
+    ('bridge', 'peak_rss_mb', 'bridge peak RSS (MB)', False),
+)
+
+
+def sample_latency_ms(timestamp):
+    """Milliseconds since the emulator stamped a sample (wrapped host microseconds)"""
+    now = int(time.time() * 1e6) % TICKS_PERIOD
+    return ((now - timestamp) % TICKS_PERIOD) / 1000.0
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class ProcessMonitor:
+    """CPU time and resident memory of one process, from /proc"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.ticks_per_sec = os.sysconf('SC_CLK_TCK')
+        self.peak_rss = 0
+
+    def cpu_seconds(self):
+        with open(f'/proc/{self.pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self.ticks_per_sec  # utime + stime
+
+    def rss_bytes(self):
+        with open(f'/proc/{self.pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss = int(line.split()[1]) * 1024
+                    self.peak_rss = max(self.peak_rss, rss)
+                    return rss
+        return 0
+
+
+class LivePoller(threading.Thread):
+    """The dashboard's polling loop: /live long-polls for the next sample"""
+
+    def __init__(self, port, deadline, wait_ms):
+        super().__init__(daemon=True)
+        self.port = port
+        self.deadline = deadline
+        self.wait_ms = wait_ms
+        self.requests = 0
+        self.errors = 0
+        self.latencies = []
+        self.measuring = False
+
+    def run(self):
+        conn = None
+        after, status = -1, 0
+        while time.time() < self.deadline:
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+                conn.request('GET', f'/live?after={after}&status={status}&wait={self.wait_ms}')
+                response = conn.getresponse()
+                body = response.read()
+                self.requests += self.measuring
+                if response.status != 200:
+                    continue
+                live = json.loads(body)
+                after, status = live['seq'], live['status_version']
+                timestamp = (live.get('data') or {}).get('timestamp')
+                if self.measuring and timestamp is not None:
+                    self.latencies.append(sample_latency_ms(timestamp))
+            except (OSError, http.client.HTTPException, ValueError):
+                self.errors += self.measuring
+                if conn:
+                    conn.close()
+                conn = None
+                time.sleep(0.1)
+        if conn:
+            conn.close()
+
+
+class StreamClient(threading.Thread):
+    """A /stream (Server-Sent Events) subscriber timing every sample it receives"""
+
+    PREFIX = b'data: {"timestamp": '
+
+    def __init__(self, port, deadline):
+        super().__init__(daemon=True)
+        self.port = port
+        self.deadline = deadline
+        self.samples = 0
+        self.errors = 0
+        self.latencies = []
+        self.measuring = False
+
+    def run(self):
+        try:
+            sock = socket.create_connection(('127.0.0.1', self.port), timeout=5)
+            sock.sendall(b'GET /stream HTTP/1.1\r\nHost: bench\r\n\r\n')
+            stream = sock.makefile('rb')
+            while time.time() < self.deadline:
+                line = stream.readline()
+                if not line:
+                    break
+                # Sample bodies always start with the timestamp (Sample.to_json)
+                if self.measuring and line.startswith(self.PREFIX):
+                    value = line[len(self.PREFIX):line.index(b',')]
+                    self.samples += 1
+                    if value != b'null':
+                        self.latencies.append(sample_latency_ms(int(value)))
+            sock.close()
+        except OSError:
+            self.errors += 1
+
+
+def scrape_samples(port):
+    """bridge_samples_total summed over every device, from /metrics"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    try:
+        conn.request('GET', '/metrics')
+        text = conn.getresponse().read().decode()
+    finally:
+        conn.close()
+    return sum(float(line.rsplit(' ', 1)[1]) for line in text.splitlines()
+               if line.startswith('bridge_samples_total'))
+
+
+def wait_for_samples(port, bridge):
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if bridge.poll() is not None:
+            raise RuntimeError("bridge exited during startup")
+        try:
+            if scrape_samples(port) > 0:
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("bridge published no samples")
+
+
+def latency_summary(latencies):
+    values = sorted(latencies)
+    if not values:
+        return None
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 0.50), 3),
+        "p95": round(percentile(values, 0.95), 3),
+        "p99": round(percentile(values, 0.99), 3),
+        "max": round(values[-1], 3),
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def stop(process):
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def run_benchmark(args):
+    workdir = tempfile.mkdtemp(prefix='bridge-bench-')
+    link = os.path.join(workdir, 'pico')
+    port = args.http_port or free_port()
+    log = open(os.path.join(workdir, 'processes.log'), 'wb')
+
+    emulator_command = [sys.executable, os.path.join(REPO, 'pico_emulator.py'), '--rate', str(args.rate),
+                        '--link', link, '--wall-clock']
+    if args.json:
+        emulator_command.append('--json-only')
+    if args.bridge == 'core':
+        bridge_command = [sys.executable, os.path.join(REPO, 'bridge_core.py'),
+                          '--source', f'serial:{link}', '--port', str(port)]
+    else:
+        bridge_command = [sys.executable, os.path.join(REPO, 'hardware_bridge.py'),
+                          '--device', link, '--http-port', str(port)]
+
+    emulator = subprocess.Popen(emulator_command, stdout=log, stderr=subprocess.STDOUT)
+    bridge = None
+    try:
+        while not os.path.exists(link):
+            if emulator.poll() is not None:
+                raise RuntimeError("emulator exited during startup")
+            time.sleep(0.05)
+        bridge = subprocess.Popen(bridge_command, cwd=REPO, stdout=log, stderr=subprocess.STDOUT)
+        wait_for_samples(port, bridge)
+        print(f"📊 {args.bridge} bridge, {args.rate:.0f} Hz {'JSON' if args.json else 'binary'} emulated Pico, "
+              f"{args.pollers} pollers, {args.streams} stream clients, {args.duration:.0f}s "
+              f"(+{args.warmup:.0f}s warm-up)")
+
+        deadline = time.time() + args.warmup + args.duration
+        clients = [LivePoller(port, deadline, args.wait_ms) for _ in range(args.pollers)]
+        clients += [StreamClient(port, deadline) for _ in range(args.streams)]
+        for client in clients:
+            client.start()
+        time.sleep(args.warmup)
+
+        bridge_monitor = ProcessMonitor(bridge.pid)
+        emulator_monitor = ProcessMonitor(emulator.pid)
+        samples_before = scrape_samples(port)
+        cpu_before = bridge_monitor.cpu_seconds()
+        emulator_cpu_before = emulator_monitor.cpu_seconds()
+        started = time.time()
+        for client in clients:
+            client.measuring = True
+        while time.time() < started + args.duration:
+            bridge_monitor.rss_bytes()
+            time.sleep(0.25)
+        for client in clients:
+            client.measuring = False
+        elapsed = time.time() - started
+        samples = scrape_samples(port) - samples_before
+        cpu = bridge_monitor.cpu_seconds() - cpu_before
+        emulator_cpu = emulator_monitor.cpu_seconds() - emulator_cpu_before
+        rss = bridge_monitor.rss_bytes()
+    finally:
+        if bridge:
+            stop(bridge)
+        stop(emulator)
+        log.close()
+
+    pollers = [client for client in clients if isinstance(client, LivePoller)]
+    streams = [client for client in clients if isinstance(client, StreamClient)]
+    requests = sum(poller.requests for poller in pollers)
+    stream_samples = sum(stream.samples for stream in streams)
+    return {
+        "version": RESULTS_VERSION,
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "config": {
+            "bridge": args.bridge,
+            "rate": args.rate,
+            "protocol": "json" if args.json else "binary",
+            "pollers": args.pollers,
+            "streams": args.streams,
+            "duration": args.duration,
+            "wait_ms": args.wait_ms,
+            "cpu_count": os.cpu_count(),
+        },
+        "ingest": {
+            "samples": int(samples),
+            "samples_per_sec": round(samples / elapsed, 1),
+        },
+        "http": {
+            "requests": requests,
+            "requests_per_sec": round(requests / elapsed, 1),
+            "errors": sum(poller.errors for poller in pollers),
+        },
+        "poll_latency_ms": latency_summary([value for poller in pollers for value in poller.latencies]),
+        "stream": {
+            "samples": stream_samples,
+            "samples_per_sec": round(stream_samples / elapsed / len(streams), 1) if streams else None,
+            "errors": sum(stream.errors for stream in streams),
+        },
+        "stream_latency_ms": latency_summary([value for stream in streams for value in stream.latencies]),
+        "bridge": {
+            "cpu_percent": round(100.0 * cpu / elapsed, 1),
+            "rss_mb": round(rss / 1e6, 1),
+            "peak_rss_mb": round(bridge_monitor.peak_rss / 1e6, 1),
+        },
+        "emulator_cpu_percent": round(100.0 * emulator_cpu / elapsed, 1),
+    }
+
+
+def print_results(results):
+    ingest, http_stats, bridge = results["ingest"], results["http"], results["bridge"]
+    print(f"   ingested: {ingest['samples_per_sec']:,.0f} samples/s "
+          f"(emulator {results['config']['rate']:,.0f} Hz, {results['emulator_cpu_percent']:.0f}% CPU)")
+    print(f"   served:   {http_stats['requests_per_sec']:,.0f} requests/s  errors: {http_stats['errors']}")
+    for name in ('poll_latency_ms', 'stream_latency_ms'):
+        latency = results[name]
+        if latency:
+            print(f"   {name.split('_')[0]:>6} latency: p50 {latency['p50']:.2f} ms  p95 {latency['p95']:.2f} ms  "
+                  f"p99 {latency['p99']:.2f} ms  max {latency['max']:.2f} ms  ({latency['count']} samples)")
+    if results["stream"]["samples_per_sec"] is not None:
+        print(f"   stream:   {results['stream']['samples_per_sec']:,.0f} samples/s per client")
+    print(f"   bridge:   {bridge['cpu_percent']:.1f}% CPU  {bridge['rss_mb']:.1f} MB RSS "
+          f"(peak {bridge['peak_rss_mb']:.1f} MB)")
+
+
+def compare(before_path, after_path):
+    """Side-by-side of two result files with the change in each metric"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    if before.get("config") != after.get("config"):
+        print("⚠️ The runs used different settings - differences may not be meaningful")
+    print(f"   {'':32} {before.get('commit') or before_path:>14} {after.get('commit') or after_path:>14}")
+    for section, key, label, higher_is_better in COMPARED:
+        old = (before.get(section) or {}).get(key)
+        new = (after.get(section) or {}).get(key)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        better = (change > 0) == higher_is_better
+        marker = '' if abs(change) < 5 else (' ✅' if better else ' ⚠️')
+        print(f"   {label:32} {old:>14,.2f} {new:>14,.2f} {change:+7.1f}%{marker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the bridge end to end with an emulated Pico")
+    parser.add_argument('--bridge', choices=('hardware', 'core'), default='hardware',
+                        help="hardware_bridge.py or bridge_core.py")
+    parser.add_argument('--rate', type=float, default=1000.0, help="Emulated samples per second")
+    parser.add_argument('--json', action='store_true', help="Keep the emulator on DATA: lines (no binary frames)")
+    parser.add_argument('--pollers', type=int, default=20, help="Dashboards long-polling /live")
+    parser.add_argument('--streams', type=int, default=5, help="/stream clients")
+    parser.add_argument('--wait-ms', type=int, default=1000, help="/live wait parameter")
+    parser.add_argument('--duration', type=float, default=15.0, help="Measured seconds")
+    parser.add_argument('--warmup', type=float, default=3.0, help="Seconds of load before measuring")
+    parser.add_argument('--http-port', type=int, help="Bridge port (default: a free one)")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if not sys.platform.startswith('linux'):
+        parser.error("the end-to-end benchmark needs Linux (pty emulator and /proc)")
+
+    try:
+        results = run_benchmark(args)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Poll Latency Benchmark - simulates many dashboards polling a bridge
+Each client repeats the index.js polling cycle (GET /status then GET /data
+every 100 ms) and records per-request latency.
+
+Usage:
+    python stable_server.py                      # or any bridge, in another terminal
+    python benchmarks/poll_latency.py --clients 50 --duration 20
+"""
+
+import argparse
+import http.client
+import random
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Poller(threading.Thread):
+    def __init__(self, host, port, interval, deadline, keepalive):
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.deadline = deadline
+        self.keepalive = keepalive
+        self.latencies = []
+        self.errors = 0
+
+    def request(self, conn, path):
+        start = time.perf_counter()
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+        self.latencies.append(time.perf_counter() - start)
+
+    def run(self):
+        conn = None
+        # Random phase so clients don't all fire on the same tick
+        next_poll = time.perf_counter() + random.uniform(0, self.interval)
+        time.sleep(max(0.0, next_poll - time.perf_counter()))
+        while time.perf_counter() < self.deadline:
+            try:
+                if conn is None or not self.keepalive:
+                    conn = http.client.HTTPConnection(self.host, self.port, timeout=5)
+                self.request(conn, '/status')
+                self.request(conn, '/data')
+                if not self.keepalive:
+                    conn.close()
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                if conn:
+                    conn.close()
+                conn = None
+
+            next_poll += self.interval
+            time.sleep(max(0.0, next_poll - time.perf_counter()))
+        if conn:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bridge latency under concurrent pollers")
+    parser.add_argument('--url', default='http://localhost:9999')
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--interval', type=float, default=0.1, help="Seconds between poll cycles")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--no-keepalive', action='store_true', help="Open a new connection per request")
+    args = parser.parse_args()
+
+    target = urlsplit(args.url)
+    deadline = time.perf_counter() + args.duration
+    pollers = [
+        Poller(target.hostname, target.port or 80, args.interval, deadline, not args.no_keepalive)
+        for _ in range(args.clients)
+    ]
+
+    print(f"📊 {args.clients} pollers against {args.url} for {args.duration:.0f}s "
+          f"({'new connection per request' if args.no_keepalive else 'keep-alive'})")
+    for poller in pollers:
+        poller.start()
+    for poller in pollers:
+        poller.join()
+
+    latencies = sorted(value for poller in pollers for value in poller.latencies)
+    errors = sum(poller.errors for poller in pollers)
+    if not latencies:
+        print("❌ No successful requests")
+        return
+
+    ms = 1000.0
+    print(f"   requests: {len(latencies)}  ({len(latencies) / args.duration:.0f}/s)  errors: {errors}")
+    print(f"   p50: {percentile(latencies, 0.50) * ms:.2f} ms")
+    print(f"   p99: {percentile(latencies, 0.99) * ms:.2f} ms")
+    print(f"   max: {latencies[-1] * ms:.2f} ms  mean: {statistics.mean(latencies) * ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
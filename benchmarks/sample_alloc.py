@@ -0,0 +1,168 @@
+"""
+Sample Allocation Benchmark - per-sample dicts vs the shared Sample record
+Pushes the same synthetic DATA: lines (or binary frames) through the ingest
+work the bridge does for every sample - parse, ring buffer, /data body,
+recorder queue - once the old way (a dict per sample, looked up by name and
+serialized with json.dumps) and once with sample_record.Sample, and reports
+time, memory held per queued sample and garbage collector activity.
+
+Usage:
+    python benchmarks/sample_alloc.py --samples 200000
+    python benchmarks/sample_alloc.py --binary
+"""
+
+import argparse
+import collections
+import gc
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bridge_metrics import TICKS_PERIOD  # noqa: E402
+from data_sources import REQUIRED_FIELDS, parse_sample_line  # noqa: E402
+from pico_protocol import FRAME_FIELDS, FRAME_FORMAT, encode_frame  # noqa: E402
+from sample_history import SampleHistory  # noqa: E402
+from sample_record import FIELD_ALIASES, SAMPLE_FIELDS, Sample  # noqa: E402
+
+UPPER_CASE_NAMES = {canonical: name for name, canonical in FIELD_ALIASES.items()}
+
+
+def synthetic_samples(count, seed=1):
+    """Isabel-style sample dicts (upper-case PID names, ~30 Hz timestamps)"""
+    rng = random.Random(seed)
+    samples = []
+    for index in range(count):
+        error = round(rng.uniform(-10, 10), 2)
+        samples.append({
+            "timestamp": (1000000 + index * 33000) % TICKS_PERIOD,  # Wraps like ticks_us
+            "desired_position": 20.0,
+            "current_position": round(20.0 - error, 2),
+            "servo_command": round(rng.uniform(0.18, 0.9), 2),
+            "error": error,
+            "P_output": round(0.06 * error, 4),
+            "I_output": round(rng.uniform(-0.1, 0.1), 4),
+            "D_output": round(rng.uniform(-0.05, 0.05), 4),
+        })
+    return samples
+
+
+def dict_field(data, field):
+    """How the bridge used to read a canonical field out of a sample dict"""
+    value = data.get(field)
+    if value is None:
+        value = data.get(UPPER_CASE_NAMES.get(field))
+    return value
+
+
+def ingest_dicts(items, binary, backlog):
+    """The previous path: a dict per sample, consumers look fields up by name"""
+    columns = {field: [0.0] * 1024 for field in SAMPLE_FIELDS}
+    for seq, item in enumerate(items):
+        if binary:
+            data = dict(zip(FRAME_FIELDS, FRAME_FORMAT.unpack_from(item, 3)))
+        else:
+            data = json.loads(item[5:])
+            if not all(field in data for field in REQUIRED_FIELDS):
+                continue
+        slot = seq % 1024
+        for field, column in columns.items():
+            value = dict_field(data, field)
+            column[slot] = value if isinstance(value, (int, float)) else math.nan
+        json.dumps(data).encode()
+        backlog.append((seq, data))
+
+
+def ingest_samples(items, binary, backlog):
+    """The current path: one Sample, shared by every consumer"""
+    history = SampleHistory(1024)
+    for seq, item in enumerate(items):
+        if binary:
+            # What FrameDecoder does once a frame's CRC checks out
+            sample = Sample._make(FRAME_FORMAT.unpack_from(item, 3))
+        else:
+            sample = parse_sample_line(item)
+        history.append(sample, 0.0)
+        sample.to_json()
+        backlog.append((seq, sample))
+
+
+class GcCounter:
+    """Collections per generation and time spent in them while installed"""
+
+    def __init__(self):
+        self.collections = [0, 0, 0]
+        self.seconds = 0.0
+        self.started = None
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self.started = time.perf_counter()
+        else:
+            self.seconds += time.perf_counter() - self.started
+            self.collections[info['generation']] += 1
+
+
+def measure(path, items, binary, backlog_size):
+    """(seconds, bytes held per queued sample, GcCounter) for one ingest path"""
+    gc.collect()
+    counter = GcCounter()
+    backlog = collections.deque(maxlen=backlog_size)
+    gc.callbacks.append(counter)
+    start = time.perf_counter()
+    try:
+        path(items, binary, backlog)
+    finally:
+        elapsed = time.perf_counter() - start
+        gc.callbacks.remove(counter)
+
+    # Memory held by samples waiting in a queue (e.g. the recorder's backlog)
+    del backlog
+    gc.collect()
+    tracemalloc.start()
+    backlog = collections.deque(maxlen=backlog_size)
+    baseline = tracemalloc.get_traced_memory()[0]
+    path(items[:backlog_size], binary, backlog)
+    held = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return elapsed, held / max(1, len(backlog)), counter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-sample dicts with Sample records")
+    parser.add_argument('--samples', type=int, default=200000)
+    parser.add_argument('--backlog', type=int, default=20000, help="Samples held in the queue being measured")
+    parser.add_argument('--binary', action='store_true', help="Decode binary frames instead of DATA: lines")
+    args = parser.parse_args()
+
+    samples = synthetic_samples(args.samples)
+    if args.binary:
+        items = [encode_frame(sample) for sample in samples]
+    else:
+        items = ["DATA:" + json.dumps(sample, separators=(',', ':')) for sample in samples]
+
+    print(f"📊 {args.samples} {'binary frames' if args.binary else 'DATA: lines'} "
+          f"through parse, ring buffer, /data body and a {args.backlog}-sample queue")
+    results = {}
+    for name, path in (('dict', ingest_dicts), ('Sample', ingest_samples)):
+        elapsed, held, counter = measure(path, items, args.binary, args.backlog)
+        results[name] = (elapsed, held, counter)
+        print(f"   {name:>6}: {elapsed / args.samples * 1e6:6.2f} us/sample  "
+              f"({args.samples / elapsed:,.0f} samples/s)  "
+              f"{held:5.0f} bytes held per queued sample  "
+              f"gc: {'/'.join(str(n) for n in counter.collections)} collections "
+              f"({counter.seconds * 1000:.1f} ms)")
+
+    old, new = results['dict'], results['Sample']
+    print(f"   Sample vs dict: {old[0] / new[0]:.2f}x throughput, "
+          f"{new[1] / old[1]:.0%} of the memory per queued sample, "
+          f"{sum(new[2].collections)} vs {sum(old[2].collections)} collections")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+UDP Ingest Benchmark - several Wi-Fi Picos streaming to one UdpSource
+Runs udp_ingest.UdpSource inside a BridgeCore (no HTTP) and a sender process
+playing N Picos at R Hz each, every one from its own loopback address
+(127.0.0.2, 127.0.0.3, ...) with SEQ: numbered datagrams. The sender can
+skip or swap datagrams on purpose; the report checks the bridge counted
+exactly those, and whatever else went missing is real loss (kernel buffer
+overflow or the ingest thread falling behind). CPU is the bridge process's,
+per datagram and as a share of one core. Linux only (127.0.0.x senders).
+
+Usage:
+    python benchmarks/udp_ingest.py --picos 4 --rate 500 --duration 10
+    python benchmarks/udp_ingest.py --picos 4 --rate 500 --loss 0.01 --reorder 0.005
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from bridge_core import BridgeCore  # noqa: E402
+from bridge_metrics import TICKS_PERIOD  # noqa: E402
+from udp_ingest import UdpSource  # noqa: E402
+
+SAMPLE_TEMPLATE = (
+    'SEQ:%d\nDATA:{"timestamp": %d, "desired_position": 20.0, "current_position": %.2f, '
+    '"servo_command": 0.52, "error": %.2f, "P_output": 0.1, "I_output": 0.02, "D_output": -0.01}\n'
+)
+
+
+def sender_address(index):
+    return f"127.0.0.{index + 2}"
+
+
+def send(args):
+    """Sender process: play the Picos, then print what was sent as JSON"""
+    rng = random.Random(args.seed)
+    picos = []
+    for index in range(args.picos):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((sender_address(index), 0))
+        picos.append({"sock": sock, "seq": 0, "held": None, "offset": rng.randrange(TICKS_PERIOD),
+                      "sent": 0, "skipped": 0, "swapped": 0})
+
+    interval = 1.0 / args.rate
+    started = time.perf_counter()
+    deadline = started + args.duration
+    tick = 0
+    while True:
+        due = started + tick * interval
+        if due >= deadline:
+            break
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        timestamp_us = int(tick * interval * 1e6)
+        for pico in picos:
+            seq = pico["seq"]
+            pico["seq"] += 1
+            if rng.random() < args.loss:
+                pico["skipped"] += 1
+                continue
+            error = 5.0 * rng.uniform(-1, 1)
+            timestamp = (pico["offset"] + timestamp_us) % TICKS_PERIOD
+            datagram = (SAMPLE_TEMPLATE % (seq, timestamp, 20.0 - error, error)).encode()
+            if pico["held"] is None and rng.random() < args.reorder:
+                pico["held"] = datagram  # Goes out after the next one
+                pico["swapped"] += 1
+                continue
+            pico["sock"].sendto(datagram, ('127.0.0.1', args.port))
+            pico["sent"] += 1
+            if pico["held"] is not None:
+                pico["sock"].sendto(pico["held"], ('127.0.0.1', args.port))
+                pico["sent"] += 1
+                pico["held"] = None
+        tick += 1
+
+    for pico in picos:
+        if pico["held"] is not None:
+            pico["sock"].sendto(pico["held"], ('127.0.0.1', args.port))
+            pico["sent"] += 1
+            pico["swapped"] -= 1  # Last one out, so it arrived in order after all
+        pico["sock"].close()
+    results = [{key: pico[key] for key in ('sent', 'skipped', 'swapped')} for pico in picos]
+    print(json.dumps({"picos": results, "cpu_seconds": time.process_time(),
+                      "seconds": time.perf_counter() - started}))
+
+
+def kernel_drops(port):
+    """Datagrams the kernel dropped for a full receive buffer (/proc/net/udp)"""
+    try:
+        with open('/proc/net/udp') as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                if int(fields[1].split(':')[1], 16) == port:
+                    return int(fields[-1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def measure(args):
+    source = UdpSource(args.port, host='127.0.0.1')
+    if not source.open():
+        sys.exit(1)
+    core = BridgeCore()
+    core.add_source(source)
+    core.start_ingest()
+    time.sleep(0.2)  # Event loop up
+
+    print(f"📊 {args.picos} Picos x {args.rate:.0f} Hz for {args.duration:.0f}s "
+          f"(simulated loss {args.loss:.1%}, reordering {args.reorder:.1%})")
+    cpu_before = time.process_time()
+    wall_before = time.perf_counter()
+    command = [sys.executable, os.path.abspath(__file__), '--send', '--picos', str(args.picos),
+               '--rate', str(args.rate), '--duration', str(args.duration), '--port', str(args.port),
+               '--loss', str(args.loss), '--reorder', str(args.reorder), '--seed', str(args.seed)]
+    sender = subprocess.run(command, capture_output=True, text=True)
+    time.sleep(0.5)  # Let the last batch through
+    cpu = time.process_time() - cpu_before
+    elapsed = time.perf_counter() - wall_before
+    if sender.returncode != 0:
+        print(f"❌ Sender failed: {sender.stderr.strip()}")
+        sys.exit(1)
+    sent = json.loads(sender.stdout)
+
+    drops = kernel_drops(args.port)
+    listener = source.listener_stats()
+    picos = []
+    for index, truth in enumerate(sent["picos"]):
+        peer = source.peers.get(sender_address(index))
+        stats = peer.link_stats() if peer else {"datagrams": 0, "lost": 0, "reordered": 0, "duplicates": 0}
+        samples = peer.channel.history.count if peer else 0
+        picos.append({
+            "sender": sender_address(index),
+            "channel": peer.channel.id if peer else None,
+            "sent": truth["sent"],
+            "received": stats["datagrams"],
+            "published": samples,
+            "lost": stats["lost"],
+            "skipped_by_sender": truth["skipped"],
+            "real_loss": truth["sent"] - stats["datagrams"],
+            "reordered": stats["reordered"],
+            "swapped_by_sender": truth["swapped"],
+            "duplicates": stats["duplicates"],
+        })
+    source.running = False
+    core.stop()
+
+    total_sent = sum(pico["sent"] for pico in picos)
+    total_received = sum(pico["received"] for pico in picos)
+    results = {
+        "config": {"picos": args.picos, "rate": args.rate, "duration": args.duration,
+                   "loss": args.loss, "reorder": args.reorder, "cpu_count": os.cpu_count()},
+        "picos": picos,
+        "datagrams_per_sec": round(total_received / sent["seconds"], 1),
+        "real_loss_percent": round(100.0 * (total_sent - total_received) / total_sent, 3) if total_sent else 0.0,
+        "kernel_drops": drops,
+        "average_batch": listener["average_batch"],
+        "largest_batch": listener["largest_batch"],
+        "receive_buffer": listener["receive_buffer"],
+        "bridge_cpu_percent": round(100.0 * cpu / elapsed, 1),
+        "bridge_cpu_us_per_datagram": round(cpu / total_received * 1e6, 1) if total_received else None,
+        "sender_cpu_percent": round(100.0 * sent["cpu_seconds"] / sent["seconds"], 1),
+    }
+
+    for pico in picos:
+        print(f"   {pico['sender']:>11} -> {pico['channel'] or '-':<16} sent {pico['sent']:>7,}  "
+              f"received {pico['received']:>7,}  lost {pico['lost']:>5} ({pico['skipped_by_sender']} skipped)  "
+              f"reordered {pico['reordered']:>4} ({pico['swapped_by_sender']} swapped)  "
+              f"duplicates {pico['duplicates']}")
+    print(f"   ingested {results['datagrams_per_sec']:,.0f} datagrams/s  "
+          f"real loss {results['real_loss_percent']:.3f}% (kernel drops: {drops})  "
+          f"batch avg {results['average_batch']} max {results['largest_batch']}")
+    print(f"   bridge CPU {results['bridge_cpu_percent']:.1f}% of a core  "
+          f"{results['bridge_cpu_us_per_datagram']} us/datagram  (sender {results['sender_cpu_percent']:.0f}%)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test UDP ingest with several emulated Wi-Fi Picos")
+    parser.add_argument('--picos', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=500.0, help="Datagrams per second per Pico")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=12399)
+    parser.add_argument('--loss', type=float, default=0.0, help="Share of datagrams the sender skips")
+    parser.add_argument('--reorder', type=float, default=0.0, help="Share of datagrams sent after the next one")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--send', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.send:
+        send(args)
+    else:
+        measure(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,613 @@
+"""
+Bridge Core - one serving pipeline for every data source
+hardware_bridge.py, smart_bridge.py, stable_server.py and test_server.py used
+to carry their own copy of the sample plumbing. They now differ only in the
+DataSource they start (data_sources.py); everything after parsing lives here:
+
+    source thread -> TelemetryChannel -> /data /status /live /stream /history /ws
+
+Each source gets its own channel (history, cached responses, stream clients
+and optional recorder) and its own ingest thread, so several sources can run
+in one process. The first source is served at the plain routes; every
+source is also served under /devices/<id>/..., and /devices returns a
+snapshot of all of them.
+
+    python bridge_core.py --source serial --source udp:12345
+"""
+
+import argparse
+import os
+import threading
+import time
+
+from bridge_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from bridge_metrics import INTERVAL_BUCKETS, JITTER_BUCKETS, TICKS_PERIOD, MetricsRegistry
+from bridge_server import (
+    BOOT_ID,
+    DEFAULT_PORT,
+    BridgeRequestHandler,
+    CachedResponse,
+    cache_body,
+    cache_json,
+    create_server,
+)
+from data_sources import SerialPicoSource, SimulationSource, TcpSource, device_id
+from downsampling import serve_downsampled
+from replay_source import ReplaySource, parse_speed
+from sample_record import SAMPLE_SCHEMA, Sample
+from sample_history import SampleHistory, serve_history, serve_samples_after
+from sample_stream import SampleBroadcaster, serve_event_stream
+from telemetry_recorder import TelemetryRecorder
+from udp_ingest import UdpSource
+from websocket_channel import command_refusal, serve_websocket
+
+# Ingest CPU is measured over windows this long
+CPU_WINDOW = 2.0  # [sec]
+
+# A rig whose ingest thread uses more than this is worth a warning
+CPU_WARNING_PERCENT = 25.0
+
+# Reconnect backoff after a source drops: doubles from min up to max
+RECONNECT_MIN_DELAY = 0.5   # [sec]
+RECONNECT_MAX_DELAY = 10.0  # [sec]
+
+# Longest a /live request may wait for a new sample
+LIVE_MAX_WAIT = 5.0  # [sec]
+
+# Route labels for /metrics; anything else is counted as "other"
+METRIC_ROUTES = ('/data', '/status', '/live', '/stream', '/history', '/ws', '/devices', '/schema', '/metrics')
+STREAMING_ROUTES = ('/stream', '/ws')
+
+
+def metrics_route(route):
+    """Bounded route label: /devices/COM3/data -> /devices/{id}/data"""
+    if route.startswith('/devices/'):
+        sub_route = '/' + route[len('/devices/'):].partition('/')[2]
+        return '/devices/{id}' + sub_route if sub_route in METRIC_ROUTES else 'other'
+    return route if route in METRIC_ROUTES else 'other'
+
+
+class TelemetryChannel:
+    """Everything the bridge keeps for one data source"""
+
+    def __init__(self, channel_id, source, recorder=None, metrics=None):
+        self.id = channel_id
+        self.source = source
+        source.channel = self
+
+        self.latest_data = None
+        self.connected = False
+        self.data_lock = threading.Lock()
+
+        # Push channel for /stream clients
+        self.stream = SampleBroadcaster()
+
+        # Recent samples for /history catch-up queries
+        self.history = SampleHistory()
+
+        # /data and /status bodies, serialized once when they change
+        self.data_response = None
+        self.status_response = None
+        self.status_version = 0
+
+        # Wakes /live long-polls on a new sample or status change
+        self.changed = threading.Condition()
+
+        # Optional on-disk telemetry recorder (telemetry_recorder.py)
+        self.recorder = recorder
+
+        # CPU used by the ingest thread, sampled from inside it
+        self.cpu_seconds = 0.0
+        self.cpu_percent = 0.0
+        self.cpu_window = None  # (wall time, thread CPU time) at window start
+
+        # Hot-path instrumentation for /metrics (bridge_metrics.py); only the
+        # ingest thread writes these, so they skip the lock
+        metrics = metrics or MetricsRegistry()
+        self.lines_parsed = metrics.counter(
+            'bridge_lines_total', "Text lines handed to the sample parser",
+            single_writer=True, device=channel_id)
+        self.parse_failures = metrics.counter(
+            'bridge_parse_failures_total', "Lines that were not a valid sample (incl. Pico debug prints)",
+            single_writer=True, device=channel_id)
+        self.parse_seconds = metrics.histogram(
+            'bridge_parse_seconds', "Time to parse one DATA: line into a Sample",
+            single_writer=True, device=channel_id)
+        self.publish_seconds = metrics.histogram(
+            'bridge_publish_seconds', "Time to publish one sample to history, recorder and clients",
+            single_writer=True, device=channel_id)
+        self.sample_interval = metrics.histogram(
+            'bridge_sample_interval_seconds', "Spacing of consecutive samples by the Pico's ticks_us clock",
+            INTERVAL_BUCKETS, single_writer=True, device=channel_id)
+        self.sample_jitter = metrics.histogram(
+            'bridge_sample_jitter_seconds', "Difference between arrival spacing and Pico spacing",
+            JITTER_BUCKETS, single_writer=True, device=channel_id)
+        self.last_arrival = None  # (ticks_us, received_at) of the previous sample
+
+        # Link supervision (run_source)
+        self.disconnects = 0
+        self.reconnects = 0
+        self.downtime = 0.0      # [sec] total of finished outages
+        self.down_since = None   # Start of the current outage
+
+    def publish_sample(self, data):
+        """Hand a parsed sample to /data, /history and /stream consumers
+
+        Called on the source's ingest thread. data is a Sample from the
+        parser (or a dict, normalized here); every consumer shares it.
+        """
+        started = time.perf_counter()
+        sample = Sample.coerce(data)
+        received_at = time.time()
+        if not self.source.shared_thread:
+            self.sample_cpu(received_at)
+        self.observe_spacing(sample.timestamp, received_at)
+        seq = self.history.append(sample, received_at)
+        if self.recorder:
+            self.recorder.record(seq, received_at, sample)
+        response = cache_body(sample.to_json(), seq)
+        with self.data_lock:
+            self.latest_data = sample
+            self.data_response = response
+        self.stream.publish_encoded('sample', response.body)
+        with self.changed:
+            self.changed.notify_all()
+        self.publish_seconds.observe(time.perf_counter() - started)
+
+    def observe_spacing(self, timestamp, received_at):
+        """Sample interval from the Pico clock, and how far arrival strayed from it"""
+        if timestamp is None:
+            return
+        last = self.last_arrival
+        self.last_arrival = (timestamp, received_at)
+        if last is None:
+            return
+        interval = ((timestamp - last[0]) % TICKS_PERIOD) / 1e6
+        self.sample_interval.observe(interval)
+        self.sample_jitter.observe(abs((received_at - last[1]) - interval))
+
+    def publish_event(self, event, payload):
+        """Push a non-sample event (e.g. a command result) to stream clients"""
+        self.stream.publish(event, payload)
+
+    def sample_cpu(self, now):
+        """Update the ingest thread's CPU usage (must run on that thread)"""
+        cpu = time.thread_time()
+        self.cpu_seconds = cpu
+        if self.cpu_window is None:
+            self.cpu_window = (now, cpu)
+        elif now - self.cpu_window[0] >= CPU_WINDOW:
+            window_start, window_cpu = self.cpu_window
+            self.cpu_percent = 100.0 * (cpu - window_cpu) / (now - window_start)
+            self.cpu_window = (now, cpu)
+            if self.cpu_percent > CPU_WARNING_PERCENT:
+                print(f"⚠️ {self.id} ingest thread using {self.cpu_percent:.0f}% CPU")
+
+    def get_latest_data(self):
+        """Get the latest Sample (immutable, so it is shared rather than copied)"""
+        with self.data_lock:
+            return self.latest_data
+
+    def get_status(self):
+        """Channel status plus the source's own fields"""
+        status = {
+            "source": self.source.kind,
+            "connected": self.connected,
+            "simulation_mode": self.source.simulated,
+        }
+        status.update(self.source.status())
+        status["recorder"] = self.recorder.stats() if self.recorder else None
+        status["link"] = self.link_stats()
+        status["cpu"] = None if self.source.shared_thread else {
+            "thread_seconds": round(self.cpu_seconds, 3),
+            "percent": round(self.cpu_percent, 2),
+        }
+        status["timestamp"] = time.time()
+        return status
+
+    def refresh_status(self):
+        """Re-serialize the cached /status body after a change"""
+        self.status_version += 1
+        self.status_response = cache_json(self.get_status(), f"s{self.status_version}")
+        return self.status_response
+
+    def set_connected(self, connected):
+        """Update connection state and notify stream clients on change"""
+        if connected != self.connected:
+            self.connected = connected
+            response = self.refresh_status()
+            self.stream.publish_encoded('status', response.body)
+            with self.changed:
+                self.changed.notify_all()
+
+    def live_response(self):
+        """Status and latest sample in one body, joined from the cached ones"""
+        status = self.status_response or self.refresh_status()
+        with self.data_lock:
+            data = self.data_response
+        seq = data.seq if data else -1
+        body = b'{"seq": %d, "status_version": %d, "status": %s, "data": %s}' % (
+            seq, self.status_version, status.body, data.body if data else b'null'
+        )
+        return CachedResponse(body, f'"{BOOT_ID}-{seq}-{status.seq}"', seq)
+
+    def wait_for_update(self, after, status_version, timeout):
+        """Block until a sample newer than after or a status change, or timeout"""
+        with self.changed:
+            self.changed.wait_for(
+                lambda: self.history.count - 1 > after or self.status_version != status_version,
+                timeout,
+            )
+
+    def link_stats(self):
+        """Reconnect counts and downtime for /status"""
+        outage = time.time() - self.down_since if self.down_since else 0.0
+        return {
+            "disconnects": self.disconnects,
+            "reconnects": self.reconnects,
+            "downtime_seconds": round(self.downtime + outage, 1),
+            "down_for_seconds": round(outage, 1) if self.down_since else None,
+        }
+
+    def collect_metrics(self):
+        """This channel's scrape-time metrics: (name, type, help, labels, value)"""
+        device = {"device": self.id}
+        outage = time.time() - self.down_since if self.down_since else 0.0
+        metrics = [
+            ('bridge_samples_total', 'counter', "Samples published", device, self.history.count),
+            ('bridge_connected', 'gauge', "1 while the source is delivering data", device, int(self.connected)),
+            ('bridge_disconnects_total', 'counter', "Source disconnects", device, self.disconnects),
+            ('bridge_reconnects_total', 'counter', "Successful source reconnects", device, self.reconnects),
+            ('bridge_downtime_seconds_total', 'counter', "Time spent disconnected",
+             device, self.downtime + outage),
+            ('bridge_stream_clients', 'gauge', "Connected /stream and /ws clients",
+             device, self.stream.client_count()),
+            ('bridge_stream_dropped_messages_total', 'counter', "Messages dropped for slow stream clients",
+             device, self.stream.dropped_messages),
+        ]
+        if not self.source.shared_thread:
+            metrics.append(('bridge_ingest_cpu_seconds_total', 'counter', "CPU time used by the ingest thread",
+                            device, self.cpu_seconds))
+        if self.recorder:
+            recorder = self.recorder.stats()
+            metrics += [
+                ('bridge_recorder_records_total', 'counter', "Samples written to disk",
+                 device, recorder["records_written"]),
+                ('bridge_recorder_pending', 'gauge', "Samples queued for the recorder",
+                 device, recorder["pending"]),
+                ('bridge_recorder_dropped_samples_total', 'counter', "Samples the recorder had no room for",
+                 device, recorder["dropped"]),
+            ]
+        for name, kind, help_text, value in self.source.collect_metrics():
+            metrics.append((name, kind, help_text, device, value))
+        return metrics
+
+    def run_source(self):
+        """Ingest thread body - supervises the source and reconnects it with backoff"""
+        while True:
+            try:
+                self.source.run(self)
+            except Exception as e:
+                print(f"❌ {self.id} source error: {e}")
+            self.set_connected(False)
+
+            if not (self.source.running and self.source.reconnectable):
+                return
+            self.disconnects += 1
+            self.down_since = time.time()
+            self.refresh_status()
+            if not self.reconnect():
+                return
+
+    def reconnect(self):
+        """Retry source.reopen() with exponential backoff; False if stopped first"""
+        delay = RECONNECT_MIN_DELAY
+        while self.source.running:
+            print(f"🔄 {self.id}: reconnecting in {delay:.1f}s...")
+            wake_at = time.time() + delay
+            while self.source.running and time.time() < wake_at:
+                time.sleep(0.1)
+            if not self.source.running:
+                return False
+
+            try:
+                reopened = self.source.reopen()
+            except Exception as e:
+                print(f"⚠️ {self.id}: reconnect failed: {e}")
+                reopened = False
+
+            if reopened:
+                outage = time.time() - self.down_since
+                self.downtime += outage
+                self.down_since = None
+                self.reconnects += 1
+                print(f"✅ {self.id}: reconnected after {outage:.1f}s (reconnect #{self.reconnects})")
+                self.refresh_status()
+                return True
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+        return False
+
+
+class TelemetryHandler(BridgeRequestHandler):
+    """HTTP routes shared by every bridge"""
+
+    def do_GET(self):
+        started = time.perf_counter()
+        self.response_code = None
+        route, query = self.split_path()
+        try:
+            self.route_request(route, query)
+        finally:
+            self.observe_request(route, started)
+
+    def observe_request(self, route, started):
+        """Request count and latency per route for /metrics"""
+        label = metrics_route(route)
+        metrics = self.server.core.metrics
+        metrics.counter('bridge_http_requests_total', "HTTP requests by route and status code",
+                        route=label, code=self.response_code).inc()
+        if not label.endswith(STREAMING_ROUTES):
+            # Streams stay open for minutes; they show up as bridge_stream_clients instead
+            metrics.histogram('bridge_http_request_seconds', "Time to answer an HTTP request, by route",
+                              route=label).observe(time.perf_counter() - started)
+
+    def route_request(self, route, query):
+        core = self.server.core
+
+        if route == '/devices':
+            self.send_json(core.devices_snapshot())
+        elif route == '/schema':
+            # Sample field names, units and accepted aliases
+            self.send_json(SAMPLE_SCHEMA)
+        elif route == '/metrics':
+            # Prometheus text exposition (bridge_metrics.py)
+            self.send_body(core.metrics.render(), METRICS_CONTENT_TYPE)
+        elif route.startswith('/devices/'):
+            # /devices/<id>/data, /devices/<id>/status, ...
+            channel_id, _, sub_route = route[len('/devices/'):].partition('/')
+            channel = core.channels.get(channel_id)
+            if channel is None:
+                self.send_error(404, f"Unknown device '{channel_id}'")
+            else:
+                self.serve_channel(channel, '/' + sub_route, query)
+        elif core.primary is None:
+            self.send_error(503, "No data source running")
+        else:
+            self.serve_channel(core.primary, route, query)
+
+    def serve_channel(self, channel, route, query):
+        if route == '/data' and 'after' in query:
+            # Every sample newer than a sequence number, in one batch
+            serve_samples_after(self, channel.history, query)
+
+        elif route == '/data':
+            # Pre-serialized when the sample arrived; 304 if unchanged
+            response = channel.data_response
+            if response:
+                self.send_cached(response)
+            else:
+                self.send_error(503, "No data available")
+
+        elif route == '/status':
+            self.send_cached(channel.status_response or channel.refresh_status())
+
+        elif route == '/live':
+            # /status + /data in one request, optionally long-polled
+            self.serve_live(channel, query)
+
+        elif route == '/stream':
+            # Long-lived Server-Sent Events connection
+            serve_event_stream(self, channel.stream, channel.get_status(), channel.get_latest_data())
+
+        elif route == '/history':
+            if {'from', 'to', 'points'} & query.keys():
+                # Long windows, reduced to a few hundred points
+                serve_downsampled(self, channel, query)
+            else:
+                serve_history(self, channel.history, query)
+
+        elif route == '/ws':
+            # Telemetry down, live tuning commands up (from allowed clients only)
+            core = self.server.core
+            serve_websocket(self, channel, command_refusal(self.headers, query, core.command_origins,
+                                                           core.command_token))
+        else:
+            self.send_error(404, "Not found")
+
+
+    def serve_live(self, channel, query):
+        """/live?after=<seq>&status=<version>&wait=<ms>
+
+        Returns at once if the client is behind; otherwise waits up to wait ms
+        for the next sample or status change. 304 if nothing changed.
+        """
+        try:
+            after = int(query.get('after', -1))
+            status_version = int(query.get('status', channel.status_version))
+            wait = min(max(float(query.get('wait', 0)) / 1000, 0.0), LIVE_MAX_WAIT)
+        except ValueError:
+            self.send_error(400, "after, status and wait must be numbers")
+            return
+        if wait:
+            channel.wait_for_update(after, status_version, wait)
+        self.send_cached(channel.live_response())
+
+
+class BridgeCore:
+    """Runs one ingest thread per source and serves them over HTTP"""
+
+    def __init__(self, sources=(), port=DEFAULT_PORT, record_dir=None, command_origins=(), command_token=None):
+        self.port = port
+        self.record_dir = record_dir
+        # Who may send /ws tuning commands (websocket_channel.command_refusal)
+        self.command_origins = {origin.rstrip('/').lower() for origin in command_origins}
+        self.command_token = command_token
+        self.channels = {}
+        self.running = False
+        self.httpd = None
+        self.metrics = MetricsRegistry()
+        self.metrics.add_collector(self.collect_metrics)
+        for source in sources:
+            self.add_source(source)
+
+    @property
+    def primary(self):
+        """The channel served at /data, /status, /stream and /history"""
+        return next(iter(self.channels.values()), None)
+
+    def add_source(self, source):
+        """Give a source its own channel (and recorder when recording)
+
+        Also called while running, for Picos a UDP source discovers.
+        """
+        channel_id = source.name
+        suffix = 2
+        while channel_id in self.channels:
+            channel_id = f"{source.name}-{suffix}"
+            suffix += 1
+
+        recorder = None
+        if self.record_dir:
+            # The first source records into the directory itself, others into subdirectories
+            directory = self.record_dir if not self.channels else os.path.join(self.record_dir, channel_id)
+            recorder = TelemetryRecorder(directory)
+
+        channel = TelemetryChannel(channel_id, source, recorder, self.metrics)
+        if recorder and self.running:
+            recorder.start()
+        source.add_channel = self.add_source
+        # Replaced rather than changed: a UDP source adds Picos while HTTP threads iterate
+        self.channels = {**self.channels, channel_id: channel}
+        return channel
+
+    def devices_snapshot(self):
+        """Status and latest sample of every channel, for /devices"""
+        devices = {}
+        for channel_id, channel in self.channels.items():
+            latest = channel.get_latest_data()
+            devices[channel_id] = {
+                "status": channel.get_status(),
+                "data": latest.to_dict() if latest else None,
+            }
+        return {
+            "devices": devices,
+            "process_cpu_seconds": round(time.process_time(), 3),
+            "timestamp": time.time(),
+        }
+
+    def collect_metrics(self):
+        """Totals the bridge already keeps, read when /metrics is scraped"""
+        for channel in self.channels.values():
+            for metric in channel.collect_metrics():
+                yield metric
+        if self.httpd:
+            yield ('bridge_http_connections', 'gauge', "Open HTTP connections (pollers, streams, websockets)",
+                   {}, self.httpd.active_connections)
+            yield ('bridge_http_workers', 'gauge', "HTTP worker threads started", {}, len(self.httpd.workers))
+        yield ('bridge_process_cpu_seconds_total', 'counter', "CPU time used by the bridge process",
+               {}, time.process_time())
+
+    def start_ingest(self):
+        """Start every source's ingest thread (sources must already be open)"""
+        self.running = True
+        for channel in self.channels.values():
+            if channel.recorder:
+                channel.recorder.start()
+            channel.source.running = True
+            thread = threading.Thread(target=channel.run_source, daemon=True, name=f"ingest-{channel.id}")
+            thread.start()
+
+    def announce_server(self):
+        """Printed once the HTTP server is listening"""
+        print(f"🌐 Server running on all interfaces, port {self.port}")
+        for channel in self.channels.values():
+            print(f"   📥 {channel.id}: {channel.source.kind}")
+        print("=" * 60)
+
+    def serve_forever(self):
+        """Serve HTTP until interrupted (blocking)"""
+        try:
+            # Pooled workers so long-lived /stream clients and slow pollers don't block others
+            with create_server(TelemetryHandler, self.port) as httpd:
+                httpd.core = self
+                self.httpd = httpd
+                self.announce_server()
+                httpd.serve_forever()
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            print(f"❌ Server error: {e}")
+
+    def stop(self):
+        """Stop every source and flush recorders"""
+        self.running = False
+        for channel in self.channels.values():
+            channel.source.running = False
+            channel.source.close()
+            if channel.recorder:
+                channel.recorder.stop()
+
+
+def make_source(spec):
+    """Build a source from a command-line spec
+
+        serial[:PORT]  sim  udp[:PORT]  tcp:HOST[:PORT]  replay:PATH[@SPEED]
+    """
+    kind, _, argument = spec.partition(':')
+    if kind == 'serial':
+        if argument:
+            return SerialPicoSource(argument, discover=False, name=device_id(argument))
+        return SerialPicoSource()
+    if kind in ('sim', 'simulation'):
+        return SimulationSource()
+    if kind == 'udp':
+        return UdpSource(int(argument)) if argument else UdpSource()
+    if kind == 'tcp':
+        host, _, port = argument.partition(':')
+        if not host:
+            raise ValueError("tcp source needs a host: tcp:HOST[:PORT]")
+        return TcpSource(host, int(port)) if port else TcpSource(host)
+    if kind == 'replay':
+        path, _, speed = argument.partition('@')
+        return ReplaySource(path, parse_speed(speed) if speed else 1.0)
+    raise ValueError(f"Unknown source '{spec}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve one or more data sources to Computer B")
+    parser.add_argument('--source', action='append', metavar='SPEC',
+                        help="serial[:PORT], sim, udp[:PORT], tcp:HOST[:PORT] or replay:PATH[@SPEED] (repeatable)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="HTTP port")
+    parser.add_argument('--record', metavar='DIR', help="Record every sample to telemetry segments in DIR")
+    parser.add_argument('--allow-origin', action='append', default=[], metavar='ORIGIN',
+                        help="Web page origin allowed to send /ws tuning commands, e.g. http://192.168.1.50:8000")
+    parser.add_argument('--command-token', help="Require /ws?token=TOKEN from every client sending commands")
+    args = parser.parse_args()
+
+    try:
+        sources = [make_source(spec) for spec in args.source or ['serial']]
+    except (ValueError, FileNotFoundError) as e:
+        parser.error(str(e))
+
+    core = BridgeCore(port=args.port, record_dir=args.record, command_origins=args.allow_origin,
+                      command_token=args.command_token)
+    for source in sources:
+        if source.open():
+            core.add_source(source)
+        else:
+            print(f"⚠️ Skipping {source.name} - not available")
+    if not core.channels:
+        print("❌ No data source available. Exiting.")
+        return
+
+    core.start_ingest()
+    try:
+        core.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Bridge stopped")
+    finally:
+        core.stop()
+
+
+if __name__ == "__main__":
+    main()
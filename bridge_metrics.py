@@ -0,0 +1,163 @@
+"""
+Bridge Metrics - Prometheus counters and histograms served at /metrics
+The ingest and HTTP hot paths only bump a counter or drop a value into a
+fixed-bucket histogram (a bisect, plus a short lock where several threads
+write), so the metrics stay on in production. Totals the bridge already
+keeps - serial bytes, recorder drops, reconnects, stream clients - are
+read when /metrics is scraped instead of being counted twice.
+
+    curl localhost:9999/metrics
+
+Comparing the stage histograms shows where throughput runs out: serial
+bytes/lines read, bridge_parse_seconds (DATA: line -> Sample),
+bridge_publish_seconds (ring buffer, recorder queue, /data body and stream
+fan-out) and bridge_http_request_seconds per route.
+"""
+
+import bisect
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# [sec] - parsing and publishing take microseconds, HTTP requests milliseconds
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+# [sec] - Isabel loops every ~36 ms over JSON, every 10 ms in binary mode
+INTERVAL_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.03, 0.04, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0)
+
+# [sec] - arrival spacing minus Pico spacing; USB/Wi-Fi batching shows up here
+JITTER_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# MicroPython's ticks_us wraps at 2**30 on the Pico
+TICKS_PERIOD = 1 << 30
+
+
+def format_value(value):
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+def format_labels(labels):
+    """{name="value",...} with the exposition format's escaping, or ''"""
+    if not labels:
+        return ''
+    escaped = (
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class Counter:
+    """Monotonic total; inc() is safe from any thread unless single_writer"""
+
+    def __init__(self, single_writer=False):
+        self.value = 0
+        # One ingest thread writing needs no lock; HTTP workers share one
+        self.lock = None if single_writer else threading.Lock()
+
+    def inc(self, amount=1):
+        if self.lock is None:
+            self.value += amount
+            return
+        with self.lock:
+            self.value += amount
+
+    def lines(self, name, labels):
+        return [f"{name}{format_labels(labels)} {format_value(self.value)}"]
+
+
+class Histogram:
+    """Fixed-bucket histogram (counts are cumulated only when rendered)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, single_writer=False):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last one is +Inf
+        self.sum = 0.0
+        self.lock = None if single_writer else threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if self.lock is None:
+            self.counts[index] += 1
+            self.sum += value
+            return
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def lines(self, name, labels):
+        if self.lock is None:
+            # A scrape may land between the count and the sum - off by one sample at most
+            counts = list(self.counts)
+            total = self.sum
+        else:
+            with self.lock:
+                counts = list(self.counts)
+                total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            bucket_labels = labels + (('le', format_value(float(bound))),)
+            lines.append(f"{name}_bucket{format_labels(bucket_labels)} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+        lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metric families plus scrape-time collectors, rendered for /metrics"""
+
+    def __init__(self):
+        self.families = {}   # name -> (type, help, {labels: Counter/Histogram})
+        self.collectors = []
+        self.lock = threading.Lock()
+
+    def metric(self, name, kind, help_text, labels, factory):
+        labels = tuple(sorted(labels.items()))
+        with self.lock:
+            family = self.families.setdefault(name, (kind, help_text, {}))
+            metric = family[2].get(labels)
+            if metric is None:
+                metric = family[2][labels] = factory()
+        return metric
+
+    def counter(self, name, help_text, single_writer=False, **labels):
+        return self.metric(name, 'counter', help_text, labels, lambda: Counter(single_writer))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, single_writer=False, **labels):
+        return self.metric(name, 'histogram', help_text, labels, lambda: Histogram(buckets, single_writer))
+
+    def add_collector(self, collect):
+        """collect() returns (name, type, help, labels dict, value) tuples at scrape time"""
+        self.collectors.append(collect)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        collected = {}
+        for collect in self.collectors:
+            for name, kind, help_text, labels, value in collect():
+                if value is None:
+                    continue
+                family = collected.setdefault(name, (kind, help_text, []))
+                family[2].append((tuple(sorted(labels.items())), value))
+
+        output = []
+        with self.lock:
+            families = [(name, kind, help_text, list(metrics.items()))
+                        for name, (kind, help_text, metrics) in self.families.items()]
+        for name, kind, help_text, metrics in families:
+            output += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, metric in metrics:
+                output += metric.lines(name, labels)
+        for name, (kind, help_text, values) in collected.items():
+            output += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            output += [f"{name}{format_labels(labels)} {format_value(value)}" for labels, value in values]
+        return ('\n'.join(output) + '\n').encode()
@@ -0,0 +1,212 @@
+"""
+Bridge Server - shared HTTP serving core for the data bridges
+hardware_bridge.py, smart_bridge.py, stable_server.py and test_server.py all
+serve through this module: a bounded worker pool so one slow client cannot
+stall the others, and HTTP/1.1 keep-alive so pollers reuse their connection.
+
+Latency target (benchmarks/poll_latency.py, 50 pollers at 100 ms):
+p50 under 5 ms and p99 under 25 ms for /status + /data.
+"""
+
+import json
+import os
+import queue
+import threading
+import socketserver
+import http.server
+from collections import namedtuple
+from urllib.parse import urlsplit, parse_qs
+
+from http_compression import COMPRESS_MIN_BYTES, StreamCompressor, choose_encoding, compress, is_compressible
+
+DEFAULT_PORT = 9999
+
+# ETags must not repeat across bridge restarts, so they carry a per-process id
+BOOT_ID = os.urandom(4).hex()
+
+# Each open connection (keep-alive poller or /stream client) holds one worker
+DEFAULT_MAX_WORKERS = 128
+
+
+# A response serialized once and written as-is to every client
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag', 'seq'])
+
+
+def cache_body(body, seq):
+    """Wrap an already serialized body as an immutable cached response"""
+    return CachedResponse(body, f'"{BOOT_ID}-{seq}"', seq)
+
+
+def cache_json(payload, seq):
+    """Serialize a payload once into an immutable cached response"""
+    return cache_body(json.dumps(payload).encode(), seq)
+
+
+class PooledHTTPServer(socketserver.TCPServer):
+    """TCPServer that hands each connection to a bounded pool of worker threads"""
+
+    allow_reuse_address = True
+    request_queue_size = 128  # Listen backlog - the default of 5 drops bursts of pollers
+
+    def __init__(self, server_address, handler_class, max_workers=DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self.pending = queue.Queue()
+        self.workers = []
+        self.active_connections = 0
+        self.workers_lock = threading.Lock()
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        """Queue the connection for a worker instead of handling it inline"""
+        with self.workers_lock:
+            self.active_connections += 1
+            # Grow the pool on demand up to max_workers
+            if self.active_connections > len(self.workers) and len(self.workers) < self.max_workers:
+                worker = threading.Thread(
+                    target=self.worker_loop,
+                    name=f"http-{len(self.workers)}",
+                    daemon=True  # Open /stream connections must not block Ctrl+C
+                )
+                self.workers.append(worker)
+                worker.start()
+        self.pending.put((request, client_address))
+
+    def worker_loop(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self.workers_lock:
+                    self.active_connections -= 1
+
+    def server_close(self):
+        super().server_close()
+        for _ in self.workers:
+            self.pending.put(None)
+
+
+class BridgeRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Base handler with keep-alive, CORS and JSON helpers"""
+
+    protocol_version = 'HTTP/1.1'
+
+    # Headers and body go out as separate writes; without TCP_NODELAY the
+    # body waits on the client's delayed ACK (~40 ms per response)
+    disable_nagle_algorithm = True
+
+    # Idle keep-alive connections are closed after this many seconds so they
+    # give their worker back to the pool
+    timeout = 10
+
+    # Status of the response being written (set by send_response)
+    response_code = None
+
+    def split_path(self):
+        """Split the request path into route and query parameters"""
+        parts = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+        return parts.path, query
+
+    def negotiate_encoding(self, content_type):
+        """Compression for this response's type, if the client accepts one"""
+        if not is_compressible(content_type):
+            return None
+        return choose_encoding(self.headers.get('Accept-Encoding', ''))
+
+    def send_body(self, body, content_type='application/json', status=200, headers=None, compressible=True):
+        """Send a complete response with Content-Length so the connection can be reused
+
+        Bodies of COMPRESS_MIN_BYTES or more are compressed when the client
+        accepts it (history windows, sample batches, /devices).
+        """
+        encoding = None
+        if compressible and len(body) >= COMPRESS_MIN_BYTES:
+            encoding = self.negotiate_encoding(content_type)
+            if encoding:
+                body = compress(body, encoding)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+            self.send_header('Vary', 'Accept-Encoding')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chunked(self, chunks, content_type, headers=None):
+        """Stream a response piece by piece with chunked transfer encoding"""
+        encoding = self.negotiate_encoding(content_type)
+        compressor = StreamCompressor(encoding) if encoding else None
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+            self.send_header('Vary', 'Accept-Encoding')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        for chunk in chunks:
+            if chunk and compressor:
+                # Flushed per piece so the client can decode as it arrives
+                chunk = compressor.compress(chunk)
+            if chunk:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+        if compressor:
+            tail = compressor.finish()
+            if tail:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(tail), tail))
+        self.wfile.write(b'0\r\n\r\n')
+
+    def send_json(self, payload, status=200):
+        """Serialize and send a JSON response"""
+        self.send_body(json.dumps(payload).encode(), 'application/json', status)
+
+    def send_cached(self, response):
+        """Write a pre-serialized response, or 304 if the client already has it"""
+        if self.headers.get('If-None-Match') == response.etag:
+            self.send_response(304)
+            self.send_header('ETag', response.etag)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            return
+        # Small and sent on every poll: the ETag saves more than compression would
+        self.send_body(response.body, headers={
+            'ETag': response.etag,
+            'Cache-Control': 'no-cache',  # Browsers revalidate with If-None-Match
+        }, compressible=False)
+
+    def do_OPTIONS(self):
+        """Handle CORS preflight requests"""
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
+        self.send_header('Access-Control-Expose-Headers', 'ETag')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_request(self, code='-', size='-'):
+        """Remember the status code (for /metrics) instead of logging the request"""
+        self.response_code = int(code) if code != '-' else None
+
+    def log_message(self, format, *args):
+        """Suppress HTTP request logging"""
+        pass
+
+
+def create_server(handler, port=DEFAULT_PORT, host="", max_workers=DEFAULT_MAX_WORKERS):
+    """Create the pooled HTTP server used by every bridge"""
+    return PooledHTTPServer((host, port), handler, max_workers=max_workers)
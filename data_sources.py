@@ -0,0 +1,602 @@
+"""
+Data Sources - everything that can feed samples into the bridge
+Each source runs its own ingest thread and hands parsed samples to the
+TelemetryChannel it is attached to (bridge_core.py). The channel takes care
+of history, caching, streaming and recording, so a source only has to
+connect and parse.
+
+    SerialPicoSource   Pico over USB serial (JSON lines or binary frames)
+    SimulationSource   Isabel's loop on a simulated cart (pid_simulator.py)
+    StaticSource       one fixed sample, for network connectivity checks
+    UdpSource          Wi-Fi Picos sending datagrams (udp_ingest.py)
+    TcpSource          Wi-Fi Pico serving a TCP socket (as in file.py)
+    ReplaySource       recorded telemetry (replay_source.py)
+"""
+
+import collections
+import json
+import math
+import socket
+import threading
+import time
+
+from bridge_metrics import TICKS_PERIOD
+from pico_protocol import (
+    COMMAND_ACK_PREFIX,
+    COMMAND_PREFIX,
+    CommandTracker,
+    FrameDecoder,
+    is_command_reply,
+    looks_like_pico_output,
+    negotiate_binary,
+    request_json_mode,
+)
+from port_discovery import find_pico_ports, find_port_by_fingerprint, port_fingerprint
+from sample_record import Sample
+from serial_reader import LineSplitter, SerialReader
+
+try:
+    import serial
+    import serial.tools.list_ports
+except ImportError:
+    serial = None  # Only the serial source needs pyserial
+
+try:
+    import pid_simulator
+except ImportError:
+    pid_simulator = None  # No numpy: the simulation falls back to a sine generator
+
+DEFAULT_SERIAL_PORT = 'COM12'
+DEFAULT_BAUDRATE = 115200
+DEFAULT_PICO_NETWORK_PORT = 12345
+
+REQUIRED_FIELDS = ('timestamp', 'desired_position', 'current_position', 'servo_command')
+
+# A connected Pico that sends nothing for this long is treated as dropped
+SILENCE_TIMEOUT = 5.0  # [sec]
+
+# Isabel's gains (pid_simulator.DEFAULT_*), also used without numpy
+ISABEL_GAINS = {'Kp': 0.06, 'Ki': 0.0558139535, 'Kd': 0.016125, 'base': 0.54}
+
+# Loop time of the numpy-free sine generator
+FALLBACK_LOOP_PERIOD = 0.1  # [sec]
+
+
+def parse_sample_line(line):
+    """Parse one text line from a Pico into a Sample, or None"""
+    try:
+        # Handle "DATA:" prefix if present
+        json_line = line[5:] if line.startswith("DATA:") else line
+        data = json.loads(json_line)
+
+        # Validate data structure
+        if isinstance(data, dict) and all(field in data for field in REQUIRED_FIELDS):
+            return Sample.from_mapping(data)
+        print(f"⚠️ Invalid data structure: {line}")
+
+    except json.JSONDecodeError:
+        # Not JSON - might be debug output from Pico
+        if len(line) < 100:  # Avoid spam
+            print(f"📝 Pico debug: {line}")
+    return None
+
+
+def device_id(port):
+    """Short URL-safe name for a serial device (COM3, ttyACM0)"""
+    return port.rstrip('/').rsplit('/', 1)[-1]
+
+
+class DataSource:
+    """Base class for sample producers
+
+    Subclasses implement run(channel), which loops while self.running and
+    calls channel.publish_sample() for every sample. open() connects before
+    the ingest thread starts; close() releases the connection. When run()
+    returns early on a reconnectable source, the channel supervisor calls
+    reopen() with backoff until it succeeds. A source that discovers more
+    devices while running (one UDP port, several Picos) hands each one to
+    add_channel(source), which BridgeCore sets, to get a channel of its own;
+    such sources set shared_thread, as their CPU is the discovering source's.
+    """
+
+    kind = 'source'
+    simulated = False
+    reconnectable = False
+    accepts_commands = False
+    shared_thread = False  # Published from another source's ingest thread
+
+    def __init__(self, name=None):
+        self.name = name or self.kind
+        self.channel = None
+        self.running = False
+        self.add_channel = None
+
+    def open(self):
+        """Connect to the data source; False if it is not available"""
+        return True
+
+    def run(self, channel):
+        raise NotImplementedError
+
+    def reopen(self):
+        """Reconnect after run() returned; True once data can flow again"""
+        return False
+
+    def send_command(self, name, value):
+        """Send a live tuning command; returns the tracked command"""
+        raise ValueError(f"{self.kind} source does not accept commands")
+
+    def close(self):
+        pass
+
+    def status(self):
+        """Source-specific fields merged into /status"""
+        return {"pico_connected": False}
+
+    def collect_metrics(self):
+        """Source-specific (name, type, help, value) metrics for /metrics"""
+        return []
+
+    def parse_line(self, line):
+        """parse_sample_line, timed and counted in the channel's metrics"""
+        channel = self.channel
+        started = time.perf_counter()
+        data = parse_sample_line(line)
+        channel.parse_seconds.observe(time.perf_counter() - started)
+        channel.lines_parsed.inc()
+        if data is None:
+            channel.parse_failures.inc()
+        return data
+
+
+class SerialPicoSource(DataSource):
+    """Reads the Isabel script's output from the Pico over USB serial"""
+
+    kind = 'serial'
+    reconnectable = True
+    accepts_commands = True
+
+    def __init__(self, port=DEFAULT_SERIAL_PORT, baudrate=DEFAULT_BAUDRATE, use_binary=True,
+                 discover=True, require_data=False, name=None):
+        super().__init__(name or 'pico')
+        self.serial_port = port
+        self.baudrate = baudrate
+        self.serial_connection = None
+
+        # Scan for the Pico instead of trusting the configured port
+        self.discover = discover
+        # Give up (so callers can fall back) when the port is silent
+        self.require_data = require_data
+
+        # Binary frames are negotiated at connect time; JSON lines otherwise
+        self.use_binary = use_binary
+        self.binary_mode = False
+
+        # Bulk serial reader, created once the port is open
+        self.reader = None
+        # (bytes, lines, frames, CRC errors) read before the current reader, for /metrics
+        self.retired_totals = (0, 0, 0, 0)
+
+        # USB identity of the connected port, to find it again after a replug
+        self.fingerprint = None
+
+        # Live tuning commands (written from HTTP threads, answered on the ingest thread)
+        self.commands = CommandTracker()
+        self.write_lock = threading.Lock()
+
+    def find_pico_port(self):
+        """Automatically find the Pico's serial port"""
+        try:
+            ports = find_pico_ports(self.baudrate, first_only=True)
+            return ports[0] if ports else None
+        except Exception as e:
+            print(f"❌ Port scanning error: {e}")
+            return self.serial_port
+
+    def open(self):
+        """Connect to the Pico via USB serial"""
+        if serial is None:
+            print("❌ pyserial not installed (pip install pyserial)")
+            return False
+
+        if self.discover:
+            # Try to find Pico automatically
+            detected_port = self.find_pico_port()
+            if detected_port:
+                self.serial_port = detected_port
+        return self.connect(self.require_data)
+
+    def reopen(self):
+        """Find the Pico again after a disconnect - it may be on a new port"""
+        self.close()
+        try:
+            replugged_port = find_port_by_fingerprint(self.fingerprint) if self.fingerprint else None
+        except Exception as e:
+            print(f"⚠️ Port lookup failed: {e}")
+            replugged_port = None
+        if replugged_port:
+            self.serial_port = replugged_port
+        elif self.discover:
+            detected_port = self.find_pico_port()
+            if not detected_port:
+                return False
+            self.serial_port = detected_port
+        return self.connect(require_data=True, show_hints=False)
+
+    def connect(self, require_data, show_hints=True):
+        """Open the current port, check for Pico output and negotiate"""
+        try:
+            print(f"🔌 Connecting to Pico on {self.serial_port}...")
+            self.serial_connection = serial.Serial(
+                self.serial_port,
+                self.baudrate,
+                timeout=1
+            )
+
+            # Test the connection
+            print("🧪 Testing Pico connection...")
+            test_attempts = 0
+            while test_attempts < 5:
+                try:
+                    line = self.serial_connection.readline()
+                    if line and looks_like_pico_output(line):
+                        print("✅ Pico connection verified - receiving data")
+                        self.negotiate_protocol()
+                        self.fingerprint = port_fingerprint(self.serial_port)
+                        return True
+                    test_attempts += 1
+                    time.sleep(0.5)
+                except:
+                    test_attempts += 1
+
+            print("⚠️ Connected to port but no valid data received")
+            if require_data:
+                self.serial_connection.close()
+                return False
+            print("💡 Make sure the Isabel script is running on your Pico")
+            return True  # Keep connection open in case data starts flowing
+
+        except serial.SerialException as e:
+            print(f"❌ Serial connection failed: {e}")
+            if show_hints:
+                print("💡 Check that:")
+                print("   1. Pico is connected via USB")
+                print("   2. Correct COM port (Windows) or device (Mac/Linux)")
+                print("   3. No other programs are using the serial port")
+            return False
+        except Exception as e:
+            print(f"❌ Unexpected connection error: {e}")
+            return False
+
+    def negotiate_protocol(self):
+        """Switch the Pico to binary frames if its firmware supports it"""
+        if self.use_binary and negotiate_binary(self.serial_connection):
+            self.binary_mode = True
+            print("⚡ Binary frame protocol enabled")
+        else:
+            if not self.use_binary:
+                request_json_mode(self.serial_connection)
+            self.binary_mode = False
+            print("📄 Using JSON line protocol")
+
+    def run(self, channel):
+        """Read data from Pico in the ingest thread
+
+        Returns when the link drops (unplugged, silent or failing) so the
+        channel supervisor can reconnect.
+        """
+        consecutive_errors = 0
+        max_errors = 10
+
+        splitter = FrameDecoder() if self.binary_mode else LineSplitter()
+        self.retired_totals = self.serial_totals()
+        self.reader = SerialReader(self.serial_connection, splitter)
+        reported_windows = 0
+        last_sample = time.time()
+
+        while self.running:
+            try:
+                if self.serial_connection and self.serial_connection.is_open:
+                    # One bulk read per poll; partial lines/frames carry over
+                    for item in self.reader.poll():
+                        if isinstance(item, str) and is_command_reply(item):
+                            rejected = self.commands.reply(item)
+                            if rejected:
+                                channel.publish_event('command', rejected)
+                            continue
+
+                        # Binary frames arrive already decoded and CRC-checked
+                        data = item if isinstance(item, Sample) else self.parse_line(item)
+                        if data:
+                            channel.publish_sample(data)
+                            channel.set_connected(True)
+                            consecutive_errors = 0
+                            last_sample = time.time()
+
+                            # First sample computed with a newly ACKed command
+                            for result in self.commands.sample_arrived():
+                                channel.publish_event('command', result)
+
+                    # New throughput numbers for /status
+                    if self.reader.windows != reported_windows:
+                        reported_windows = self.reader.windows
+                        channel.refresh_status()
+
+                    if time.time() - last_sample > SILENCE_TIMEOUT:
+                        print(f"❌ No data from Pico for {SILENCE_TIMEOUT:.0f}s")
+                        return
+
+                else:
+                    print("❌ Serial connection lost")
+                    return
+
+            except (serial.SerialException, OSError) as e:
+                if self.running:
+                    # Unplugged or reset - the port is gone until it re-enumerates
+                    print(f"❌ Serial connection lost: {e}")
+                return
+
+            except Exception as e:
+                if not self.running:
+                    break  # Port closed by stop()
+                consecutive_errors += 1
+                if consecutive_errors >= max_errors:
+                    print(f"❌ Too many consecutive errors ({consecutive_errors}), resetting connection")
+                    return
+                else:
+                    print(f"⚠️ Data read error: {e}")
+                    time.sleep(0.1)
+
+    def send_command(self, name, value):
+        """Write a tuning command to Isabel; the result arrives as a 'command' event"""
+        connection = self.serial_connection
+        if not (connection and connection.is_open and self.channel and self.channel.connected):
+            raise ConnectionError("Pico is not connected")
+        command, line = self.commands.sent(name, value)
+        with self.write_lock:
+            connection.write(line)
+            connection.flush()
+        return command
+
+    def close(self):
+        if self.serial_connection:
+            try:
+                self.serial_connection.close()
+            except (serial.SerialException, OSError):
+                pass  # Already gone with the device
+
+    def status(self):
+        return {
+            "pico_connected": bool(self.channel and self.channel.connected),
+            "port": self.serial_port,
+            "protocol": "binary" if self.binary_mode else "json",
+            "serial": self.reader.stats() if self.reader else None,
+            "commands": self.commands.stats(),
+        }
+
+    def serial_totals(self):
+        """Lifetime (bytes, lines, frames, CRC errors) across reconnects"""
+        reader = self.reader
+        if reader is None:
+            return self.retired_totals
+        current = (
+            reader.bytes_read + reader.window_bytes,
+            reader.lines_read + reader.window_lines,
+            reader.frames_read + reader.window_frames,
+            getattr(reader.splitter, 'crc_errors', 0),
+        )
+        return tuple(retired + now for retired, now in zip(self.retired_totals, current))
+
+    def collect_metrics(self):
+        serial_bytes, lines, frames, crc_errors = self.serial_totals()
+        commands = self.commands.stats()
+        return [
+            ('bridge_serial_bytes_total', 'counter', "Bytes read from the serial port", serial_bytes),
+            ('bridge_serial_lines_total', 'counter', "Text lines read from the serial port", lines),
+            ('bridge_serial_frames_total', 'counter', "Binary frames decoded", frames),
+            ('bridge_serial_crc_errors_total', 'counter', "Binary frames rejected by their CRC", crc_errors),
+            ('bridge_serial_backlog_bytes', 'gauge', "Largest unread serial backlog in the last window",
+             self.reader.max_backlog if self.reader else 0),
+            ('bridge_commands_sent_total', 'counter', "Tuning commands written to the Pico", commands["sent"]),
+            ('bridge_commands_lost_total', 'counter', "Tuning commands never acknowledged", commands["lost"]),
+        ]
+
+
+class SimulationSource(DataSource):
+    """Isabel's PID loop driving a simulated cart (pid_simulator.py), in real time
+
+    Samples carry Isabel's fields and timing, and /ws tuning commands change
+    the simulated controller exactly as they would change the Pico's. Without
+    numpy, a sine-wave cart stands in so the demo servers still run.
+    """
+
+    kind = 'simulation'
+    simulated = True
+    accepts_commands = True
+
+    def __init__(self, interval=None, name=None, seed=None):
+        super().__init__(name or 'sim')
+        self.interval = interval  # None: pace at the simulated loop time
+        self.gains = dict(ISABEL_GAINS)
+        self.setpoint_override = None
+        if pid_simulator:
+            self.model = pid_simulator.IsabelSimulation(seed=seed)
+        else:
+            print("⚠️ numpy not installed - simulating with a simple sine-wave cart")
+            self.model = None
+            self.sim_time = 0.0
+            self.error_sum = 0.0
+            self.last_error = 0.0
+        self.commands = CommandTracker()
+        self.inbox = collections.deque()  # Command lines, like Isabel's stdin
+
+    def desired_position(self):
+        """Setpoint override, else the simulated potentiometer's position"""
+        if self.setpoint_override is not None:
+            return self.setpoint_override
+        if self.model is None:
+            return 15 + 10 * math.sin(self.sim_time * 0.1)
+        return float(pid_simulator.setpoint_at(self.model.time[0], period=pid_simulator.PROFILE_PERIOD))
+
+    def apply_commands(self):
+        """Apply queued commands between loops, as Isabel does; True if any"""
+        applied = bool(self.inbox)
+        while self.inbox:
+            line = self.inbox.popleft()
+            command_id, assignment = line[len(COMMAND_PREFIX):].split(':', 1)
+            name, value = assignment.split('=', 1)
+            if name == 'setpoint':
+                self.setpoint_override = None if value == 'pot' else float(value)
+            else:
+                self.gains[name] = float(value)
+                if self.model is not None:
+                    target = {'Kp': self.model.kp, 'Ki': self.model.ki, 'Kd': self.model.kd, 'base': self.model.base}
+                    target[name][:] = float(value)
+            self.commands.reply(f"{COMMAND_ACK_PREFIX}{command_id}:{assignment}")
+        return applied
+
+    def generate_sample(self):
+        """Run one controller loop; returns (sample, loop time in seconds)"""
+        if self.model is None:
+            return self.generate_sine_sample()
+        started = self.model.time[0]
+        step = self.model.step(self.desired_position())
+        sample = Sample(
+            int(self.model.time[0] * 1e6) % TICKS_PERIOD,  # ticks_us
+            float(step["desired_position"][0]),
+            round(float(step["current_position"][0]), 2),
+            float(step["servo_command"][0]),
+            *(round(float(step[field][0]), 4) for field in ("error", "P_output", "I_output", "D_output"))
+        )
+        return sample, self.model.time[0] - started
+
+    def generate_sine_sample(self):
+        """numpy-free stand-in: a sine-wave cart run through Isabel's PID terms"""
+        self.sim_time += FALLBACK_LOOP_PERIOD
+        desired = self.desired_position()
+        actual = desired + 2 * math.sin(self.sim_time * 0.3) + 0.5 * math.sin(self.sim_time)
+        error = desired - actual
+        self.error_sum += error * FALLBACK_LOOP_PERIOD
+        p_output = self.gains['Kp'] * error
+        i_output = self.gains['Ki'] * self.error_sum
+        d_output = self.gains['Kd'] * (error - self.last_error) / FALLBACK_LOOP_PERIOD
+        self.last_error = error
+        servo = max(0.18, min(0.90, round(self.gains['base'] - (p_output + i_output + d_output), 2)))
+        sample = Sample(
+            int(self.sim_time * 1e6) % TICKS_PERIOD,  # ticks_us
+            round(desired, 1), round(actual, 2), servo, round(error, 4),
+            round(p_output, 4), round(i_output, 4), round(d_output, 4),
+        )
+        return sample, FALLBACK_LOOP_PERIOD
+
+    def send_command(self, name, value):
+        """Queue a tuning command for the simulated controller"""
+        if not (self.channel and self.channel.connected):
+            raise ConnectionError("Simulation is not running")
+        command, line = self.commands.sent(name, value)
+        self.inbox.append(line.decode().strip())
+        return command
+
+    def run(self, channel):
+        channel.set_connected(True)
+        next_loop = time.perf_counter()
+        while self.running:
+            if self.apply_commands():
+                channel.refresh_status()  # New gains for /status
+            sample, loop_time = self.generate_sample()
+            channel.publish_sample(sample)
+            for result in self.commands.sample_arrived():
+                channel.publish_event('command', result)
+
+            # Keep simulated time in step with the wall clock
+            next_loop += self.interval or loop_time
+            time.sleep(max(0.0, next_loop - time.perf_counter()))
+
+    def status(self):
+        return {
+            "pico_connected": False,
+            "gains": dict(self.gains),
+            "setpoint_override": self.setpoint_override,
+            "commands": self.commands.stats(),
+        }
+
+
+class StaticSource(DataSource):
+    """Publishes the same sample over and over (connection testing)"""
+
+    kind = 'static'
+
+    def __init__(self, sample, status_fields=None, interval=0.1, name=None):
+        super().__init__(name or 'test')
+        self.sample = Sample.coerce(sample)
+        self.status_fields = status_fields or {"pico_connected": False}
+        self.interval = interval
+
+    def run(self, channel):
+        channel.set_connected(True)
+        started = time.perf_counter()
+        while self.running:
+            ticks_us = int((time.perf_counter() - started) * 1e6) % TICKS_PERIOD
+            channel.publish_sample(self.sample._replace(timestamp=ticks_us))
+            time.sleep(self.interval)
+
+    def status(self):
+        return dict(self.status_fields)
+
+
+class TcpSource(DataSource):
+    """Reads DATA: lines from a Wi-Fi Pico serving a TCP socket"""
+
+    kind = 'tcp'
+    reconnectable = True
+
+    def __init__(self, host, port=DEFAULT_PICO_NETWORK_PORT, name=None):
+        super().__init__(name or 'tcp')
+        self.host = host
+        self.port = port
+        self.sock = None
+
+    def open(self):
+        try:
+            print(f"🔌 Connecting to Pico at {self.host}:{self.port}...")
+            self.sock = socket.create_connection((self.host, self.port), timeout=15)
+            self.sock.settimeout(1)  # Wake up to notice shutdown
+            print("✅ Connected to Pico!")
+            return True
+        except OSError as e:
+            print(f"❌ Cannot connect: {e}")
+            return False
+
+    def run(self, channel):
+        splitter = LineSplitter()
+        while self.running:
+            try:
+                chunk = self.sock.recv(4096)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                print(f"❌ TCP receive error: {e}")
+                break
+
+            if not chunk:
+                print("❌ Pico closed the TCP connection")
+                break
+            for line in splitter.feed(chunk):
+                data = self.parse_line(line)
+                if data:
+                    channel.publish_sample(data)
+                    channel.set_connected(True)
+
+    def reopen(self):
+        self.close()
+        return self.open()
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+
+    def status(self):
+        return {
+            "pico_connected": bool(self.channel and self.channel.connected),
+            "host": f"{self.host}:{self.port}",
+        }
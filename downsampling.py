@@ -0,0 +1,218 @@
+"""
+Downsampling - long /history windows as a few hundred points
+/history?from=&to=&points=N answers from the in-memory ring buffer and, for
+anything older than the ring holds, from the recordings of a recording
+bridge. The samples are reduced with NumPy before they are serialized:
+
+    method=minmax  (default) fixed-width time buckets with min, max and mean
+                   of every field - spikes survive, nothing is averaged away
+    method=lttb    Largest-Triangle-Three-Buckets: N real samples chosen to
+                   keep the shape of one field (field=current_position)
+
+from and to are host times (received_at, like since=); negative values are
+seconds before now, so from=-3600 is the last hour. A one-hour window of
+~100k samples comes back as a few hundred points in milliseconds.
+"""
+
+import math
+import time
+
+from sample_history import SAMPLE_FIELDS
+from telemetry_recorder import list_segments, load_segment
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Plain /history?since= works without it
+
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+DEFAULT_LTTB_FIELD = 'current_position'
+
+# Pico ticks_us timestamps aren't meaningful once aggregated
+DOWNSAMPLED_FIELDS = tuple(field for field in SAMPLE_FIELDS if field != 'timestamp')
+
+
+def window_from_memory(history, start, end, fields):
+    """Copy the ring buffer samples received in (start, end] into arrays"""
+    first, stop = history.between(start, end)
+    slots = np.arange(first, stop) % history.capacity
+    t = np.frombuffer(history.received_at)[slots]
+    columns = {field: np.frombuffer(history.columns[field])[slots] for field in fields}
+
+    # Drop anything the writer overwrote while we were copying
+    lapped = history.first_intact() - first
+    if lapped > 0:
+        t = t[lapped:]
+        columns = {field: values[lapped:] for field, values in columns.items()}
+    return t, columns
+
+
+def window_from_recordings(directory, start, end, fields):
+    """Samples received in (start, end] from a recordings directory"""
+    parts = []
+    for path in list_segments(directory):
+        try:
+            run = load_segment(path)
+        except (OSError, ValueError):
+            continue  # Not a segment, or still being created
+        if not len(run) or run['received_at'][-1] <= start or run['received_at'][0] > end:
+            continue
+        low, high = np.searchsorted(run['received_at'], [start, end], side='right')
+        if high > low:
+            parts.append(run[low:high])
+
+    # Gather only the wanted columns straight out of the memory maps
+    def column(name):
+        return np.concatenate([part[name] for part in parts]) if parts else np.empty(0)
+    return column('received_at'), {field: column(field) for field in fields}
+
+
+def load_window(channel, start, end, fields):
+    """Arrays for (start, end]: recordings for what the ring no longer holds"""
+    history = channel.history
+    oldest = history.oldest_received_at()
+    t, columns = window_from_memory(history, max(start, oldest or start), end, fields)
+    sources = ["memory"] if len(t) else []
+
+    if channel.recorder and (oldest is None or start < oldest):
+        older_t, older_columns = window_from_recordings(
+            channel.recorder.directory, start, min(end, oldest or end), fields
+        )
+        if len(older_t):
+            t = np.concatenate((older_t, t))
+            columns = {field: np.concatenate((older_columns[field], columns[field])) for field in fields}
+            sources.insert(0, "recordings")
+    return t, columns, sources
+
+
+def minmax_buckets(t, columns, start, end, points):
+    """Min, max and mean of every column in points equal time buckets
+
+    Empty buckets are left out; returns (bucket start times, sample counts,
+    {field: {"min", "max", "mean"}}).
+    """
+    width = (end - start) / points
+    bucket = np.minimum(((t - start) / width).astype(np.intp), points - 1)
+    starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    counts = np.diff(np.append(starts, len(t)))
+
+    stats = {}
+    for field, values in columns.items():
+        finite = np.isfinite(values)
+        if not len(values):
+            stats[field] = {"min": values, "max": values, "mean": values}
+            continue
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats[field] = {
+                # fmin/fmax skip NaN (missing fields) unless a bucket has nothing else
+                "min": np.fmin.reduceat(values, starts),
+                "max": np.fmax.reduceat(values, starts),
+                "mean": np.add.reduceat(np.where(finite, values, 0.0), starts)
+                / np.add.reduceat(finite, starts),
+            }
+    return start + bucket[starts] * width, counts, stats
+
+
+def lttb_indices(t, y, points):
+    """Indices of the points samples Largest-Triangle-Three-Buckets keeps"""
+    n = len(t)
+    if points >= n:
+        return np.arange(n)
+    if points < 3:
+        return np.array([0, n - 1][:points], dtype=np.intp)  # No buckets in between
+    y = np.where(np.isfinite(y), y, np.nanmean(y) if np.isfinite(y).any() else 0.0)
+
+    # First and last samples are always kept; the rest is split into points - 2 buckets
+    edges = np.append((np.arange(points - 1) * ((n - 2) / (points - 2))).astype(np.intp) + 1, n)
+    indices = np.empty(points, dtype=np.intp)
+    indices[0] = 0
+    indices[-1] = n - 1
+    selected = 0
+    for bucket in range(points - 2):
+        low, high = edges[bucket], edges[bucket + 1]
+        next_low, next_high = edges[bucket + 1], edges[bucket + 2]
+        next_t = t[next_low:next_high].mean()
+        next_y = y[next_low:next_high].mean()
+
+        # Triangle between the last kept point, each candidate and the next bucket's average
+        area = np.abs((t[selected] - next_t) * (y[low:high] - y[selected])
+                      - (t[selected] - t[low:high]) * (next_y - y[selected]))
+        selected = low + int(np.argmax(area))
+        indices[bucket + 1] = selected
+    return indices
+
+
+def to_list(values, digits=4):
+    """Rounded JSON-ready list with null for NaN"""
+    values = np.round(values, digits)
+    return [None if value != value else value for value in values.tolist()]
+
+
+def downsample(channel, start, end, points, method='minmax', fields=DOWNSAMPLED_FIELDS,
+               lttb_field=DEFAULT_LTTB_FIELD):
+    """/history response for (start, end] reduced to about points entries"""
+    t, columns, sources = load_window(channel, start, end, fields)
+    response = {
+        "from": start,
+        "to": end,
+        "method": method,
+        "raw_samples": len(t),
+        "sources": sources,
+    }
+
+    if method == 'lttb':
+        keep = lttb_indices(t, columns[lttb_field], points)
+        response["field"] = lttb_field
+        response["t"] = to_list(t[keep], 3)
+        response["fields"] = {field: to_list(values[keep]) for field, values in columns.items()}
+        return response
+
+    bucket_t, counts, stats = minmax_buckets(t, columns, start, end, points)
+    response["bucket_seconds"] = (end - start) / points
+    response["t"] = to_list(bucket_t, 3)
+    response["count"] = counts.tolist()
+    response["fields"] = {
+        field: {name: to_list(values) for name, values in field_stats.items()}
+        for field, field_stats in stats.items()
+    }
+    return response
+
+
+def serve_downsampled(handler, channel, query):
+    """Answer /history?from=&to=&points= for a channel"""
+    if np is None:
+        handler.send_error(501, "Downsampled history needs numpy (pip install numpy)")
+        return
+
+    now = time.time()
+    try:
+        end = float(query.get('to', now))
+        start = float(query['from']) if 'from' in query else None
+        points = int(query.get('points', DEFAULT_POINTS))
+    except ValueError:
+        handler.send_error(400, "from, to and points must be numbers")
+        return
+    if not math.isfinite(end) or (start is not None and not math.isfinite(start)):
+        handler.send_error(400, "from and to must be finite")
+        return
+    end = now + end if end < 0 else end
+    if start is None:
+        start = channel.history.oldest_received_at() or end
+    elif start < 0:
+        start = now + start
+
+    method = query.get('method', 'minmax')
+    lttb_field = query.get('field', DEFAULT_LTTB_FIELD)
+    fields = tuple(query['fields'].split(',')) if query.get('fields') else DOWNSAMPLED_FIELDS
+    if method not in ('minmax', 'lttb'):
+        handler.send_error(400, "method must be minmax or lttb")
+    elif not set(fields) <= set(DOWNSAMPLED_FIELDS) or lttb_field not in DOWNSAMPLED_FIELDS:
+        handler.send_error(400, f"fields must be among {', '.join(DOWNSAMPLED_FIELDS)}")
+    elif not start < end:
+        handler.send_error(400, "from must be before to")
+    else:
+        if method == 'lttb' and lttb_field not in fields:
+            fields += (lttb_field,)
+        points = max(1, min(points, MAX_POINTS))
+        handler.send_json(downsample(channel, start, end, points, method, fields, lttb_field))
@@ -0,0 +1,268 @@
+"""
+Gain Sweep - search Kp/Ki/Kd on the simulator instead of by trial and error
+Candidates run on pid_simulator.py in vectorized chunks spread over a
+ProcessPoolExecutor (one worker per core). Each one is scored on the
+setpoint-step profile with pid_analysis metrics, and every evaluated
+candidate goes into a CSV report ranked by cost:
+
+    python gain_sweep.py grid --kp 0:0.2:11 --ki 0:0.2:11 --kd 0:0.05:11
+    python gain_sweep.py random --samples 5000
+    python gain_sweep.py cmaes --generations 30 --population 64
+
+Cost (lower is better) = mean settling time, with UNSETTLED_PENALTY for a
+step that never settles, + OVERSHOOT_WEIGHT per % overshoot
++ ERROR_WEIGHT per cm of steady-state error.
+"""
+
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pid_simulator import DEFAULT_BASE, IsabelSimulation, analyze
+
+GAIN_NAMES = ('Kp', 'Ki', 'Kd')
+DEFAULT_RANGES = {'Kp': (0.0, 0.2, 11), 'Ki': (0.0, 0.2, 11), 'Kd': (0.0, 0.05, 11)}
+
+UNSETTLED_PENALTY = 10.0   # [sec] settling time charged for a step that never settles
+OVERSHOOT_WEIGHT = 0.05    # [sec per % overshoot]
+ERROR_WEIGHT = 1.0         # [sec per cm of steady-state error]
+
+MIN_CHUNK = 32             # Candidates per task; smaller batches waste the vectorization
+CHUNKS_PER_WORKER = 4      # Spare tasks so fast workers pick up slack
+
+METRIC_FIELDS = ('cost', 'rise_time', 'overshoot_percent', 'settling_time', 'steady_state_error',
+                 'iae', 'saturated_fraction', 'unsettled_steps')
+
+
+def parse_range(text):
+    """'0:0.2:11' -> (0.0, 0.2, 11); the count only matters for grids"""
+    parts = text.split(':')
+    try:
+        low, high = float(parts[0]), float(parts[1])
+        count = int(parts[2]) if len(parts) > 2 else 11
+    except (IndexError, ValueError):
+        raise argparse.ArgumentTypeError(f"expected LOW:HIGH[:COUNT], got '{text}'")
+    if high < low or count < 1:
+        raise argparse.ArgumentTypeError(f"empty range '{text}'")
+    return low, high, count
+
+
+def score(summary):
+    """Cost per candidate from pid_analysis.summarize output"""
+    steps = np.maximum(summary['steps'], 1)
+    unsettled = summary['unsettled_steps']
+    settled_mean = np.nan_to_num(summary['settling_time'], nan=0.0)
+    settling = (settled_mean * (steps - unsettled) + UNSETTLED_PENALTY * unsettled) / steps
+    overshoot = np.nan_to_num(summary['overshoot_percent'], nan=100.0)
+    error = np.abs(np.nan_to_num(summary['steady_state_error'], nan=UNSETTLED_PENALTY))
+    return settling + OVERSHOOT_WEIGHT * overshoot + ERROR_WEIGHT * error
+
+
+def evaluate_chunk(gains, base, duration, seed, repeats):
+    """Simulate one chunk of (Kp, Ki, Kd) rows; returns (rows, METRIC_FIELDS) metrics
+
+    Runs in a worker process. Repeat r of every candidate gets the same noise
+    (common random numbers drawn from seed), so costs don't depend on how
+    candidates are split into chunks or workers. With repeats > 1 the metrics
+    are averaged over that many noisy runs.
+    """
+    streams = np.tile(np.arange(repeats), len(gains))
+    gains = np.repeat(gains, repeats, axis=0)
+    sim = IsabelSimulation(gains[:, 0], gains[:, 1], gains[:, 2], base, seed=seed, streams=streams)
+    summary = analyze(sim.run(duration))
+    summary['cost'] = score(summary)
+
+    columns = []
+    for field in METRIC_FIELDS:
+        values = np.asarray(summary[field], dtype=float).reshape(-1, repeats)
+        finite = np.isfinite(values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns.append(np.where(finite, values, 0.0).sum(axis=1) / finite.sum(axis=1))
+    return np.column_stack(columns)
+
+
+class Evaluator:
+    """Scores batches of candidates on a process pool and keeps every result"""
+
+    def __init__(self, workers=None, base=DEFAULT_BASE, duration=30.0, seed=1, repeats=1):
+        self.workers = workers or os.cpu_count() or 1
+        self.base = base
+        self.duration = duration
+        self.seed = seed
+        self.repeats = repeats
+        self.pool = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+        self.gains = []
+        self.metrics = []
+        self.simulated_seconds = 0.0
+
+    def evaluate(self, gains):
+        """Costs for an (n, 3) array of candidates"""
+        gains = np.asarray(gains, dtype=float)
+        chunk = max(MIN_CHUNK, math.ceil(len(gains) / (self.workers * CHUNKS_PER_WORKER)))
+        chunks = [gains[start:start + chunk] for start in range(0, len(gains), chunk)]
+        args = (self.base, self.duration, self.seed, self.repeats)
+
+        if self.pool:
+            futures = [self.pool.submit(evaluate_chunk, part, *args) for part in chunks]
+            metrics = np.concatenate([future.result() for future in futures])
+        else:
+            metrics = np.concatenate([evaluate_chunk(part, *args) for part in chunks])
+
+        self.gains.append(gains)
+        self.metrics.append(metrics)
+        self.simulated_seconds += len(gains) * self.repeats * self.duration
+        return metrics[:, 0]
+
+    def results(self):
+        """All evaluated candidates, best first: (gains, metrics)"""
+        gains = np.concatenate(self.gains)
+        metrics = np.concatenate(self.metrics)
+        order = np.argsort(metrics[:, 0], kind='stable')
+        return gains[order], metrics[order]
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown()
+
+
+def grid_candidates(ranges):
+    """Every combination of the evenly spaced values in each range"""
+    axes = [np.linspace(*ranges[name]) for name in GAIN_NAMES]
+    return np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(GAIN_NAMES))
+
+
+def random_candidates(ranges, samples, rng):
+    """Uniform samples inside the ranges"""
+    low = np.array([ranges[name][0] for name in GAIN_NAMES])
+    high = np.array([ranges[name][1] for name in GAIN_NAMES])
+    return rng.uniform(low, high, size=(samples, len(GAIN_NAMES)))
+
+
+def cma_es(evaluator, ranges, generations, population, rng, sigma=0.3):
+    """CMA-ES over the ranges scaled to a unit box
+
+    Every generation is one batch, so the whole population is evaluated in
+    parallel (Nelder-Mead proposes one point at a time and can't be spread
+    over cores). Candidates are clipped to the ranges.
+    """
+    low = np.array([ranges[name][0] for name in GAIN_NAMES])
+    span = np.array([ranges[name][1] - ranges[name][0] for name in GAIN_NAMES])
+    n = len(GAIN_NAMES)
+
+    mu = population // 2
+    weights = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+    weights /= weights.sum()
+    mueff = 1.0 / np.sum(weights ** 2)
+    cc = (4 + mueff / n) / (n + 4 + 2 * mueff / n)
+    cs = (mueff + 2) / (n + mueff + 5)
+    c1 = 2 / ((n + 1.3) ** 2 + mueff)
+    cmu = min(1 - c1, 2 * (mueff - 2 + 1 / mueff) / ((n + 2) ** 2 + mueff))
+    damps = 1 + 2 * max(0.0, math.sqrt((mueff - 1) / (n + 1)) - 1) + cs
+    chi_n = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+    mean = np.full(n, 0.5)
+    pc = np.zeros(n)
+    ps = np.zeros(n)
+    covariance = np.eye(n)
+
+    for generation in range(generations):
+        eigenvalues, basis = np.linalg.eigh(covariance)
+        scales = np.sqrt(np.maximum(eigenvalues, 1e-20))
+        steps = (rng.standard_normal((population, n)) * scales) @ basis.T
+        unit = np.clip(mean + sigma * steps, 0.0, 1.0)
+        steps = (unit - mean) / sigma
+
+        costs = evaluator.evaluate(low + unit * span)
+        best = np.argsort(costs)[:mu]
+        step = weights @ steps[best]
+        mean = mean + sigma * step
+
+        inverse_root = basis @ np.diag(1 / scales) @ basis.T
+        ps = (1 - cs) * ps + math.sqrt(cs * (2 - cs) * mueff) * inverse_root @ step
+        correlated = np.linalg.norm(ps) / math.sqrt(1 - (1 - cs) ** (2 * (generation + 1))) / chi_n < 1.4 + 2 / (n + 1)
+        pc = (1 - cc) * pc + correlated * math.sqrt(cc * (2 - cc) * mueff) * step
+        covariance = ((1 - c1 - cmu) * covariance
+                      + c1 * (np.outer(pc, pc) + (1 - correlated) * cc * (2 - cc) * covariance)
+                      + cmu * (steps[best].T * weights) @ steps[best])
+        sigma *= math.exp((cs / damps) * (np.linalg.norm(ps) / chi_n - 1))
+
+        print(f"   generation {generation + 1}/{generations}: best {costs[best[0]]:.3f}, "
+              f"mean Kp={low[0] + mean[0] * span[0]:.4f} Ki={low[1] + mean[1] * span[1]:.4f} "
+              f"Kd={low[2] + mean[2] * span[2]:.4f}")
+
+
+def write_report(path, gains, metrics):
+    with open(path, 'w', newline='') as report:
+        writer = csv.writer(report)
+        writer.writerow(('rank',) + GAIN_NAMES + METRIC_FIELDS)
+        for rank, (row_gains, row_metrics) in enumerate(zip(gains, metrics), start=1):
+            writer.writerow([rank] + [f"{value:.6g}" for value in row_gains]
+                            + ["" if not np.isfinite(value) else f"{value:.4g}" for value in row_metrics])
+
+
+def print_ranking(gains, metrics, top):
+    print(f"{'rank':>4} {'Kp':>8} {'Ki':>8} {'Kd':>8} {'cost':>7} {'rise s':>7} {'over %':>7} "
+          f"{'settle s':>8} {'sse cm':>7} {'sat %':>6}")
+    for rank in range(min(top, len(gains))):
+        kp, ki, kd = gains[rank]
+        cost, rise, overshoot, settling, error, _, saturated, _ = metrics[rank]
+        print(f"{rank + 1:>4} {kp:>8.4f} {ki:>8.4f} {kd:>8.4f} {cost:>7.3f} {rise:>7.2f} {overshoot:>7.1f} "
+              f"{settling:>8.2f} {error:>7.2f} {saturated * 100:>6.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search Isabel's PID gains on the simulator")
+    parser.add_argument('method', choices=['grid', 'random', 'cmaes'])
+    for name in GAIN_NAMES:
+        low, high, count = DEFAULT_RANGES[name]
+        parser.add_argument(f'--{name.lower()}', type=parse_range, default=DEFAULT_RANGES[name],
+                            metavar='LOW:HIGH[:COUNT]', help=f"{name} range (default {low}:{high}:{count})")
+    parser.add_argument('--samples', type=int, default=2000, help="Candidates for random search")
+    parser.add_argument('--generations', type=int, default=30, help="CMA-ES generations")
+    parser.add_argument('--population', type=int, default=64, help="CMA-ES candidates per generation")
+    parser.add_argument('--base', type=float, default=DEFAULT_BASE, help="servo_base_position")
+    parser.add_argument('--duration', type=float, default=30.0, help="Simulated seconds per candidate")
+    parser.add_argument('--repeats', type=int, default=1, help="Noisy runs averaged per candidate")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=None, help="Processes (default: one per core)")
+    parser.add_argument('--report', default='gain_sweep_report.csv', help="Ranked CSV of every candidate")
+    parser.add_argument('--top', type=int, default=10, help="Candidates to print")
+    args = parser.parse_args()
+
+    ranges = {name: getattr(args, name.lower()) for name in GAIN_NAMES}
+    rng = np.random.default_rng(args.seed)
+    evaluator = Evaluator(args.workers, args.base, args.duration, args.seed, args.repeats)
+    print(f"🔍 {args.method} search on {evaluator.workers} worker(s)")
+
+    started = time.perf_counter()
+    try:
+        if args.method == 'grid':
+            evaluator.evaluate(grid_candidates(ranges))
+        elif args.method == 'random':
+            evaluator.evaluate(random_candidates(ranges, args.samples, rng))
+        else:
+            cma_es(evaluator, ranges, args.generations, max(args.population, 4), rng)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped - reporting what was evaluated")
+    finally:
+        evaluator.close()
+    elapsed = time.perf_counter() - started
+
+    if not evaluator.gains:
+        sys.exit(1)
+    gains, metrics = evaluator.results()
+    write_report(args.report, gains, metrics)
+    print(f"✅ {len(gains)} candidates in {elapsed:.1f}s "
+          f"({evaluator.simulated_seconds / elapsed:,.0f} simulated seconds per second)")
+    print(f"📄 Ranked report: {args.report}")
+    print_ranking(gains, metrics, args.top)
+
+
+if __name__ == "__main__":
+    main()
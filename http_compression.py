@@ -0,0 +1,175 @@
+"""
+HTTP Compression - negotiated gzip/deflate/Brotli for the dashboard and bridge
+server.py serves the dashboard files (index.html, index.js, style.css, ...)
+from a StaticAssetCache: every file is compressed once, in each encoding,
+when the server starts (and again only if the file changes on disk), and
+answered with a strong ETag so reloads revalidate with a 304.
+
+The bridge compresses large JSON on the fly (history windows, /data?after
+batches, /devices) once a body reaches COMPRESS_MIN_BYTES; small per-sample
+responses go out as they are.
+
+Brotli is used when the brotli package is installed and the browser offers
+it (browsers only send "br" over HTTPS or to localhost); gzip and deflate
+come from the standard library.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # gzip/deflate only
+
+# Server preference when the client accepts several
+ENCODINGS = ('br', 'gzip', 'deflate') if brotli else ('gzip', 'deflate')
+
+COMPRESS_MIN_BYTES = 1024   # Smaller bodies aren't worth the CPU or the header
+
+# Dynamic responses trade ratio for speed; static files are compressed once
+DYNAMIC_LEVEL = {'br': 4, 'gzip': 6, 'deflate': 6}
+STATIC_LEVEL = {'br': 11, 'gzip': 9, 'deflate': 9}
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'image/svg+xml',
+    'image/x-icon',
+    'image/vnd.microsoft.icon',
+)
+
+# Dashboard files kept precompressed by server.py
+STATIC_EXTENSIONS = ('.html', '.js', '.css', '.ico', '.svg', '.json')
+
+# Browsers revalidate every load; unchanged files cost one 304 round trip
+STATIC_CACHE_CONTROL = 'no-cache'
+
+ETAG_SUFFIXES = {None: '', 'br': '-br', 'gzip': '-gz', 'deflate': '-df'}
+
+
+def choose_encoding(accept_encoding, encodings=ENCODINGS):
+    """Best encoding the client accepts (by q-value, then our preference), or None"""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, parameters = item.partition(';')
+        quality = 1.0
+        parameters = parameters.strip()
+        if parameters.startswith('q='):
+            try:
+                quality = float(parameters[2:])
+            except ValueError:
+                quality = 0.0
+        if name.strip():
+            accepted[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body, encoding, levels=DYNAMIC_LEVEL):
+    """Compress a whole body; 'deflate' is the zlib format HTTP means by it"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=levels['br'])
+    if encoding == 'gzip':
+        return gzip.compress(body, levels['gzip'], mtime=0)
+    return zlib.compress(body, levels['deflate'])
+
+
+class StreamCompressor:
+    """Compress a chunked response piece by piece; each piece decodes on arrival"""
+
+    def __init__(self, encoding, levels=DYNAMIC_LEVEL):
+        self.encoding = encoding
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=levels['br'])
+        else:
+            # wbits 31 writes a gzip wrapper, 15 a zlib one
+            self.compressor = zlib.compressobj(levels[encoding], zlib.DEFLATED, 31 if encoding == 'gzip' else 15)
+
+    def compress(self, chunk):
+        if self.encoding == 'br':
+            return self.compressor.process(chunk) + self.compressor.flush()
+        return self.compressor.compress(chunk) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+
+class StaticAsset:
+    """One file's bytes in every worthwhile encoding, each with its own strong ETag"""
+
+    def __init__(self, path, content_type):
+        stat = os.stat(path)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.content_type = content_type
+        with open(path, 'rb') as f:
+            body = f.read()
+
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        self.variants = {None: (body, f'"{digest}"')}
+        if is_compressible(content_type):
+            for encoding in ENCODINGS:
+                compressed = compress(body, encoding, STATIC_LEVEL)
+                if len(compressed) < len(body):
+                    self.variants[encoding] = (compressed, f'"{digest}{ETAG_SUFFIXES[encoding]}"')
+        self.encodings = tuple(encoding for encoding in ENCODINGS if encoding in self.variants)
+
+    def variant(self, encoding):
+        """(body, etag) for an encoding from choose_encoding (None = identity)"""
+        return self.variants[encoding]
+
+
+class StaticAssetCache:
+    """Precompressed dashboard files, rebuilt only when a file changes"""
+
+    def __init__(self, directory, extensions=STATIC_EXTENSIONS):
+        self.directory = os.path.abspath(directory)
+        self.extensions = extensions
+        self.assets = {}
+        self.lock = threading.Lock()
+
+    def warm(self):
+        """Compress every dashboard file up front; returns how many"""
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path):
+                self.get(path)
+        return len(self.assets)
+
+    def get(self, path):
+        """The cached asset for a file path, or None if it isn't a cached type"""
+        path = os.path.abspath(path)
+        if os.path.dirname(path) != self.directory or not path.endswith(self.extensions):
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        asset = self.assets.get(path)
+        if asset is None or asset.signature != (stat.st_mtime_ns, stat.st_size):
+            # New or edited since it was compressed
+            try:
+                content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+                asset = StaticAsset(path, content_type)
+            except OSError:
+                return None
+            with self.lock:
+                self.assets[path] = asset
+        return asset
@@ -1,3 +1,7 @@
+// Computer A IP address - UPDATED with your actual IP
+const COMPUTER_A_IP = '172.28.0.181'; // Computer A's actual IP address
+const API_BASE = `http://${COMPUTER_A_IP}:9999`;
+
 class BluetoothDataMonitor {
     constructor() {
         this.device = null;
@@ -99,9 +103,10 @@ class BluetoothDataMonitor {
         this.updateValueWithAnimation(this.error, data.error.toFixed(2));
         
         // Update PID outputs
-        this.pOutput.textContent = data.P_output.toFixed(3);
-        this.iOutput.textContent = data.I_output.toFixed(3);
-        this.dOutput.textContent = data.D_output.toFixed(3);
+        // The bridge sends the schema's lower-case names; older bridges passed Isabel's through
+        this.pOutput.textContent = (data.p_output ?? data.P_output).toFixed(3);
+        this.iOutput.textContent = (data.i_output ?? data.I_output).toFixed(3);
+        this.dOutput.textContent = (data.d_output ?? data.D_output).toFixed(3);
     }
     
     updateValueWithAnimation(element, value) {
@@ -166,7 +171,14 @@ class BluetoothDataMonitor {
     }
     
     async disconnectLocal() {
+        // Close the push stream if active
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+        
         // Stop polling if active
+        this.pollingActive = false;
         if (this.pollingInterval) {
             clearInterval(this.pollingInterval);
             this.pollingInterval = null;
@@ -185,8 +197,8 @@ class BluetoothDataMonitor {
             this.updateConnectionStatus('connecting', 'Connecting to Computer A via Network...');
             this.connectLocalBtn.disabled = true;
             
-            // Start polling connection to Computer A
-            this.startNetworkPolling();
+            // Open push stream to Computer A (falls back to polling)
+            this.startNetworkStream();
             
         } catch (error) {
             console.error('Network connection failed:', error);
@@ -196,12 +208,149 @@ class BluetoothDataMonitor {
         }
     }
     
+    picoConnected(status) {
+        // Channel state, which every source has; bridges from before channels only sent pico_connected
+        return 'connected' in status ? status.connected : Boolean(status.pico_connected);
+    }
+
+    markNetworkConnected() {
+        if (!this.isConnected) {
+            this.isConnected = true;
+            this.updateConnectionStatus('connected', 'Monitoring Pico Hardware via Network');
+            this.connectLocalBtn.textContent = '🔌 Disconnect';
+            this.connectLocalBtn.disabled = false;
+            this.addLogEntry('✅ Connected to Pico hardware via Computer A - monitoring mode');
+        }
+    }
+    
+    startNetworkStream() {
+        // Browsers without EventSource use the polling loop
+        if (typeof EventSource === 'undefined') {
+            this.startNetworkPolling();
+            return;
+        }
+        
+        // One long-lived connection; the bridge pushes every sample as it arrives
+        const stream = new EventSource(`${API_BASE}/stream`);
+        this.eventSource = stream;
+        let streamOpened = false;
+        
+        stream.addEventListener('status', (event) => {
+            streamOpened = true;
+            const status = JSON.parse(event.data);
+            if (!this.picoConnected(status) && this.isConnected) {
+                this.addLogEntry('⚠️ Pico disconnected from Computer A');
+                this.updateConnectionStatus('connecting', 'Pico Disconnected');
+            }
+        });
+        
+        stream.addEventListener('sample', (event) => {
+            streamOpened = true;
+            this.handleLocalData(JSON.parse(event.data));
+            this.markNetworkConnected();
+        });
+        
+        stream.onerror = () => {
+            if (!streamOpened) {
+                // Bridge has no /stream endpoint (older server) - poll instead
+                stream.close();
+                this.eventSource = null;
+                this.startNetworkPolling();
+            } else if (this.isConnected) {
+                // EventSource reconnects on its own
+                this.addLogEntry('❌ Stream interrupted - reconnecting...');
+                this.updateConnectionStatus('connecting', 'Reconnecting...');
+            }
+        };
+    }
+    
     startNetworkPolling() {
-        // Computer A IP address - UPDATED with your actual IP
-        const COMPUTER_A_IP = '172.28.0.181'; // Computer A's actual IP address
-        const API_BASE = `http://${COMPUTER_A_IP}:9999`;
+        // Long-poll /live: status and the newest sample in one request, held
+        // open by the bridge until a newer sample (or status change) exists
+        this.pollingActive = true;
+        let lastSeq = -1;
+        let statusVersion = -1;
+        
+        const poll = async () => {
+            while (this.pollingActive) {
+                try {
+                    const response = await fetch(
+                        `${API_BASE}/live?after=${lastSeq}&status=${statusVersion}&wait=1000`,
+                        { method: 'GET', signal: AbortSignal.timeout(3000) }
+                    );
+                    
+                    if (response.status === 404) {
+                        // Older bridge without /live
+                        this.startLegacyPolling();
+                        return;
+                    }
+                    if (!response.ok) {
+                        throw new Error('Computer A not responding');
+                    }
+                    
+                    const live = await response.json();
+                    const statusChanged = live.status_version !== statusVersion;
+                    statusVersion = live.status_version;
+                    
+                    if (this.picoConnected(live.status)) {
+                        if (live.data && live.seq > lastSeq) {
+                            lastSeq = live.seq;
+                            this.handleLocalData(live.data);
+                            this.markNetworkConnected();
+                        }
+                    } else if (this.isConnected && statusChanged) {
+                        this.addLogEntry('⚠️ Pico disconnected from Computer A');
+                        this.updateConnectionStatus('connecting', 'Pico Disconnected');
+                    }
+                    
+                } catch (error) {
+                    if (!this.isConnected) {
+                        this.pollingActive = false;
+                        this.reportBridgeUnavailable();
+                        return;
+                    }
+                    this.addLogEntry(`❌ Connection lost: ${error.message}`);
+                    this.updateConnectionStatus('connecting', 'Reconnecting...');
+                    await new Promise(resolve => setTimeout(resolve, 1000));
+                }
+            }
+        };
+        poll();
         
-        // Connect to real hardware data from Computer A
+        // Set timeout for initial connection attempt
+        setTimeout(() => {
+            if (!this.isConnected && this.pollingActive) {
+                this.pollingActive = false;
+                this.reportConnectionTimeout();
+            }
+        }, 5000); // Give time for hardware connection
+    }
+    
+    reportBridgeUnavailable() {
+        console.log('Computer A bridge not available');
+        this.updateConnectionStatus('disconnected', 'Computer A Not Found');
+        this.connectLocalBtn.disabled = false;
+        this.addLogEntry('❌ Cannot connect to Computer A. Please check:');
+        this.addLogEntry(`   1. Computer A is running hardware_bridge.py`);
+        this.addLogEntry(`   2. Update COMPUTER_A_IP in index.js to Computer A's IP`);
+        this.addLogEntry(`   3. Both computers are on the same network`);
+        this.addLogEntry(`   4. Pico is connected to Computer A via USB`);
+    }
+    
+    reportConnectionTimeout() {
+        console.error('Network connection timeout');
+        this.updateConnectionStatus('disconnected', 'Computer A Required');
+        this.connectLocalBtn.disabled = false;
+        this.addLogEntry('❌ Unable to connect to Computer A. Please verify:');
+        this.addLogEntry('   1. Computer A IP address is correct in index.js');
+        this.addLogEntry('   2. Computer A is running hardware_bridge.py');
+        this.addLogEntry('   3. Pico is connected to Computer A via USB');
+        this.addLogEntry('   4. Isabel script is running on the Pico');
+        this.addLogEntry('⚠️ This system requires real hardware - no simulation mode');
+    }
+    
+    startLegacyPolling() {
+        // Separate /status and /data requests for bridges without /live
         const pollInterval = setInterval(async () => {
             try {
                 // Check connection status first
@@ -213,7 +362,7 @@ class BluetoothDataMonitor {
                 if (statusResponse.ok) {
                     const status = await statusResponse.json();
                     
-                    if (status.pico_connected) {
+                    if (this.picoConnected(status)) {
                         // Get real data from Pico
                         const dataResponse = await fetch(`${API_BASE}/data`, { 
                             method: 'GET',
@@ -223,14 +372,7 @@ class BluetoothDataMonitor {
                         if (dataResponse.ok) {
                             const data = await dataResponse.json();
                             this.handleLocalData(data);
-                            
-                            if (!this.isConnected) {
-                                this.isConnected = true;
-                                this.updateConnectionStatus('connected', 'Monitoring Pico Hardware via Network');
-                                this.connectLocalBtn.textContent = '🔌 Disconnect';
-                                this.connectLocalBtn.disabled = false;
-                                this.addLogEntry('✅ Connected to Pico hardware via Computer A - monitoring mode');
-                            }
+                            this.markNetworkConnected();
                         }
                     } else {
                         // Pico not connected
@@ -246,14 +388,7 @@ class BluetoothDataMonitor {
             } catch (error) {
                 // Connection failed
                 if (!this.isConnected) {
-                    console.log('Computer A bridge not available');
-                    this.updateConnectionStatus('disconnected', 'Computer A Not Found');
-                    this.connectLocalBtn.disabled = false;
-                    this.addLogEntry('❌ Cannot connect to Computer A. Please check:');
-                    this.addLogEntry(`   1. Computer A is running hardware_bridge.py`);
-                    this.addLogEntry(`   2. Update COMPUTER_A_IP in index.js to Computer A's IP`);
-                    this.addLogEntry(`   3. Both computers are on the same network`);
-                    this.addLogEntry(`   4. Pico is connected to Computer A via USB`);
+                    this.reportBridgeUnavailable();
                     clearInterval(pollInterval);
                 } else if (this.isConnected) {
                     this.addLogEntry(`❌ Connection lost: ${error.message}`);
@@ -267,15 +402,7 @@ class BluetoothDataMonitor {
         // Set timeout for initial connection attempt
         setTimeout(() => {
             if (!this.isConnected) {
-                console.error('Network connection timeout');
-                this.updateConnectionStatus('disconnected', 'Computer A Required');
-                this.connectLocalBtn.disabled = false;
-                this.addLogEntry('❌ Unable to connect to Computer A. Please verify:');
-                this.addLogEntry('   1. Computer A IP address is correct in index.js');
-                this.addLogEntry('   2. Computer A is running hardware_bridge.py');
-                this.addLogEntry('   3. Pico is connected to Computer A via USB');
-                this.addLogEntry('   4. Isabel script is running on the Pico');
-                this.addLogEntry('⚠️ This system requires real hardware - no simulation mode');
+                this.reportConnectionTimeout();
                 clearInterval(pollInterval);
             }
         }, 5000); // Give time for hardware connection
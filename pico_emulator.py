@@ -0,0 +1,308 @@
+"""
+Pico Emulator - a pseudo-terminal that behaves like the Pico's USB serial port
+Prints Isabel-style "DATA:{json}" lines (or binary frames once the bridge
+sends MODE:BIN) at any rate from 30 Hz to tens of kHz, answers live tuning
+commands, and can misbehave on purpose: garbage lines, writes cut in the
+middle of a line, bursts after a stall and unplug/replug cycles. The bridge's
+parser and reconnect logic can then be benchmarked and regression-tested
+without hardware (Linux/macOS only - it needs a pty).
+
+    python pico_emulator.py --rate 5000 --garbage 0.01 --partial 0.3
+    python bridge_core.py --source serial:/tmp/pico-emulator
+
+The emulated port is a symlink that follows the pty across disconnects, so
+the bridge reconnects to the same path.
+"""
+
+import argparse
+import math
+import os
+import random
+import time
+
+from pico_protocol import COMMAND_ACK_PREFIX, COMMAND_NAK_PREFIX, COMMAND_NAMES, FRAME_SYNC, encode_frame
+from sample_record import Sample
+
+try:
+    import tty
+except ImportError:
+    tty = None  # Windows has no pseudo-terminals
+
+DEFAULT_LINK = '/tmp/pico-emulator'
+DEFAULT_RATE = 30.0         # [Hz] Isabel's JSON loop rate
+
+TICK = 0.001                # [sec] output is generated and written once per tick
+OUTBOX_LIMIT = 4096         # Bytes held once the host stops reading (like the USB FIFO); newer samples are dropped
+TICKS_PERIOD = 1 << 30      # ticks_us wraps here on the Pico
+
+# Isabel's gains and setpoint, changeable with CMD: lines
+DEFAULT_SETTINGS = {'Kp': 0.06, 'Ki': 0.0558, 'Kd': 0.0161, 'base': 0.54, 'setpoint': None}
+
+JSON_TEMPLATE = (
+    'DATA:{"timestamp":%d,"desired_position":%.1f,"current_position":%.2f,"servo_command":%.2f,'
+    '"error":%.2f,"P_output":%.4f,"I_output":%.4f,"D_output":%.4f}\n'
+)
+
+DEBUG_LINES = (b"Loop overrun\n", b"Sensor timeout, reusing last reading\n", b"Isabel PID ready\n")
+
+
+class PicoEmulator:
+    def __init__(self, rate=DEFAULT_RATE, link=DEFAULT_LINK, binary_capable=True, garbage=0.0,
+                 partial=0.0, burst_every=0.0, burst_hold=0.2, disconnect_every=0.0, disconnect_for=2.0,
+                 seed=None, wall_clock=False):
+        self.rate = rate
+        self.link = link
+        self.binary_capable = binary_capable
+        self.garbage = garbage                  # Chance per sample of a garbage item before it
+        self.partial = partial                  # Chance per tick of writing only part of the output
+        self.burst_every = burst_every          # [sec] between output stalls (0 = never)
+        self.burst_hold = burst_hold            # [sec] each stall lasts; the backlog then goes out at once
+        self.disconnect_every = disconnect_every
+        self.disconnect_for = disconnect_for
+        self.random = random.Random(seed)
+        # Stamp samples with host time instead of time since boot, so a client on
+        # the same machine can measure sample-to-client latency (benchmarks/)
+        self.wall_clock = wall_clock
+
+        self.master = None
+        self.slave = None
+        self.binary = False
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.integral = 0.0
+        self.boot_time = time.perf_counter()
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self.host_reading = False   # Did the last write make progress?
+
+        # Totals
+        self.samples = 0
+        self.dropped = 0
+        self.garbage_items = 0
+        self.partial_writes = 0
+        self.bytes_written = 0
+        self.disconnects = 0
+
+    def open(self):
+        """Create a fresh pty (a Pico that just booted) and point the link at it"""
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        temporary = self.link + '.new'
+        if os.path.lexists(temporary):
+            os.remove(temporary)
+        os.symlink(os.ttyname(self.slave), temporary)
+        os.replace(temporary, self.link)  # Atomic, so the bridge never sees a missing link
+
+        self.binary = False
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.integral = 0.0
+        self.boot_time = time.perf_counter()
+        self.inbox.clear()
+        self.outbox.clear()
+        self.host_reading = False
+        print(f"📟 Emulated Pico on {self.link} -> {os.ttyname(self.slave)}")
+
+    def close(self):
+        """Unplug: the bridge's next read fails"""
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                os.close(fd)
+        self.master = self.slave = None
+
+    def sample(self, now):
+        """One loop of a ball rolling towards a setpoint that steps every 5 s"""
+        t = now - self.boot_time
+        settings = self.settings
+        desired = settings['setpoint'] if settings['setpoint'] is not None else (15.0 if int(t / 5) % 2 else 25.0)
+        current = desired + 3.0 * math.exp(-(t % 5)) * math.cos(6.0 * t) + self.random.gauss(0.0, 0.15)
+        error = desired - current
+        self.integral = max(-2.0, min(2.0, self.integral + error / self.rate))
+        p_output = settings['Kp'] * error
+        i_output = settings['Ki'] * self.integral
+        d_output = settings['Kd'] * 18.0 * math.exp(-(t % 5)) * math.sin(6.0 * t)
+        servo = max(0.18, min(0.90, round(settings['base'] - (p_output + i_output + d_output), 2)))
+        ticks = int((time.time() if self.wall_clock else t) * 1e6) % TICKS_PERIOD
+        return Sample(ticks, desired, current, servo, error, p_output, i_output, d_output)
+
+    def encode(self, sample):
+        if self.binary:
+            return encode_frame(sample)
+        return (JSON_TEMPLATE % sample).encode()
+
+    def garbage_item(self):
+        """Something a flaky link or a chatty script might put on the wire"""
+        kind = self.random.randrange(4)
+        if kind == 0:
+            return self.random.choice(DEBUG_LINES)
+        if kind == 1:
+            # A line cut short by a reset; the newline ends it early
+            line = JSON_TEMPLATE % self.sample(time.perf_counter())
+            return line[:self.random.randrange(5, len(line) - 1)].encode() + b'\n'
+        if kind == 2 and self.binary:
+            # A frame whose CRC doesn't match (sometimes with a stray sync inside)
+            frame = bytearray(encode_frame(self.sample(time.perf_counter())))
+            frame[self.random.randrange(3, len(frame))] ^= 0xFF
+            return bytes(frame)
+        noise = bytes(self.random.randrange(256) for _ in range(self.random.randrange(1, 40)))
+        return noise + (FRAME_SYNC if self.random.random() < 0.2 else b'') + b'\n'
+
+    def handle_input(self):
+        """Answer MODE: and CMD: lines the way Isabel does"""
+        try:
+            self.inbox += os.read(self.master, 4096)
+        except (BlockingIOError, OSError):
+            return
+        while b'\n' in self.inbox:
+            raw, _, rest = bytes(self.inbox).partition(b'\n')
+            self.inbox[:] = rest
+            line = raw.decode(errors='replace').strip()
+            if line == 'MODE:BIN' and self.binary_capable:
+                self.outbox += b"ACK:BIN\n"
+                self.binary = True
+            elif line == 'MODE:JSON' and self.binary_capable:
+                self.outbox += b"ACK:JSON\n"
+                self.binary = False
+            elif line.startswith('CMD:'):
+                self.outbox += self.apply_command(line[len('CMD:'):]).encode() + b'\n'
+
+    def apply_command(self, body):
+        """Isabel's apply_command: the same checks and the same ACK/NAK text"""
+        command_id, _, assignment = body.partition(':')
+        name, separator, value = assignment.partition('=')
+        if not command_id or not separator:
+            return f"{COMMAND_NAK_PREFIX}?:malformed"
+        if name == 'setpoint' and value == 'pot':
+            self.settings['setpoint'] = None
+            return f"{COMMAND_ACK_PREFIX}{command_id}:{assignment}"
+        try:
+            number = float(value)
+        except ValueError:
+            return f"{COMMAND_NAK_PREFIX}{command_id}:bad value"
+        if name not in COMMAND_NAMES or (name == 'base' and not 0.18 <= number <= 0.90):
+            return f"{COMMAND_NAK_PREFIX}{command_id}:invalid {name}"
+        self.settings[name] = number
+        return f"{COMMAND_ACK_PREFIX}{command_id}:{assignment}"
+
+    def generate(self, count, now):
+        """Append count samples (and any injected garbage) to the outbox"""
+        for _ in range(count):
+            if not self.host_reading and len(self.outbox) >= OUTBOX_LIMIT:
+                # Nobody is reading the port; like Isabel's print, the sample is lost
+                # (a burst's held-back output is kept - the host is still reading)
+                self.dropped += 1
+                continue
+            if self.garbage and self.random.random() < self.garbage:
+                self.outbox += self.garbage_item()
+                self.garbage_items += 1
+            self.outbox += self.encode(self.sample(now))
+            self.samples += 1
+
+    def flush(self):
+        """Write what the pty will take, sometimes deliberately only part of it"""
+        if not self.outbox:
+            return
+        size = len(self.outbox)
+        if self.partial and size > 1 and self.random.random() < self.partial:
+            size = self.random.randrange(1, size)
+            self.partial_writes += 1
+        try:
+            written = os.write(self.master, self.outbox[:size])
+        except (BlockingIOError, OSError):
+            self.host_reading = False  # pty buffer full; try again next tick
+            return
+        self.host_reading = True
+        del self.outbox[:written]
+        self.bytes_written += written
+
+    def stalled(self, elapsed):
+        """True during a burst's hold window"""
+        return bool(self.burst_every) and elapsed % self.burst_every >= self.burst_every - self.burst_hold
+
+    def run(self, duration=None):
+        self.open()
+        started = time.perf_counter()
+        generated = 0           # Samples due since started, including dropped ones
+        next_report = started + 1.0
+        reported = (0, 0)
+        next_disconnect = started + self.disconnect_every if self.disconnect_every else None
+
+        while duration is None or time.perf_counter() - started < duration:
+            now = time.perf_counter()
+            if next_disconnect and now >= next_disconnect:
+                self.close()
+                self.disconnects += 1
+                print(f"🔌 Unplugged for {self.disconnect_for:.1f}s (disconnect #{self.disconnects})")
+                time.sleep(self.disconnect_for)
+                self.open()
+                # No samples while unplugged
+                now = time.perf_counter()
+                generated = int((now - started) * self.rate)
+                next_disconnect = now + self.disconnect_every
+
+            self.handle_input()
+            due = int((now - started) * self.rate) - generated
+            if due > 0:
+                self.generate(due, now)
+                generated += due
+            if not self.stalled(now - started):
+                self.flush()
+
+            if now >= next_report:
+                samples, written = self.samples - reported[0], self.bytes_written - reported[1]
+                print(f"📊 {samples} samples/s  {written / 1024:.1f} KB/s  "
+                      f"{'binary' if self.binary else 'json'}  dropped {self.dropped}  "
+                      f"garbage {self.garbage_items}  partial writes {self.partial_writes}")
+                reported = (self.samples, self.bytes_written)
+                next_report += 1.0
+            time.sleep(max(0.0, TICK - (time.perf_counter() - now)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulate the Pico's USB serial output on a pseudo-terminal")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="Samples per second (30 to tens of thousands)")
+    parser.add_argument('--link', default=DEFAULT_LINK, help="Path of the emulated serial port")
+    parser.add_argument('--json-only', action='store_true', help="Ignore MODE:BIN, like older Isabel firmware")
+    parser.add_argument('--garbage', type=float, default=0.0, help="Chance per sample of a garbage line or frame")
+    parser.add_argument('--partial', type=float, default=0.0, help="Chance per write of sending only part of it")
+    parser.add_argument('--burst-every', type=float, default=0.0, help="Seconds between output stalls")
+    parser.add_argument('--burst-hold', type=float, default=0.2, help="Seconds each stall holds output back")
+    parser.add_argument('--disconnect-every', type=float, default=0.0, help="Seconds between unplugs")
+    parser.add_argument('--disconnect-for', type=float, default=2.0, help="Seconds each unplug lasts")
+    parser.add_argument('--duration', type=float, help="Stop after this many seconds")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--wall-clock', action='store_true',
+                        help="Timestamp samples with host time (wrapped like ticks_us) for latency measurements")
+    args = parser.parse_args()
+
+    if tty is None or not hasattr(os, 'openpty'):
+        parser.error("the emulator needs pseudo-terminals (Linux or macOS)")
+    if args.rate <= 0:
+        parser.error("--rate must be positive")
+
+    emulator = PicoEmulator(
+        rate=args.rate,
+        link=args.link,
+        binary_capable=not args.json_only,
+        garbage=args.garbage,
+        partial=args.partial,
+        burst_every=args.burst_every,
+        burst_hold=args.burst_hold,
+        disconnect_every=args.disconnect_every,
+        disconnect_for=args.disconnect_for,
+        seed=args.seed,
+        wall_clock=args.wall_clock,
+    )
+    try:
+        emulator.run(args.duration)
+    except KeyboardInterrupt:
+        print("\n🛑 Emulator stopped")
+    finally:
+        emulator.close()
+        if os.path.islink(args.link):
+            os.remove(args.link)
+        print(f"   {emulator.samples} samples, {emulator.dropped} dropped, "
+              f"{emulator.bytes_written / 1e6:.1f} MB written, {emulator.disconnects} disconnects")
+
+
+if __name__ == "__main__":
+    main()
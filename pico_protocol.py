@@ -0,0 +1,274 @@
+"""
+Pico Protocol - compact binary frames between the Isabel firmware and the bridge
+The Pico prints "DATA:{json}" lines by default. When the bridge sends
+"MODE:BIN" at connect time, Isabel answers "ACK:BIN" and switches to
+fixed-size frames; firmware that never answers keeps the JSON format.
+
+Frame layout (37 bytes vs ~200 for a JSON line):
+    A5 5A           sync
+    LEN             payload length (1 byte)
+    payload         <I7f: timestamp (ticks_us), desired, current, servo,
+                    error, P_output, I_output, D_output
+    CRC             CRC-16/CCITT-FALSE of LEN + payload, little-endian
+
+Live tuning commands go the other way as text lines. The bridge writes
+"CMD:<id>:<name>=<value>"; Isabel applies it at the top of its next loop and
+answers "ACK:CMD:<id>:<name>=<value>" (or "NAK:CMD:<id>:<reason>"). The
+answer is written before that loop's sample, so the first sample after the
+ACK is the first one computed with the new value.
+"""
+
+import binascii
+import collections
+import math
+import struct
+import threading
+import time
+
+from sample_record import Sample
+
+FRAME_SYNC = b'\xa5\x5a'
+FRAME_FORMAT = struct.Struct('<I7f')
+# Isabel's names for the payload values - the same order as SAMPLE_FIELDS,
+# so a decoded frame becomes a Sample without renaming anything
+FRAME_FIELDS = (
+    'timestamp',
+    'desired_position',
+    'current_position',
+    'servo_command',
+    'error',
+    'P_output',
+    'I_output',
+    'D_output',
+)
+HEADER_SIZE = len(FRAME_SYNC) + 1
+CRC_SIZE = 2
+FRAME_SIZE = HEADER_SIZE + FRAME_FORMAT.size + CRC_SIZE
+
+# Text lines are bounded so a missing newline can't grow the buffer forever
+MAX_LINE_LENGTH = 512
+
+MODE_BINARY_COMMAND = b"MODE:BIN\n"
+MODE_BINARY_ACK = b"ACK:BIN"
+MODE_JSON_COMMAND = b"MODE:JSON\n"
+
+# Values Isabel lets the bridge change ("base" is servo_base_position;
+# setpoint overrides the potentiometer until set back to "pot")
+COMMAND_NAMES = ('Kp', 'Ki', 'Kd', 'base', 'setpoint')
+COMMAND_PREFIX = "CMD:"
+COMMAND_ACK_PREFIX = "ACK:CMD:"
+COMMAND_NAK_PREFIX = "NAK:CMD:"
+COMMAND_TIMEOUT = 2.0  # [sec] without an ACK before a command counts as lost
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE (same table-driven CRC the Isabel firmware uses)"""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode_frame(sample):
+    """Pack a Sample (or sample dict) into one binary frame"""
+    payload = FRAME_FORMAT.pack(*Sample.coerce(sample))
+    body = bytes([len(payload)]) + payload
+    return FRAME_SYNC + body + struct.pack('<H', crc16(body))
+
+
+class FrameDecoder:
+    """Incrementally split a byte stream into samples and text lines
+
+    feed() returns a list where each item is either a Sample (decoded
+    frame) or a str (text line such as an ACK or Pico debug print).
+    Corrupt frames are skipped one byte at a time until the next sync.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = 0
+        self.crc_errors = 0
+
+    def feed(self, data):
+        self.buffer += data
+        items = []
+        buffer = self.buffer
+        position = 0
+
+        while position < len(buffer):
+            if buffer.startswith(FRAME_SYNC, position):
+                if len(buffer) - position < HEADER_SIZE:
+                    break
+                length = buffer[position + 2]
+                end = position + HEADER_SIZE + length + CRC_SIZE
+                if end > len(buffer):
+                    break  # Wait for the rest of the frame
+
+                body = bytes(buffer[position + 2:end - CRC_SIZE])
+                expected, = struct.unpack_from('<H', buffer, end - CRC_SIZE)
+                if length == FRAME_FORMAT.size and crc16(body) == expected:
+                    values = FRAME_FORMAT.unpack_from(body, 1)
+                    items.append(Sample._make(values))
+                    self.frames += 1
+                    position = end
+                else:
+                    self.crc_errors += 1
+                    position += 1  # Resync on the next byte
+                continue
+
+            # Text up to the next newline or sync marker
+            newline = buffer.find(b'\n', position)
+            sync = buffer.find(FRAME_SYNC, position)
+            if newline == -1 or (sync != -1 and sync < newline):
+                if sync == -1:
+                    if len(buffer) - position > MAX_LINE_LENGTH:
+                        position = len(buffer)  # Unterminated garbage
+                    break
+                # Bytes before a sync are noise (e.g. mode switch mid-line)
+                position = sync
+                continue
+
+            line = bytes(buffer[position:newline]).decode(errors='replace').strip()
+            if line:
+                items.append(line)
+            position = newline + 1
+
+        del buffer[:position]
+        return items
+
+
+def negotiate_binary(connection, timeout=1.5):
+    """Ask the Pico to switch to binary frames; True if it acknowledged"""
+    try:
+        connection.write(MODE_BINARY_COMMAND)
+        connection.flush()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            line = connection.readline()
+            if MODE_BINARY_ACK in line:
+                return True
+    except Exception as e:
+        print(f"⚠️ Binary mode negotiation failed: {e}")
+    return False
+
+
+def request_json_mode(connection):
+    """Put a Pico left in binary mode by an earlier session back on JSON lines"""
+    try:
+        connection.write(MODE_JSON_COMMAND)
+        connection.flush()
+    except Exception as e:
+        print(f"⚠️ Could not request JSON mode: {e}")
+
+
+def encode_command(command_id, name, value):
+    """Encode one tuning command line; ValueError for anything Isabel would reject"""
+    if name not in COMMAND_NAMES:
+        raise ValueError(f"Unknown command '{name}' (expected one of {', '.join(COMMAND_NAMES)})")
+    if name == 'setpoint' and value == 'pot':
+        text = 'pot'
+    else:
+        number = float(value)
+        if not math.isfinite(number):
+            raise ValueError(f"{name} must be a finite number")
+        if name == 'base' and not 0.18 <= number <= 0.90:
+            raise ValueError("base must be within the servo limits 0.18-0.90")
+        text = repr(number)
+    return f"{COMMAND_PREFIX}{command_id}:{name}={text}\n".encode()
+
+
+def is_command_reply(line):
+    return line.startswith(COMMAND_ACK_PREFIX) or line.startswith(COMMAND_NAK_PREFIX)
+
+
+class CommandTracker:
+    """Follow tuning commands from send, to ACK, to the first sample using them
+
+    sent() is called on whichever thread writes the command; reply() and
+    sample_arrived() on the serial ingest thread.
+    """
+
+    def __init__(self, history=100, timeout=COMMAND_TIMEOUT):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.pending = {}          # id -> command waiting for its ACK
+        self.awaiting_sample = []  # ACKed, waiting for the next sample
+        self.round_trips = collections.deque(maxlen=history)  # [ms]
+
+        self.sent_count = 0
+        self.acked_count = 0
+        self.rejected_count = 0
+        self.lost_count = 0
+
+    def sent(self, name, value):
+        """Register a command about to be written; returns (command, encoded line)"""
+        with self.lock:
+            line = encode_command(self.next_id + 1, name, value)  # ValueError before anything is counted
+            self.next_id += 1
+            command = {"id": self.next_id, "name": name, "value": value, "sent_at": time.perf_counter()}
+            self.pending[command["id"]] = command
+            self.sent_count += 1
+            return command, line
+
+    def reply(self, line):
+        """Handle an ACK/NAK line; returns the command if it was rejected"""
+        accepted = line.startswith(COMMAND_ACK_PREFIX)
+        prefix = COMMAND_ACK_PREFIX if accepted else COMMAND_NAK_PREFIX
+        command_id, _, detail = line[len(prefix):].partition(':')
+        with self.lock:
+            command = self.pending.pop(int(command_id), None) if command_id.isdigit() else None
+            if command is None:
+                return None  # Late reply for a command already counted as lost
+            command["ack_ms"] = round((time.perf_counter() - command["sent_at"]) * 1000, 2)
+            if accepted:
+                self.acked_count += 1
+                self.awaiting_sample.append(command)
+                return None
+            self.rejected_count += 1
+        return self.finish(command, error=detail or "rejected")
+
+    def sample_arrived(self):
+        """Commands whose first affected sample just arrived (usually none)"""
+        if not self.awaiting_sample and not self.pending:
+            return ()
+        now = time.perf_counter()
+        finished = []
+        with self.lock:
+            for command in self.awaiting_sample:
+                round_trip = (now - command["sent_at"]) * 1000
+                self.round_trips.append(round_trip)
+                finished.append(self.finish(command, round_trip_ms=round(round_trip, 2)))
+            self.awaiting_sample = []
+
+            for command_id, command in list(self.pending.items()):
+                if now - command["sent_at"] > self.timeout:
+                    del self.pending[command_id]
+                    self.lost_count += 1
+                    finished.append(self.finish(command, error="no ACK from Pico"))
+        return finished
+
+    def finish(self, command, error=None, round_trip_ms=None):
+        result = {key: command[key] for key in ("id", "name", "value")}
+        result["ack_ms"] = command.get("ack_ms")
+        result["round_trip_ms"] = round_trip_ms
+        result["error"] = error
+        return result
+
+    def stats(self):
+        """Command counts and round-trip latency for /status"""
+        with self.lock:
+            # The ingest thread appends while /status is served
+            recent = list(self.round_trips)
+        round_trips = sorted(recent)
+        return {
+            "sent": self.sent_count,
+            "acked": self.acked_count,
+            "rejected": self.rejected_count,
+            "lost": self.lost_count,
+            "last_round_trip_ms": round(recent[-1], 2) if recent else None,
+            "p50_round_trip_ms": round(round_trips[len(round_trips) // 2], 2) if round_trips else None,
+            "max_round_trip_ms": round(round_trips[-1], 2) if round_trips else None,
+        }
+
+
+def looks_like_pico_output(raw_line):
+    """True for a JSON data line or a binary frame from the Isabel script"""
+    return b'{' in raw_line or b'DATA:' in raw_line or FRAME_SYNC in raw_line
@@ -0,0 +1,275 @@
+"""
+PID Analysis - step-response metrics for recorded runs
+Loads telemetry segments (telemetry_recorder.py) into NumPy arrays, splits
+them into step segments wherever the setpoint changes, and computes for
+every step at once:
+
+    rise time (10-90%), overshoot, settling time, steady-state error,
+    IAE / ISE, and the fraction of time the servo sat at Isabel's clamps
+
+Everything is computed with np.*.reduceat over segment boundaries, so many
+runs are concatenated and analysed in one pass instead of a Python loop per
+sample:
+
+    python pid_analysis.py recordings/kp006 recordings/kp008 recordings/kp010
+    python pid_analysis.py recordings --steps
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from telemetry_recorder import list_segments, load_segment
+
+# Servo clamps in Isabel
+SERVO_MIN = 0.18
+SERVO_MAX = 0.90
+SATURATION_TOLERANCE = 0.005
+
+RISE_LOW = 0.1
+RISE_HIGH = 0.9
+SETTLING_BAND = 0.05       # Fraction of the step size
+MIN_SETTLING_BAND = 0.5    # [cm] ultrasonic noise floor
+STEADY_STATE_TAIL = 0.2    # Last fraction of a segment averaged for steady-state error
+MIN_STEP_SIZE = 2.0        # [cm] smaller setpoint changes (pot jitter) aren't steps
+MIN_STEP_SECONDS = 0.5     # Segments shorter than this have no step metrics
+MAX_SAMPLE_GAP = 1.0       # [sec] longer gaps (dropouts) don't count towards integrals
+
+STEP_FIELDS = (
+    'run', 'start_time', 'duration', 'setpoint', 'step_size', 'is_step',
+    'rise_time', 'overshoot_percent', 'settling_time', 'steady_state_error',
+    'iae', 'ise', 'saturated_fraction',
+)
+
+
+def load_run(path):
+    """All samples of a run (one segment, or every segment in a directory)"""
+    paths = list_segments(path) if os.path.isdir(path) else [path]
+    if not paths:
+        raise FileNotFoundError(f"No telemetry segments in {path}")
+    return np.concatenate([np.asarray(load_segment(segment)) for segment in paths])
+
+
+def segment_starts(desired, run_starts):
+    """Indices where a setpoint change or a new run begins a segment"""
+    changes = np.flatnonzero(np.diff(desired) != 0) + 1
+    return np.union1d(changes, run_starts).astype(np.intp)
+
+
+def analyze_arrays(t, desired, current, servo, run_starts=(0,)):
+    """Per-segment metrics for concatenated runs
+
+    t is in seconds; run_starts are the indices where each run begins.
+    Returns a dict of equal-length arrays, one entry per segment (STEP_FIELDS).
+    """
+    t = np.asarray(t, dtype=float)
+    desired = np.asarray(desired, dtype=float)
+    current = np.asarray(current, dtype=float)
+    servo = np.asarray(servo, dtype=float)
+    run_starts = np.asarray(run_starts, dtype=np.intp)
+    n = len(t)
+    index = np.arange(n)
+
+    starts = segment_starts(desired, run_starts)
+    ends = np.append(starts[1:], n)
+    boundaries = np.zeros(n, dtype=np.intp)
+    boundaries[starts] = 1
+    segment = np.cumsum(boundaries) - 1
+    run = np.searchsorted(run_starts, starts, side='right') - 1
+
+    # Time each sample represents; nothing across run boundaries or dropouts
+    dt = np.diff(t, append=t[-1])
+    dt[run_starts[1:] - 1] = 0
+    valid = np.isfinite(desired) & np.isfinite(current)
+    dt = np.where(valid & (dt > 0) & (dt <= MAX_SAMPLE_GAP), dt, 0.0)
+
+    error = np.where(valid, desired - current, 0.0)
+    duration = np.add.reduceat(dt, starts)
+    iae = np.add.reduceat(np.abs(error) * dt, starts)
+    ise = np.add.reduceat(error * error * dt, starts)
+    saturated = (servo <= SERVO_MIN + SATURATION_TOLERANCE) | (servo >= SERVO_MAX - SATURATION_TOLERANCE)
+    saturated_time = np.add.reduceat(saturated * dt, starts)
+
+    # Response normalized to the step: 0 at the segment start, 1 at the new setpoint
+    setpoint = desired[starts]
+    start_position = current[starts]
+    step_size = setpoint - start_position
+    with np.errstate(divide='ignore', invalid='ignore'):
+        progress = (current - start_position[segment]) / step_size[segment]
+    progress = np.where(np.isfinite(progress), progress, -np.inf)
+
+    rise_low = np.minimum.reduceat(np.where(progress >= RISE_LOW, index, n), starts)
+    rise_high = np.minimum.reduceat(np.where(progress >= RISE_HIGH, index, n), starts)
+    rose = (rise_low < ends) & (rise_high < ends)
+    rise_time = np.where(rose, t[np.minimum(rise_high, n - 1)] - t[np.minimum(rise_low, n - 1)], np.nan)
+
+    peak = np.maximum.reduceat(progress, starts)
+    overshoot = np.where(np.isfinite(peak), np.maximum(peak - 1, 0) * 100, np.nan)
+
+    band = np.maximum(SETTLING_BAND * np.abs(step_size), MIN_SETTLING_BAND)
+    outside = valid & (np.abs(current - setpoint[segment]) > band[segment])
+    last_outside = np.maximum.reduceat(np.where(outside, index, -1), starts)
+    settled = last_outside < ends - 1
+    settle_index = np.clip(np.maximum(last_outside + 1, starts), 0, n - 1)
+    settling_time = np.where(settled, t[settle_index] - t[starts], np.nan)
+
+    tail = index >= (starts + ((ends - starts) * (1 - STEADY_STATE_TAIL)).astype(np.intp))[segment]
+    tail_count = np.add.reduceat(tail & valid, starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        steady_state_error = np.add.reduceat(np.where(tail, error, 0.0), starts) / tail_count
+        saturated_fraction = saturated_time / duration
+
+    # Only real setpoint changes of useful size get step metrics
+    is_step = ~np.isin(starts, run_starts) & (np.abs(step_size) >= MIN_STEP_SIZE) & (duration >= MIN_STEP_SECONDS)
+    not_step = ~is_step
+    for metric in (rise_time, overshoot, settling_time):
+        metric[not_step] = np.nan
+
+    return {
+        'run': run,
+        'start_time': t[starts],
+        'duration': duration,
+        'setpoint': setpoint,
+        'step_size': step_size,
+        'is_step': is_step,
+        'rise_time': rise_time,
+        'overshoot_percent': overshoot,
+        'settling_time': settling_time,
+        'steady_state_error': steady_state_error,
+        'iae': iae,
+        'ise': ise,
+        'saturated_fraction': saturated_fraction,
+    }
+
+
+def summarize(steps, run_count):
+    """Per-run totals and step-metric means (vectorized with bincount)"""
+    run = steps['run']
+    step_run = run[steps['is_step']]
+
+    def step_mean(metric):
+        values = steps[metric][steps['is_step']]
+        finite = np.isfinite(values)
+        total = np.bincount(step_run[finite], weights=values[finite], minlength=run_count)
+        count = np.bincount(step_run[finite], minlength=run_count)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return total / count
+
+    duration = np.bincount(run, weights=steps['duration'], minlength=run_count)
+    saturated = np.bincount(run, weights=np.nan_to_num(steps['saturated_fraction']) * steps['duration'],
+                            minlength=run_count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        saturated_fraction = saturated / duration
+
+    return {
+        'duration': duration,
+        'steps': np.bincount(step_run, minlength=run_count),
+        'unsettled_steps': np.bincount(step_run[np.isnan(steps['settling_time'][steps['is_step']])],
+                                       minlength=run_count),
+        'rise_time': step_mean('rise_time'),
+        'overshoot_percent': step_mean('overshoot_percent'),
+        'settling_time': step_mean('settling_time'),
+        'steady_state_error': step_mean('steady_state_error'),
+        'iae': np.bincount(run, weights=steps['iae'], minlength=run_count),
+        'ise': np.bincount(run, weights=steps['ise'], minlength=run_count),
+        'saturated_fraction': saturated_fraction,
+    }
+
+
+def analyze_runs(paths, time_field='received_at'):
+    """Analyse several recorded runs in one vectorized pass
+
+    Returns (steps, summary): per-segment metrics and per-run summaries,
+    both dicts of arrays. Recorded runs are timed by the bridge's
+    received_at; Pico ticks_us timestamps wrap and aren't comparable
+    across runs.
+    """
+    runs = [load_run(path) for path in paths]
+    lengths = [len(samples) for samples in runs]
+    if not all(lengths):
+        empty = [path for path, length in zip(paths, lengths) if not length]
+        raise ValueError(f"No samples in {', '.join(empty)}")
+    samples = np.concatenate(runs)
+    run_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    t = samples[time_field].astype(float)
+    if time_field == 'timestamp':
+        t = t / 1e6  # ticks_us
+    steps = analyze_arrays(t, samples['desired_position'], samples['current_position'],
+                           samples['servo_command'], run_starts)
+    return steps, summarize(steps, len(paths))
+
+
+def format_value(value, digits=2):
+    return "-" if not np.isfinite(value) else f"{value:.{digits}f}"
+
+
+def print_summary(paths, summary):
+    print(f"{'run':<28} {'steps':>5} {'rise s':>7} {'over %':>7} {'settle s':>8} "
+          f"{'sse cm':>7} {'IAE':>8} {'ISE':>9} {'sat %':>6}")
+    for index, path in enumerate(paths):
+        name = os.path.basename(os.path.normpath(path))[:28]
+        print(f"{name:<28} {summary['steps'][index]:>5} "
+              f"{format_value(summary['rise_time'][index]):>7} "
+              f"{format_value(summary['overshoot_percent'][index], 1):>7} "
+              f"{format_value(summary['settling_time'][index]):>8} "
+              f"{format_value(summary['steady_state_error'][index]):>7} "
+              f"{format_value(summary['iae'][index], 1):>8} "
+              f"{format_value(summary['ise'][index], 1):>9} "
+              f"{format_value(summary['saturated_fraction'][index] * 100, 1):>6}")
+
+
+def print_steps(paths, steps):
+    print(f"{'run':<20} {'t0 s':>8} {'step cm':>8} {'rise s':>7} {'over %':>7} {'settle s':>8} {'sse cm':>7}")
+    for index in np.flatnonzero(steps['is_step']):
+        name = os.path.basename(os.path.normpath(paths[steps['run'][index]]))[:20]
+        print(f"{name:<20} {steps['start_time'][index] - steps['start_time'][0]:>8.1f} "
+              f"{steps['step_size'][index]:>8.1f} "
+              f"{format_value(steps['rise_time'][index]):>7} "
+              f"{format_value(steps['overshoot_percent'][index], 1):>7} "
+              f"{format_value(steps['settling_time'][index]):>8} "
+              f"{format_value(steps['steady_state_error'][index]):>7}")
+
+
+def to_json(paths, steps, summary):
+    def clean(values):
+        return [None if isinstance(value, float) and not np.isfinite(value) else value
+                for value in values.tolist()]
+    columns = {key: clean(values) for key, values in summary.items()}
+    return {
+        "runs": [dict({"path": path}, **{key: values[index] for key, values in columns.items()})
+                 for index, path in enumerate(paths)],
+        "steps": {key: clean(values) for key, values in steps.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Step-response metrics for recorded PID runs")
+    parser.add_argument('runs', nargs='+', help="Segment file or recordings directory per run")
+    parser.add_argument('--steps', action='store_true', help="Also list every step")
+    parser.add_argument('--json', action='store_true', help="Print machine-readable JSON")
+    parser.add_argument('--time', choices=['received_at', 'timestamp'], default='received_at',
+                        help="Time base: bridge receive time or Pico ticks_us")
+    args = parser.parse_args()
+
+    try:
+        steps, summary = analyze_runs(args.runs, args.time)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.json:
+        json.dump(to_json(args.runs, steps, summary), sys.stdout, indent=2)
+        print()
+        return
+    print_summary(args.runs, summary)
+    if args.steps:
+        print()
+        print_steps(args.runs, steps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+PID Simulator - the Isabel control loop and a cart model on the computer
+Reproduces Isabel's controller step for step:
+- desired position from a simulated potentiometer (integer cm steps)
+- 3-sample moving average of the distance sensor
+- P, I (errorSum += error * dt) and D ((error - lastError) / dt) terms, with
+  dt measured the way ticks_us measures it, including the long first loop
+  after the warm-up sleep(1)
+- servo_command = round(base - (P + I + D), 2), clamped to 0.18-0.90
+
+The controller drives a cart on a track tilted by the servo (gravity along
+the slope, rolling friction, servo lag, end stops, sensor noise and
+dropouts).
+
+Every array holds one independent simulation per element, so thousands of
+gain combinations step together in NumPy, far faster than real time:
+
+    sim = IsabelSimulation(kp=[0.04, 0.06, 0.08], ki=0.0558, kd=0.016)
+    run = sim.run(duration=30)          # dict of (3, steps) arrays
+    python pid_simulator.py --kp 0.06 --ki 0.0558 --kd 0.016
+    python pid_simulator.py --batch 2000   # speed check with random gains
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+# Isabel's controller
+DEFAULT_KP = 0.06
+DEFAULT_KI = 0.0558139535
+DEFAULT_KD = 0.016125
+DEFAULT_BASE = 0.54
+SERVO_MIN = 0.18
+SERVO_MAX = 0.90
+AVERAGE_SAMPLES = 3
+
+# Isabel's loop timing: sleep + sensor read + printing, measured with ticks_us
+LOOP_PERIOD = 0.036        # [sec] JSON mode: sleep(0.03) plus ~6 ms of work
+LOOP_JITTER = 0.002        # [sec] standard deviation
+FIRST_LOOP_PERIOD = 1.12   # [sec] lastTime is taken before the warm-up and sleep(1)
+
+# Cart and track
+SERVO_LEVEL = 0.54         # Servo value that holds the track level
+SERVO_SWING = np.pi        # [rad] servo travel for values 0..1
+LEVER_RATIO = 0.12         # Track tilt per servo arm angle
+SERVO_TAU = 0.06           # [sec] servo response time constant
+GRAVITY = 981.0            # [cm/s^2]
+ROLLING_FACTOR = 0.7       # Share of g sin(tilt) that accelerates the cart
+FRICTION = 1.5             # [1/s] viscous rolling friction
+TRACK_MIN = 2.0            # [cm] end stops, measured from the sensor
+TRACK_MAX = 40.0
+START_POSITION = 15.0      # [cm]
+SENSOR_NOISE = 0.15        # [cm] standard deviation
+SENSOR_DROPOUT = 0.01      # Chance a reading returns None
+PLANT_SUBSTEP = 0.004      # [sec] integration step inside one loop
+
+# Simulated potentiometer: setpoint steps (time [sec], desired [cm])
+DEFAULT_PROFILE = ((0.0, 10), (6.0, 25), (14.0, 15), (22.0, 20))
+PROFILE_PERIOD = 30.0      # [sec] the live source repeats the profile
+
+
+def setpoint_at(times, profile=DEFAULT_PROFILE, period=None):
+    """Profile setpoint at each time; repeats every period seconds if given"""
+    step_times = np.array([step_time for step_time, _ in profile])
+    levels = np.array([level for _, level in profile], dtype=float)
+    if period:
+        times = np.mod(times, period)
+    return levels[np.searchsorted(step_times, times, side='right') - 1]
+
+
+class IsabelSimulation:
+    """A batch of independent Isabel loops, each with its own cart"""
+
+    def __init__(self, kp=DEFAULT_KP, ki=DEFAULT_KI, kd=DEFAULT_KD, base=DEFAULT_BASE,
+                 start_position=START_POSITION, noise=True, seed=None, streams=None):
+        self.kp, self.ki, self.kd, self.base = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (kp, ki, kd, base))
+        )
+        self.kp, self.ki, self.kd, self.base = (array.copy() for array in (self.kp, self.ki, self.kd, self.base))
+        self.size = len(self.kp)
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        # Noise stream per simulation: the same stream number gets the same sensor
+        # noise, dropouts and loop jitter (common random numbers for comparing
+        # gains). None gives every simulation its own noise.
+        self.streams = None if streams is None else np.asarray(streams, dtype=int)
+        self.stream_count = 0 if streams is None else int(self.streams.max()) + 1
+
+        # Plant
+        self.position = np.full(self.size, float(start_position))
+        self.velocity = np.zeros(self.size)
+        self.servo = np.full(self.size, SERVO_LEVEL)
+
+        # Controller state, as Isabel holds it after its warm-up
+        self.buffer = np.repeat(self.first_reading()[:, None], AVERAGE_SAMPLES, axis=1)
+        self.error_sum = np.zeros(self.size)
+        self.last_error = np.zeros(self.size)
+        self.servo_command = self.base.copy()
+        self.time = np.zeros(self.size)
+        self.steps = 0
+
+    def normal(self, scale):
+        if self.streams is None:
+            return self.rng.normal(0.0, scale, self.size)
+        return self.rng.normal(0.0, scale, self.stream_count)[self.streams]
+
+    def uniform(self):
+        if self.streams is None:
+            return self.rng.random(self.size)
+        return self.rng.random(self.stream_count)[self.streams]
+
+    def read_sensor(self):
+        """Distance readings rounded like round(ds.distance * 100, 1); NaN for None"""
+        reading = self.position
+        if self.noise:
+            reading = reading + self.normal(SENSOR_NOISE)
+            reading = np.where(self.uniform() < SENSOR_DROPOUT, np.nan, reading)
+        return np.round(reading, 1)
+
+    def first_reading(self):
+        """A valid reading per cart - Isabel's warm-up skips None readings"""
+        reading = self.read_sensor()
+        while np.isnan(reading).any():
+            retry = self.read_sensor()
+            reading = np.where(np.isnan(reading), retry, reading)
+        return reading
+
+    def loop_time(self):
+        """timeChange for this loop, as ticks_diff would measure it"""
+        if self.steps == 0:
+            return np.full(self.size, FIRST_LOOP_PERIOD)
+        if not self.noise:
+            return np.full(self.size, LOOP_PERIOD)
+        return np.maximum(LOOP_PERIOD + self.normal(LOOP_JITTER), 0.001)
+
+    def advance_plant(self, duration):
+        """Move the carts for one loop with the servo heading to the last command"""
+        substeps = max(1, int(np.ceil(duration.max() / PLANT_SUBSTEP)))
+        h = duration / substeps
+        servo_blend = 1.0 - np.exp(-h / SERVO_TAU)
+        for _ in range(substeps):
+            self.servo += (self.servo_command - self.servo) * servo_blend
+            tilt = (self.servo - SERVO_LEVEL) * SERVO_SWING * LEVER_RATIO
+            # Lower servo values tilt the track away from the sensor
+            acceleration = -GRAVITY * ROLLING_FACTOR * np.sin(tilt) - FRICTION * self.velocity
+            self.velocity += acceleration * h
+            self.position += self.velocity * h
+
+            # End stops
+            low = self.position < TRACK_MIN
+            high = self.position > TRACK_MAX
+            self.position = np.clip(self.position, TRACK_MIN, TRACK_MAX)
+            self.velocity = np.where(low | high, 0.0, self.velocity)
+
+    def step(self, desired):
+        """One pass of Isabel's while loop; returns that loop's sample arrays
+
+        desired is the setpoint Isabel would use (pot or override), per
+        simulation or one for all.
+        """
+        dt = self.loop_time()
+        self.advance_plant(dt)
+        self.time += dt
+        self.steps += 1
+
+        # 3-sample moving average; a None reading leaves the buffer alone
+        reading = self.read_sensor()
+        valid = ~np.isnan(reading)
+        self.buffer[valid] = np.roll(self.buffer[valid], -1, axis=1)
+        self.buffer[valid, -1] = reading[valid]
+        average = self.buffer.mean(axis=1)
+
+        error = desired - average
+        p_output = self.kp * error
+        self.error_sum += error * dt
+        i_output = self.ki * self.error_sum
+        d_output = self.kd * (error - self.last_error) / dt
+
+        command = np.round(self.base - (p_output + i_output + d_output), 2)
+        self.servo_command = np.clip(command, SERVO_MIN, SERVO_MAX)
+        self.last_error = error
+
+        return {
+            "time": self.time.copy(),
+            "desired_position": np.broadcast_to(np.asarray(desired, dtype=float), self.size).copy(),
+            "current_position": average,
+            "servo_command": self.servo_command.copy(),
+            "error": error,
+            "P_output": p_output,
+            "I_output": i_output,
+            "D_output": d_output,
+            "position": self.position.copy(),
+        }
+
+    def run(self, duration=30.0, profile=DEFAULT_PROFILE):
+        """Simulate every loop in the batch; returns dict of (batch, steps) arrays"""
+        steps = int(np.ceil((duration - FIRST_LOOP_PERIOD) / LOOP_PERIOD)) + 1
+
+        columns = None
+        for index in range(steps):
+            sample = self.step(setpoint_at(self.time, profile))
+            if columns is None:
+                columns = {key: np.empty((self.size, steps)) for key in sample}
+            for key, values in sample.items():
+                columns[key][:, index] = values
+        return columns
+
+
+def analyze(run):
+    """Step-response metrics (pid_analysis.summarize) for each simulation in a run"""
+    from pid_analysis import analyze_arrays, summarize
+
+    batch, steps = run["time"].shape
+    steps_metrics = analyze_arrays(
+        run["time"].ravel(),
+        run["desired_position"].ravel(),
+        run["current_position"].ravel(),
+        run["servo_command"].ravel(),
+        np.arange(batch) * steps,
+    )
+    return summarize(steps_metrics, batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate Isabel's PID loop on a cart model")
+    parser.add_argument('--kp', type=float, default=DEFAULT_KP)
+    parser.add_argument('--ki', type=float, default=DEFAULT_KI)
+    parser.add_argument('--kd', type=float, default=DEFAULT_KD)
+    parser.add_argument('--base', type=float, default=DEFAULT_BASE)
+    parser.add_argument('--duration', type=float, default=30.0, help="Simulated seconds")
+    parser.add_argument('--batch', type=int, default=0, help="Also time a batch of N random gain sets")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    sim = IsabelSimulation(args.kp, args.ki, args.kd, args.base, seed=args.seed)
+    summary = analyze(sim.run(args.duration))
+    print(f"🎯 Kp={args.kp} Ki={args.ki} Kd={args.kd} base={args.base}")
+    print(f"   rise {summary['rise_time'][0]:.2f}s  overshoot {summary['overshoot_percent'][0]:.1f}%  "
+          f"settling {summary['settling_time'][0]:.2f}s  steady-state error {summary['steady_state_error'][0]:.2f}cm")
+    print(f"   IAE {summary['iae'][0]:.1f}  ISE {summary['ise'][0]:.1f}  "
+          f"saturated {summary['saturated_fraction'][0] * 100:.1f}%  unsettled steps {summary['unsettled_steps'][0]}")
+
+    if args.batch:
+        rng = np.random.default_rng(args.seed)
+        gains = rng.uniform([0.0, 0.0, 0.0], [0.2, 0.2, 0.05], size=(args.batch, 3))
+        started = time.perf_counter()
+        IsabelSimulation(gains[:, 0], gains[:, 1], gains[:, 2], seed=args.seed).run(args.duration)
+        elapsed = time.perf_counter() - started
+        print(f"⚡ {args.batch} loops x {args.duration:.0f}s simulated in {elapsed:.2f}s "
+              f"({args.batch * args.duration / elapsed:,.0f}x real time in total)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Port Discovery - find Picos on the serial ports quickly
+Every port is probed at the same time under one overall deadline, and a
+probe returns as soon as it sees a line (or frame) of Pico output. Devices
+that answered before are remembered by USB fingerprint (VID/PID/serial
+number) in a small cache file and probed first, so a normal restart
+attaches without scanning anything else, even if the COM port number or
+/dev/ttyACM index changed.
+
+    python port_discovery.py          # list Picos and how long it took
+    python port_discovery.py --forget # clear the cache
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from pico_protocol import looks_like_pico_output
+
+try:
+    import serial
+    import serial.tools.list_ports
+except ImportError:
+    serial = None  # Callers check before discovering
+
+DEFAULT_BAUDRATE = 115200
+
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.pico_bridge_ports.json')
+
+PROBE_SECONDS = 1.5         # Longest one port is listened to
+DISCOVERY_DEADLINE = 2.0    # [sec] for the whole scan
+READ_TIMEOUT = 0.1          # Per read, so a probe notices its deadline
+
+
+def fingerprint(port):
+    """USB identity of a port that survives re-enumeration"""
+    return {
+        "vid": port.vid,
+        "pid": port.pid,
+        "serial_number": port.serial_number,
+        "device": port.device,
+    }
+
+
+def matches(port, known):
+    """True if a port is the device a cache entry describes"""
+    if port.vid is None or port.vid != known.get("vid") or port.pid != known.get("pid"):
+        return False
+    if port.serial_number or known.get("serial_number"):
+        return port.serial_number == known.get("serial_number")
+    # No serial number to go on - fall back to the device path
+    return port.device == known.get("device")
+
+
+def port_fingerprint(device):
+    """Fingerprint of a port by device path, or None if it isn't a USB port"""
+    for port in serial.tools.list_ports.comports():
+        if port.device == device and port.vid is not None:
+            return fingerprint(port)
+    return None
+
+
+def find_port_by_fingerprint(known):
+    """Current device path of a previously seen Pico (after a replug)"""
+    for port in serial.tools.list_ports.comports():
+        if matches(port, known):
+            return port.device
+    return None
+
+
+def load_cache(path=CACHE_PATH):
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+        return entries if isinstance(entries, list) else []
+    except (OSError, ValueError):
+        return []
+
+
+def save_cache(ports, path=CACHE_PATH):
+    """Remember the ports that answered, most recent first"""
+    entries = [fingerprint(port) for port in ports if port.vid is not None]
+    if not entries:
+        return
+    for known in load_cache(path):
+        if not any(entry["vid"] == known.get("vid") and entry["pid"] == known.get("pid")
+                   and entry["serial_number"] == known.get("serial_number") for entry in entries):
+            entries.append(known)
+    try:
+        with open(path, 'w') as f:
+            json.dump(entries[:16], f, indent=2)
+    except OSError as e:
+        print(f"⚠️ Could not save port cache: {e}")
+
+
+def probe_port(port, baudrate=DEFAULT_BAUDRATE, seconds=PROBE_SECONDS):
+    """Test if a port has Pico data, returning as soon as some arrives"""
+    deadline = time.time() + seconds
+    try:
+        with serial.Serial(port, baudrate, timeout=READ_TIMEOUT) as test_conn:
+            while time.time() < deadline:
+                line = test_conn.readline()
+                if line and looks_like_pico_output(line):
+                    print(f"✅ Found Pico data on {port}")
+                    return True
+            return False
+    except:
+        return False
+
+
+def probe_all(ports, baudrate, deadline, first_only):
+    """Probe ports concurrently; devices that answered, in the given order"""
+    if not ports:
+        return []
+    seconds = max(0.1, min(PROBE_SECONDS, deadline - time.time()))
+    pool = ThreadPoolExecutor(max_workers=len(ports), thread_name_prefix='probe')
+    futures = {pool.submit(probe_port, port.device, baudrate, seconds): port for port in ports}
+    pending = set(futures)
+    found = []
+    try:
+        while pending and time.time() < deadline:
+            done, pending = wait(pending, timeout=deadline - time.time(), return_when='FIRST_COMPLETED')
+            found.extend(futures[future] for future in done if future.result())
+            if first_only and found:
+                break
+    finally:
+        # Stragglers finish on their own within their probe time
+        pool.shutdown(wait=False)
+    return sorted(found, key=ports.index)
+
+
+def find_pico_ports(baudrate=DEFAULT_BAUDRATE, first_only=False, deadline=DISCOVERY_DEADLINE,
+                    cache_path=CACHE_PATH):
+    """Serial ports sending Pico output - cached devices first, then a parallel scan"""
+    started = time.time()
+    ports = list(serial.tools.list_ports.comports())
+    print(f"🔍 Scanning {len(ports)} available ports...")
+
+    # Devices that answered last time get the first go
+    cache = load_cache(cache_path)
+    cached = [port for port in ports if any(matches(port, known) for known in cache)]
+    found = probe_all(cached, baudrate, started + deadline, first_only)
+    if found and (first_only or len(found) == len(ports)):
+        print(f"⚡ Reattached to known Pico in {time.time() - started:.2f}s")
+        save_cache(found, cache_path)
+        return [port.device for port in found]
+
+    # Everything else at once (cached ports that stayed quiet already had their turn)
+    rest = [port for port in ports if port not in cached]
+    for port in rest:
+        print(f"   📍 {port.device} - {port.description}")
+    found += probe_all(rest, baudrate, started + deadline, first_only)
+
+    print(f"🔎 Found {len(found)} Pico(s) in {time.time() - started:.2f}s")
+    save_cache(found, cache_path)
+    return [port.device for port in found]
+
+
+def main():
+    if serial is None:
+        print("❌ pyserial not installed (pip install pyserial)")
+        return
+    if '--forget' in sys.argv:
+        if os.path.exists(CACHE_PATH):
+            os.remove(CACHE_PATH)
+        print(f"🧹 Cleared {CACHE_PATH}")
+        return
+    for device in find_pico_ports():
+        print(f"🎯 {device}")
+
+
+if __name__ == "__main__":
+    main()
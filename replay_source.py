@@ -0,0 +1,135 @@
+"""
+Replay Source - plays recorded telemetry back through the bridge
+Memory-maps segments written by telemetry_recorder.py and yields the real
+samples at their recorded pace, sped up (10x), or as fast as possible, so the
+dashboard and serving path can be exercised without a Pico.
+
+    python smart_bridge.py --replay recordings --speed 10
+    python bridge_core.py --source replay:recordings@10
+"""
+
+import mmap
+import os
+import time
+
+from data_sources import DataSource
+from sample_record import Sample
+from telemetry_recorder import (
+    HEADER_SIZE,
+    RECORD_COLUMNS,
+    RECORD_FORMAT,
+    list_segments,
+    read_header,
+)
+
+# Don't sleep for gaps shorter than this; at high speeds samples go out in bursts
+MIN_SLEEP = 0.001
+
+
+def parse_speed(value):
+    """'1', '10', '0.5' or 'max' (as fast as possible, returned as 0)"""
+    if value in ('max', 'fast', '0'):
+        return 0.0
+    speed = float(value)
+    if speed <= 0:
+        raise ValueError("speed must be positive or 'max'")
+    return speed
+
+
+class ReplaySource(DataSource):
+    """Plays recorded segments back as a bridge data source"""
+
+    kind = 'replay'
+
+    def __init__(self, path, speed=1.0, loop=False, name=None):
+        super().__init__(name)
+        # A directory replays every segment in it, oldest first
+        self.paths = list_segments(path) if os.path.isdir(path) else [path]
+        if not self.paths:
+            raise FileNotFoundError(f"No telemetry segments in {path}")
+        self.speed = speed
+        self.loop = loop
+
+        self.current_path = None
+        self.samples_replayed = 0
+        self.started_at = None
+        self.finished = False
+
+    def open_segment(self, path):
+        """Map a segment read-only and return (mmap, record count)"""
+        header = read_header(path)
+        if header['record_size'] != RECORD_FORMAT.size or header['columns'] != RECORD_COLUMNS:
+            raise ValueError(f"{path} was written with a different record layout")
+        count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_FORMAT.size
+        if count == 0:
+            return None, 0
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), count
+
+    def records(self):
+        """Yield (received_at, Sample) from every segment in order"""
+        while True:
+            for path in self.paths:
+                mapped, count = self.open_segment(path)
+                if not mapped:
+                    continue
+                self.current_path = path
+                try:
+                    for index in range(count):
+                        _, received_at, timestamp, *values = RECORD_FORMAT.unpack_from(
+                            mapped, HEADER_SIZE + index * RECORD_FORMAT.size
+                        )
+                        # -1 and NaN mark a field the original sample didn't have
+                        yield received_at, Sample(
+                            None if timestamp < 0 else timestamp,
+                            *(None if value != value else value for value in values)
+                        )
+                finally:
+                    mapped.close()
+            if not self.loop:
+                return
+
+    def samples(self, running=lambda: True):
+        """Yield samples paced by their recorded receive times divided by speed"""
+        self.started_at = time.time()
+        first_recorded = None
+        for received_at, sample in self.records():
+            if not running():
+                return
+            if self.speed:
+                if first_recorded is None or received_at < first_recorded:
+                    # First sample, or a looped/older segment - restart the clock
+                    first_recorded = received_at
+                    wall_start = time.time()
+                due = wall_start + (received_at - first_recorded) / self.speed
+                delay = due - time.time()
+                if delay > MIN_SLEEP:
+                    time.sleep(delay)
+            self.samples_replayed += 1
+            yield sample
+
+    def run(self, channel):
+        """Recorded samples take the same publish path as live Pico data"""
+        channel.set_connected(True)
+        last_refresh = time.time()
+        for data in self.samples(lambda: self.running):
+            channel.publish_sample(data)
+            if time.time() - last_refresh >= 2:
+                last_refresh = time.time()
+                channel.refresh_status()
+        self.finished = True
+        channel.refresh_status()
+        print(f"📼 Replay finished after {self.samples_replayed} samples")
+
+    def status(self):
+        return {"pico_connected": False, "replay": self.stats()}
+
+    def stats(self):
+        elapsed = time.time() - self.started_at if self.started_at else 0
+        return {
+            "file": self.current_path,
+            "speed": self.speed or "max",
+            "samples_replayed": self.samples_replayed,
+            "samples_per_sec": round(self.samples_replayed / elapsed, 1) if elapsed else 0.0,
+            "finished": self.finished,
+        }
@@ -0,0 +1,228 @@
+"""
+Sample History - fixed-capacity ring buffer of recent Pico samples
+Samples are stored in preallocated parallel array('d') columns so the bridge
+can answer /history?since=<timestamp>&limit=<n> and /data?after=<seq>, and
+let slow or reconnecting clients catch up on every sample they missed. Long windows are served
+downsampled from the same columns (downsampling.py).
+
+The serial thread is the only writer. Readers never take a lock: they copy
+the slots they need and then discard any slot the writer lapped meanwhile.
+"""
+
+import json
+import math
+import sys
+import time
+from array import array
+
+from sample_record import SAMPLE_FIELDS
+
+HISTORY_SECONDS = 600   # Keep the last 10 minutes
+MAX_SAMPLE_RATE = 50    # Samples/sec budget (Isabel runs at ~33 Hz)
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+
+# /data?after=<seq> response formats, chosen with Accept (or format=)
+BATCH_FORMATS = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'application/octet-stream': 'binary',
+}
+BATCH_CONTENT_TYPES = {name: content_type for content_type, name in BATCH_FORMATS.items()}
+NDJSON_CHUNK = 500  # Samples serialized per chunk of a streamed NDJSON response
+
+# Binary batches are column blocks of little-endian float64 in this order
+BINARY_COLUMNS = ('seq', 'received_at') + SAMPLE_FIELDS
+
+
+class SampleHistory:
+    def __init__(self, capacity=HISTORY_SECONDS * MAX_SAMPLE_RATE):
+        self.capacity = capacity
+        self.received_at = array('d', bytes(8 * capacity))
+        self.columns = {field: array('d', bytes(8 * capacity)) for field in SAMPLE_FIELDS}
+
+        # Total samples ever written; the newest sample has sequence count - 1
+        self.count = 0
+
+    def append(self, sample, received_at=None):
+        """Store one Sample (serial thread only)"""
+        slot = self.count % self.capacity
+        self.received_at[slot] = received_at if received_at is not None else time.time()
+        for column, value in zip(self.columns.values(), sample):
+            # Missing fields read back as null
+            column[slot] = math.nan if value is None else value
+        # Publish the slot only after it is fully written
+        self.count += 1
+        return self.count - 1
+
+    def oldest_sequence(self, count):
+        return max(0, count - self.capacity)
+
+    def first_intact(self):
+        """Oldest sequence a reader can trust after copying
+
+        The writer fills slot count % capacity before it bumps count, so that
+        slot (sequence count - capacity) may already hold a half-written
+        newer sample - treat it as lost too.
+        """
+        return self.oldest_sequence(self.count + 1)
+
+    def first_after(self, since, start, end):
+        """Binary search for the first sequence in [start, end) received after since"""
+        while start < end:
+            middle = (start + end) // 2
+            if self.received_at[middle % self.capacity] <= since:
+                start = middle + 1
+            else:
+                end = middle
+        return start
+
+    def between(self, start, end):
+        """Sequence range [first, stop) of the samples received in (start, end]"""
+        count = self.count
+        first = self.first_after(start, self.oldest_sequence(count), count)
+        return first, self.first_after(end, first, count)
+
+    def oldest_received_at(self):
+        """Host time of the oldest sample still held, or None when empty"""
+        count = self.count
+        if not count:
+            return None
+        return self.received_at[self.oldest_sequence(count) % self.capacity]
+
+    def after(self, after, limit=MAX_LIMIT):
+        """(first, stop, count, gap) for the samples with sequence > after
+
+        gap is True when some of them were already overwritten.
+        """
+        count = self.count
+        oldest = self.oldest_sequence(count)
+        first = max(after + 1, oldest)
+        return first, min(count, first + limit), count, after + 1 < oldest
+
+    def copy_slots(self, column, first, stop):
+        """Slots first..stop-1 of one column as a new array (the ring may wrap)"""
+        start = first % self.capacity
+        end = start + (stop - first)
+        if end <= self.capacity:
+            return column[start:end]
+        return column[start:] + column[:end - self.capacity]
+
+    def pack_columns(self, first, stop):
+        """Samples first..stop-1 as BINARY_COLUMNS blocks of little-endian float64"""
+        blocks = [array('d', range(first, stop)), self.copy_slots(self.received_at, first, stop)]
+        blocks += [self.copy_slots(column, first, stop) for column in self.columns.values()]
+        if sys.byteorder == 'big':
+            for block in blocks:
+                block.byteswap()
+        return b''.join(block.tobytes() for block in blocks)
+
+    def read(self, first, end):
+        """Copy samples first..end-1 out of the ring as dicts"""
+        samples = []
+        for seq in range(first, end):
+            slot = seq % self.capacity
+            sample = {'seq': seq, 'received_at': self.received_at[slot]}
+            for field, column in self.columns.items():
+                value = column[slot]
+                sample[field] = None if math.isnan(value) else value
+            if sample['timestamp'] is not None:
+                sample['timestamp'] = int(sample['timestamp'])  # ticks_us, an int as on /data
+            samples.append(sample)
+        return samples
+
+    def since(self, since=0.0, limit=DEFAULT_LIMIT):
+        """Samples received after the given host timestamp, oldest first"""
+        limit = max(1, min(limit, MAX_LIMIT))
+        count = self.count
+        oldest = self.oldest_sequence(count)
+        first = self.first_after(since, oldest, count)
+        samples = self.read(first, min(count, first + limit))
+
+        # Drop anything the writer overwrote while we were copying
+        lapped = self.first_intact()
+        samples = [sample for sample in samples if sample['seq'] >= lapped]
+
+        return {
+            "samples": samples,
+            "truncated": first + limit < count,
+            # The client asked for samples older than the buffer still holds
+            "gap": first == oldest and oldest > 0 and since > 0,
+            "latest_seq": count - 1,
+        }
+
+
+def serve_history(handler, history, query):
+    """Answer a /history request from the ring buffer"""
+    try:
+        since = float(query.get('since', 0))
+        limit = int(query.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        handler.send_error(400, "since and limit must be numbers")
+        return
+    handler.send_json(history.since(since, limit))
+
+
+def batch_format(accept, requested=None):
+    """'json', 'ndjson' or 'binary' from format= or the Accept header"""
+    if requested:
+        return requested
+    for media_type in accept.split(','):
+        name = BATCH_FORMATS.get(media_type.split(';')[0].strip())
+        if name:
+            return name
+    return 'json'
+
+
+def serve_samples_after(handler, history, query):
+    """Answer /data?after=<seq> with every newer sample in one response
+
+    The batch position travels in headers so all three formats share it:
+    X-Next-After is the seq to ask for next, X-Truncated says more are
+    waiting, X-Gap that samples after 'after' were already overwritten.
+    """
+    try:
+        after = int(query['after'])
+        limit = max(1, min(int(query.get('limit', MAX_LIMIT)), MAX_LIMIT))
+    except ValueError:
+        handler.send_error(400, "after and limit must be integers")
+        return
+    response_format = batch_format(handler.headers.get('Accept', ''), query.get('format'))
+    if response_format not in BATCH_CONTENT_TYPES:
+        handler.send_error(400, "format must be json, ndjson or binary")
+        return
+
+    first, stop, count, gap = history.after(after, limit)
+    headers = {
+        'X-Latest-Seq': str(count - 1),
+        'X-Next-After': str(stop - 1 if stop > first else after),
+        'X-Truncated': 'true' if stop < count else 'false',
+        'X-Gap': 'true' if gap else 'false',
+        'Cache-Control': 'no-store',
+        'Access-Control-Expose-Headers': 'X-Latest-Seq, X-Next-After, X-Truncated, X-Gap, X-Sample-Columns',
+    }
+
+    if response_format == 'binary':
+        body = history.pack_columns(first, stop)
+        lapped = history.first_intact()
+        if lapped > first:
+            # The writer overwrote the start of the batch mid-copy; send what is intact
+            first = min(lapped, stop)
+            body = history.pack_columns(first, stop)
+            headers['X-Gap'] = 'true'
+        headers['X-Sample-Columns'] = ','.join(BINARY_COLUMNS)
+        handler.send_body(body, BATCH_CONTENT_TYPES['binary'], headers=headers)
+
+    elif response_format == 'ndjson':
+        def lines():
+            for chunk_first in range(first, stop, NDJSON_CHUNK):
+                samples = history.read(chunk_first, min(stop, chunk_first + NDJSON_CHUNK))
+                lapped = history.first_intact()
+                yield ''.join(json.dumps(sample) + '\n' for sample in samples if sample['seq'] >= lapped).encode()
+        handler.send_chunked(lines(), BATCH_CONTENT_TYPES['ndjson'], headers)
+
+    else:
+        samples = history.read(first, stop)
+        lapped = history.first_intact()
+        samples = [sample for sample in samples if sample['seq'] >= lapped]
+        handler.send_body(json.dumps(samples).encode(), BATCH_CONTENT_TYPES['json'], headers=headers)
@@ -0,0 +1,99 @@
+"""
+Sample Record - the fixed telemetry schema shared by every part of the bridge
+A Sample is built once per Pico line (or binary frame) by the parser and then
+handed, unchanged, to /data, /history, /stream, the WebSocket channel and the
+recorder. It is a tuple underneath: no per-sample dict, no copies, nothing
+a consumer can modify by accident.
+
+Field names are normalized on the way in (Isabel's P_output becomes
+p_output), anything that isn't a number reads back as None, and fields
+outside the schema are dropped.
+"""
+
+import math
+from collections import namedtuple
+
+# Column layout shared by every bridge (lower-case PID names)
+SAMPLE_FIELDS = (
+    'timestamp',
+    'desired_position',
+    'current_position',
+    'servo_command',
+    'error',
+    'p_output',
+    'i_output',
+    'd_output',
+)
+
+SAMPLE_UNITS = {
+    'timestamp': 'us',             # Pico ticks_us, wraps and restarts with the Pico
+    'desired_position': 'cm',
+    'current_position': 'cm',
+    'servo_command': 'servo',      # Servo position, 0-1 of its travel
+    'error': 'cm',
+    'p_output': 'servo',           # PID terms are in servo command units
+    'i_output': 'servo',
+    'd_output': 'servo',
+}
+
+# The Isabel firmware sends upper-case PID term names
+FIELD_ALIASES = {
+    'P_output': 'p_output',
+    'I_output': 'i_output',
+    'D_output': 'd_output',
+}
+
+# (canonical name, name Isabel may send instead) for every field
+FIELD_LOOKUP = tuple(
+    (field, next((alias for alias, canonical in FIELD_ALIASES.items() if canonical == field), None))
+    for field in SAMPLE_FIELDS
+)
+
+# Served at /schema so clients needn't hard-code the layout
+SAMPLE_SCHEMA = {
+    "fields": list(SAMPLE_FIELDS),
+    "units": SAMPLE_UNITS,
+    "aliases": FIELD_ALIASES,
+}
+
+JSON_TEMPLATE = '{' + ', '.join(f'"{field}": %s' for field in SAMPLE_FIELDS) + '}'
+
+
+def number(value):
+    """A JSON value as a sample field: ints and floats pass, anything else is None"""
+    # type() rather than isinstance so JSON true/false aren't taken for 1/0
+    return value if type(value) is float or type(value) is int else None
+
+
+def json_number(value):
+    if value is None or not math.isfinite(value):
+        return 'null'
+    return repr(value)  # Same text json.dumps writes
+
+
+class Sample(namedtuple('SampleFields', SAMPLE_FIELDS)):
+    """One immutable sample in SAMPLE_FIELDS order"""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_mapping(cls, data):
+        """Normalize a parsed DATA: line (or any dict) into a Sample"""
+        get = data.get
+        return cls._make(
+            number(get(field) if alias is None or field in data else get(alias))
+            for field, alias in FIELD_LOOKUP
+        )
+
+    @classmethod
+    def coerce(cls, data):
+        """data itself if it is already a Sample, otherwise normalized"""
+        return data if isinstance(data, cls) else cls.from_mapping(data)
+
+    def to_dict(self):
+        """Plain dict with the canonical names (for JSON payloads)"""
+        return dict(zip(SAMPLE_FIELDS, self))
+
+    def to_json(self):
+        """Serialized JSON object, written without building a dict"""
+        return (JSON_TEMPLATE % tuple(map(json_number, self))).encode()
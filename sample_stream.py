@@ -0,0 +1,112 @@
+"""
+Sample Stream - Server-Sent Events push channel for the data bridges
+Each dashboard holds one long-lived /stream connection and receives every
+sample as soon as the bridge parses it, instead of polling /status and /data.
+"""
+
+import json
+import queue
+import threading
+
+
+def format_event(event, payload):
+    """Encode one Server-Sent Events message"""
+    return format_encoded_event(event, json.dumps(payload).encode())
+
+
+def format_encoded_event(event, body):
+    """Encode a Server-Sent Events message around an already serialized body"""
+    return b"event: " + event.encode() + b"\ndata: " + body + b"\n\n"
+
+
+class SampleBroadcaster:
+    """Fan out samples and status changes to every connected stream client
+
+    Each client picks an encoder for its wire format (SSE by default,
+    WebSocket frames for /ws); a message is encoded once per format in use.
+    """
+
+    def __init__(self, max_backlog=256):
+        self.max_backlog = max_backlog
+        self.clients = []
+        self.clients_lock = threading.Lock()
+        self.dropped_messages = 0
+
+    def subscribe(self, encoder=format_encoded_event):
+        """Register a new client and return its message queue"""
+        client = queue.Queue(maxsize=self.max_backlog)
+        with self.clients_lock:
+            self.clients.append((client, encoder))
+        return client
+
+    def unsubscribe(self, client):
+        """Remove a client queue once its connection closes"""
+        with self.clients_lock:
+            self.clients = [entry for entry in self.clients if entry[0] is not client]
+
+    def client_count(self):
+        with self.clients_lock:
+            return len(self.clients)
+
+    def publish(self, event, payload):
+        """Serialize once and queue the message for every client"""
+        if self.clients:
+            self.publish_encoded(event, json.dumps(payload).encode())
+
+    def publish_encoded(self, event, body):
+        """Queue an already serialized JSON body for every client"""
+        with self.clients_lock:
+            clients = list(self.clients)
+        if not clients:
+            return
+
+        messages = {}
+        for client, encoder in clients:
+            message = messages.get(encoder)
+            if message is None:
+                message = messages[encoder] = encoder(event, body)
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                # Slow client - drop its oldest message rather than block the reader
+                try:
+                    client.get_nowait()
+                except queue.Empty:
+                    pass
+                self.dropped_messages += 1
+                try:
+                    client.put_nowait(message)
+                except queue.Full:
+                    pass
+
+
+def serve_event_stream(handler, broadcaster, status, latest_sample=None, keepalive=15.0):
+    """Hold a /stream request open and write events until the client leaves"""
+    client = broadcaster.subscribe()
+    try:
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream')
+        handler.send_header('Cache-Control', 'no-cache')
+        handler.send_header('Connection', 'keep-alive')
+        handler.send_header('Access-Control-Allow-Origin', '*')
+        handler.end_headers()
+
+        # Send current state first so the dashboard can render immediately
+        handler.wfile.write(format_event('status', status))
+        if latest_sample:
+            handler.wfile.write(format_encoded_event('sample', latest_sample.to_json()))
+        handler.wfile.flush()
+
+        while True:
+            try:
+                message = client.get(timeout=keepalive)
+            except queue.Empty:
+                # Comment line keeps proxies and idle sockets from timing out
+                message = b": keepalive\n\n"
+            handler.wfile.write(message)
+            handler.wfile.flush()
+    except OSError:
+        pass  # Client disconnected, or stalled past the socket write timeout
+    finally:
+        broadcaster.unsubscribe(client)
+        handler.close_connection = True
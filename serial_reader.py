@@ -0,0 +1,125 @@
+"""
+Serial Reader - bulk reads from the Pico's USB serial port
+Instead of one readline() per sample, each poll drains everything already in
+the OS buffer (in_waiting) with a single read and splits complete lines or
+binary frames out of a reusable bytearray. Partial lines and frames carry
+over to the next poll. Throughput is tracked so /status can show when the
+host falls behind the Pico.
+"""
+
+import time
+
+from pico_protocol import MAX_LINE_LENGTH
+
+# Upper bound for one read() so a huge backlog is processed in slices
+MAX_READ_SIZE = 65536
+
+# Bytes found waiting in the OS buffer at one poll that mean we're not keeping up
+BACKLOG_WARNING_BYTES = 4096
+
+STATS_WINDOW = 2.0  # [sec]
+
+
+class LineSplitter:
+    """Split a byte stream into stripped text lines, carrying partial lines over"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.overflows = 0
+
+    def feed(self, data):
+        self.buffer += data
+        if b'\n' not in data:
+            if len(self.buffer) > MAX_LINE_LENGTH:
+                self.buffer.clear()
+                self.overflows += 1
+            return []
+
+        *complete, rest = self.buffer.split(b'\n')
+        self.buffer[:] = rest if len(rest) <= MAX_LINE_LENGTH else b''
+        lines = []
+        for raw in complete:
+            line = raw.decode(errors='replace').strip()
+            if line:
+                lines.append(line)
+        return lines
+
+
+class SerialReader:
+    """Drain a serial connection in bulk and feed a LineSplitter or FrameDecoder"""
+
+    def __init__(self, connection, splitter):
+        self.connection = connection
+        self.splitter = splitter
+
+        # Lifetime totals
+        self.bytes_read = 0
+        self.lines_read = 0
+        self.frames_read = 0
+
+        # Rates over the last completed window
+        self.bytes_per_sec = 0.0
+        self.lines_per_sec = 0.0
+        self.frames_per_sec = 0.0
+        self.max_backlog = 0
+        self.windows = 0  # Completed stats windows, so callers can spot fresh numbers
+
+        self.window_start = time.time()
+        self.window_bytes = 0
+        self.window_lines = 0
+        self.window_frames = 0
+        self.window_backlog = 0
+
+    def poll(self):
+        """Read whatever is buffered and return complete items
+
+        Blocks for at most the port timeout when nothing is waiting.
+        Items are str lines, or Sample records when splitting binary frames.
+        """
+        waiting = self.connection.in_waiting
+        chunk = self.connection.read(min(waiting, MAX_READ_SIZE) if waiting else 1)
+        items = self.splitter.feed(chunk) if chunk else []
+
+        lines = sum(1 for item in items if isinstance(item, str))
+        self.window_bytes += len(chunk)
+        self.window_lines += lines
+        self.window_frames += len(items) - lines
+        # Bytes that had piled up since the last poll; a host keeping up sees
+        # about one loop's worth
+        self.window_backlog = max(self.window_backlog, waiting)
+
+        now = time.time()
+        if now - self.window_start >= STATS_WINDOW:
+            self.roll_window(now)
+        return items
+
+    def roll_window(self, now):
+        elapsed = now - self.window_start
+        self.bytes_per_sec = self.window_bytes / elapsed
+        self.lines_per_sec = self.window_lines / elapsed
+        self.frames_per_sec = self.window_frames / elapsed
+        self.max_backlog = self.window_backlog
+
+        self.bytes_read += self.window_bytes
+        self.lines_read += self.window_lines
+        self.frames_read += self.window_frames
+
+        if self.window_backlog > BACKLOG_WARNING_BYTES:
+            print(f"⚠️ Serial backlog {self.window_backlog} bytes - host is not keeping up with the Pico")
+
+        self.windows += 1
+        self.window_start = now
+        self.window_bytes = 0
+        self.window_lines = 0
+        self.window_frames = 0
+        self.window_backlog = 0
+
+    def stats(self):
+        """Throughput summary for /status"""
+        return {
+            "bytes_per_sec": round(self.bytes_per_sec, 1),
+            "lines_per_sec": round(self.lines_per_sec, 1),
+            "frames_per_sec": round(self.frames_per_sec, 1),
+            "max_backlog_bytes": self.max_backlog,
+            "bytes_read": self.bytes_read + self.window_bytes,
+        }
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """
 Simple HTTP Server for Wireless Control Project
-Serves the HTML interface on localhost to enable Web Bluetooth API
+Serves the HTML interface on localhost to enable Web Bluetooth API.
+Dashboard files are precompressed at startup (http_compression.py) and
+revalidated by ETag, so reloads over slow Wi-Fi are mostly 304s.
 """
 
 import http.server
@@ -10,11 +12,54 @@ import webbrowser
 import os
 import sys
 
+from http_compression import ENCODINGS, STATIC_CACHE_CONTROL, StaticAssetCache, choose_encoding
+
 # Configuration
 PORT = 8000
 HOST = "localhost"
 
 class CustomHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # Precompressed dashboard files, set up by start_server
+    assets = None
+
+    def do_GET(self):
+        if not self.send_asset():
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self.send_asset(include_body=False):
+            super().do_HEAD()
+
+    def send_asset(self, include_body=True):
+        """Serve a dashboard file from the cache; False to fall back to the plain handler"""
+        path = self.translate_path(self.path)
+        asset = self.assets.get(path) if self.assets else None
+        if asset is None:
+            return False
+
+        encoding = choose_encoding(self.headers.get('Accept-Encoding', ''), asset.encodings)
+        body, etag = asset.variant(encoding)
+        if etag in self.headers.get('If-None-Match', '').replace(' ', '').split(','):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', STATIC_CACHE_CONTROL)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return True
+
+        self.send_response(200)
+        self.send_header('Content-Type', asset.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', STATIC_CACHE_CONTROL)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+        return True
+
     def end_headers(self):
         # Add CORS headers to allow Bluetooth API
         self.send_header('Access-Control-Allow-Origin', '*')
@@ -28,8 +73,12 @@ def start_server():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(script_dir)
     
-    # Create the server
+    # Compress the dashboard files once, up front
     handler = CustomHTTPRequestHandler
+    handler.assets = StaticAssetCache(script_dir)
+    cached = handler.assets.warm()
+
+    # Create the server
     httpd = socketserver.TCPServer((HOST, PORT), handler)
     
     print("=" * 60)
@@ -37,6 +86,7 @@ def start_server():
     print("=" * 60)
     print(f"📍 Server Address: http://{HOST}:{PORT}")
     print(f"📁 Serving files from: {script_dir}")
+    print(f"🗜️  {cached} dashboard files precompressed ({', '.join(ENCODINGS)})")
     print("=" * 60)
     print("🌐 Opening browser automatically...")
     print("🔗 Manual URL: http://localhost:8000/index.html")
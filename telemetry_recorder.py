@@ -0,0 +1,247 @@
+"""
+Telemetry Recorder - keeps every Pico sample on disk for later analysis
+The bridge hands each parsed sample to record(); a writer thread drains them
+in batches so recording never slows the serial reader.
+
+Segments are append-only files in a recordings directory, rotated by size
+or age. Each one is a small fixed header followed by fixed-width
+little-endian records (int64/float64 columns), so a finished or still-open
+segment can be opened with numpy.memmap and every column read as an array
+without parsing:
+
+    from telemetry_recorder import load_segment
+    run = load_segment('recordings/telemetry-20261016-101500-000.tlm')
+    run['current_position'].mean()
+"""
+
+import collections
+import glob
+import math
+import os
+import struct
+import sys
+import threading
+import time
+
+from sample_record import SAMPLE_FIELDS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Only needed to read segments back
+
+SEGMENT_MAGIC = b'PICOTLM1'
+SEGMENT_VERSION = 1
+SEGMENT_SUFFIX = '.tlm'
+HEADER_SIZE = 256
+
+# Fixed header: magic, version, record size, column count, created-at,
+# then "name:code,..." column list padded with zeros to HEADER_SIZE
+HEADER_FORMAT = struct.Struct('<8sHHId')
+
+# (column, struct code) - 'q' is int64, 'd' is float64
+RECORD_COLUMNS = (
+    ('seq', 'q'),
+    ('received_at', 'd'),
+    ('timestamp', 'q'),
+) + tuple((field, 'd') for field in SAMPLE_FIELDS if field != 'timestamp')
+
+RECORD_FORMAT = struct.Struct('<' + ''.join(code for _, code in RECORD_COLUMNS))
+
+NUMPY_TYPES = {'q': '<i8', 'd': '<f8'}
+
+DEFAULT_DIRECTORY = 'recordings'
+MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+MAX_SEGMENT_SECONDS = 3600
+FLUSH_INTERVAL = 0.5        # [sec] how often the writer drains the queue
+MAX_PENDING = 100000        # Samples queued before new ones are dropped
+
+
+def pack_record(seq, received_at, sample):
+    """Pack one Sample into a fixed-width record (-1 / NaN mark missing fields)"""
+    timestamp = sample.timestamp
+    return RECORD_FORMAT.pack(
+        seq, received_at, -1 if timestamp is None else int(timestamp),
+        *(math.nan if value is None else value for value in sample[1:])
+    )
+
+
+def build_header(created_at):
+    columns = ','.join(f"{name}:{code}" for name, code in RECORD_COLUMNS).encode()
+    header = HEADER_FORMAT.pack(
+        SEGMENT_MAGIC, SEGMENT_VERSION, RECORD_FORMAT.size, len(RECORD_COLUMNS), created_at
+    ) + columns
+    if len(header) > HEADER_SIZE:
+        raise ValueError("Column list does not fit in the segment header")
+    return header.ljust(HEADER_SIZE, b'\0')
+
+
+class TelemetryRecorder:
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_segment_bytes=MAX_SEGMENT_BYTES,
+                 max_segment_seconds=MAX_SEGMENT_SECONDS):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+
+        # deque.append is atomic, so the serial thread never takes a lock here
+        self.pending = collections.deque()
+        self.running = False
+        self.writer_thread = None
+
+        self.segment_file = None
+        self.segment_path = None
+        self.segment_bytes = 0
+        self.segment_started = 0
+        self.segment_index = 0
+
+        self.records_written = 0
+        self.dropped_samples = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.running = True
+        self.writer_thread = threading.Thread(target=self.write_loop, daemon=True, name='recorder')
+        self.writer_thread.start()
+        print(f"💾 Recording telemetry to {os.path.abspath(self.directory)}")
+
+    def record(self, seq, received_at, sample):
+        """Queue a Sample for writing (called on the serial thread)"""
+        if len(self.pending) >= MAX_PENDING:
+            self.dropped_samples += 1
+            return
+        self.pending.append((seq, received_at, sample))
+
+    def write_loop(self):
+        while self.running:
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                self.write_pending()
+            except OSError as e:
+                print(f"❌ Recorder write error: {e}")
+        self.write_pending()
+        self.close_segment()
+
+    def write_pending(self):
+        """Pack everything queued so far and write it with one call"""
+        if not self.pending:
+            return
+        batch = bytearray()
+        count = 0
+        while self.pending:
+            seq, received_at, sample = self.pending.popleft()
+            batch += pack_record(seq, received_at, sample)
+            count += 1
+
+        if self.needs_rotation(len(batch)):
+            self.open_segment()
+        self.segment_file.write(batch)
+        self.segment_file.flush()
+        self.segment_bytes += len(batch)
+        self.records_written += count
+
+    def needs_rotation(self, incoming_bytes):
+        if self.segment_file is None:
+            return True
+        if self.segment_bytes + incoming_bytes > self.max_segment_bytes:
+            return True
+        return time.time() - self.segment_started > self.max_segment_seconds
+
+    def open_segment(self):
+        self.close_segment()
+        self.segment_started = time.time()
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.segment_started))
+        while self.segment_file is None:
+            self.segment_path = os.path.join(
+                self.directory, f"telemetry-{stamp}-{self.segment_index:03d}{SEGMENT_SUFFIX}"
+            )
+            self.segment_index += 1
+            try:
+                self.segment_file = open(self.segment_path, 'xb')
+            except FileExistsError:
+                continue  # Restarted within the same second - try the next index
+        self.segment_file.write(build_header(self.segment_started))
+        self.segment_bytes = HEADER_SIZE
+
+    def close_segment(self):
+        if self.segment_file:
+            self.segment_file.close()
+            self.segment_file = None
+
+    def stop(self):
+        """Write anything still queued and close the current segment"""
+        self.running = False
+        if self.writer_thread:
+            self.writer_thread.join(timeout=5)
+
+    def stats(self):
+        return {
+            "segment": self.segment_path,
+            "records_written": self.records_written,
+            "pending": len(self.pending),
+            "dropped": self.dropped_samples,
+        }
+
+
+def read_header(path):
+    """Parse a segment header into its layout description"""
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        raise ValueError(f"{path} is not a telemetry segment (header too short)")
+    magic, version, record_size, column_count, created_at = HEADER_FORMAT.unpack_from(header)
+    if magic != SEGMENT_MAGIC:
+        raise ValueError(f"{path} is not a telemetry segment")
+    columns = header[HEADER_FORMAT.size:].rstrip(b'\0').decode().split(',')
+    columns = tuple(tuple(column.split(':')) for column in columns)
+    if len(columns) != column_count:
+        raise ValueError(f"{path} has a corrupt column list")
+    return {
+        "version": version,
+        "record_size": record_size,
+        "columns": columns,
+        "created_at": created_at,
+    }
+
+
+def record_count(path, header=None):
+    """Whole records in a segment (a record cut short by a crash is ignored)"""
+    header = header or read_header(path)
+    return (os.path.getsize(path) - HEADER_SIZE) // header['record_size']
+
+
+def numpy_dtype(columns=RECORD_COLUMNS):
+    return np.dtype([(name, NUMPY_TYPES[code]) for name, code in columns])
+
+
+def load_segment(path):
+    """Memory-map a segment as a numpy structured array, one field per column"""
+    if np is None:
+        raise ImportError("numpy is required to load recorded telemetry (pip install numpy)")
+    header = read_header(path)
+    dtype = numpy_dtype(header['columns'])
+    count = record_count(path, header)
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+
+def list_segments(directory=DEFAULT_DIRECTORY):
+    """Segment paths in a recordings directory, oldest first"""
+    return sorted(glob.glob(os.path.join(directory, f"*{SEGMENT_SUFFIX}")))
+
+
+def main():
+    """Summarize the segments in a recordings directory"""
+    directory = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DIRECTORY
+    segments = list_segments(directory)
+    if not segments:
+        print(f"📂 No telemetry segments in {directory}")
+        return
+    for path in segments:
+        header = read_header(path)
+        created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(header['created_at']))
+        print(f"📼 {os.path.basename(path)}: {record_count(path, header)} samples, started {created}")
+
+
+if __name__ == "__main__":
+    main()
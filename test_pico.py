@@ -1,10 +1,12 @@
 import serial
+import sys
 import time
 
-# Simple test to see what's coming from the Pico
+# Simple test to see what's coming from the Pico (or pico_emulator.py's port)
+port = sys.argv[1] if len(sys.argv) > 1 else 'COM12'
 try:
-    print("Connecting to COM12...")
-    ser = serial.Serial('COM12', 115200, timeout=1)
+    print(f"Connecting to {port}...")
+    ser = serial.Serial(port, 115200, timeout=1)
     print("Connected! Listening for data...")
     
     for i in range(20):  # Listen for 20 lines
@@ -0,0 +1,101 @@
+"""
+Live Tuning - change Isabel's PID gains without reflashing the Pico
+Sends commands through the bridge's /ws WebSocket and reports how long each
+one took to reach the Pico (ACK) and to show up in the data (round trip).
+
+    python tune.py Kp=0.08 Kd=0.02
+    python tune.py --host 172.28.0.181 setpoint=20
+    python tune.py setpoint=pot       # back to the potentiometer
+"""
+
+import argparse
+import json
+import socket
+import time
+from urllib.parse import quote
+
+from bridge_server import DEFAULT_PORT
+from pico_protocol import COMMAND_NAMES
+from websocket_channel import connect
+
+
+def parse_assignment(text):
+    """'Kp=0.08' -> ('Kp', 0.08); 'setpoint=pot' keeps the string"""
+    name, separator, value = text.partition('=')
+    if not separator or name not in COMMAND_NAMES:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE with NAME one of {', '.join(COMMAND_NAMES)}")
+    if name == 'setpoint' and value == 'pot':
+        return name, value
+    try:
+        return name, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{name} needs a number, got '{value}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send live tuning commands to the Pico through the bridge")
+    parser.add_argument('assignments', nargs='+', type=parse_assignment, metavar='NAME=VALUE',
+                        help=f"one of {', '.join(COMMAND_NAMES)}")
+    parser.add_argument('--host', default='localhost', help="Computer A's address")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--device', help="Rig id when the bridge serves several Picos")
+    parser.add_argument('--timeout', type=float, default=3.0, help="Seconds to wait for results")
+    parser.add_argument('--token', help="The bridge's --command-token, if it was started with one")
+    args = parser.parse_args()
+
+    path = f"/devices/{args.device}/ws" if args.device else "/ws"
+    url = f"ws://{args.host}:{args.port}{path}"
+    if args.token:
+        url += f"?token={quote(args.token)}"
+    try:
+        ws = connect(url)
+    except (OSError, ConnectionError) as e:
+        print(f"❌ Cannot connect to {url}: {e}")
+        return
+
+    sent = {}
+    results = {}
+    for name, value in args.assignments:
+        ws.send_json({"type": "command", "name": name, "value": value})
+
+    waiting = len(args.assignments)
+    deadline = time.time() + args.timeout
+    try:
+        while waiting and time.time() < deadline:
+            message = ws.receive()
+            if message is None:
+                print("❌ Bridge closed the connection")
+                break
+            event = json.loads(message)
+            data = event.get("data") or {}
+
+            if event["type"] == "error":
+                print(f"❌ {data.get('name') or 'command'}: {data.get('message')}")
+                waiting -= 1
+                continue
+            if event["type"] == "command_sent":
+                sent[data["id"]] = data
+            elif event["type"] == "command":
+                # Results can overtake the command_sent reply, so match by id
+                results[data["id"]] = data
+
+            for command_id in [command_id for command_id in results if command_id in sent]:
+                result = results.pop(command_id)
+                del sent[command_id]
+                waiting -= 1
+                if result["error"]:
+                    print(f"❌ {result['name']}={result['value']}: {result['error']}")
+                else:
+                    print(f"✅ {result['name']}={result['value']}  ACK {result['ack_ms']} ms, "
+                          f"first new sample {result['round_trip_ms']} ms")
+    except socket.timeout:
+        pass
+    finally:
+        ws.close()
+
+    if waiting:
+        print(f"⚠️ {waiting} command(s) got no result within {args.timeout:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+UDP Ingest - any number of Wi-Fi Picos streaming datagrams to one port
+file3.py printed one datagram per blocking recvfrom(). UdpSource runs an
+asyncio DatagramProtocol on its ingest thread instead, and every wake-up
+drains all datagrams already queued on the socket (up to BATCH_LIMIT) as
+one batch, so a burst of Wi-Fi packets costs one pass of the event loop.
+
+Datagrams are tagged by the sender's IP address. The first Pico heard is
+served on the source's own channel (/data when it is the first source);
+every other Pico gets a channel of its own (/devices/udp-<ip>/...), fed
+from the same thread. That thread's CPU is reported once, by the source's
+channel; the other Picos' channels have none of their own to report.
+
+Datagram format, one or more lines:
+    SEQ:<n>         optional first line, counting up by one per datagram
+    DATA:{json}     a sample, exactly as on the serial port
+
+With SEQ: the bridge counts datagrams lost, late (reordered) and repeated,
+and drops late and repeated ones so /data and /history never step back; a
+big jump either way means the Pico restarted. Without it, only samples
+whose timestamp steps back are caught (and dropped).
+
+    python bridge_core.py --source udp:12345
+"""
+
+import asyncio
+import socket
+import time
+
+from bridge_metrics import TICKS_PERIOD
+from data_sources import DEFAULT_PICO_NETWORK_PORT, SILENCE_TIMEOUT, DataSource
+
+SEQUENCE_PREFIX = 'SEQ:'
+SEQUENCE_PERIOD = 1 << 32
+
+# A sequence jump bigger than this (either way) means the Pico restarted
+RESTART_GAP = 1000
+
+# Skipped sequence numbers remembered, to tell a late datagram from a repeat
+MISSING_WINDOW = 256
+
+# Without SEQ:, a timestamp stepping back less than this is a late sample
+REORDER_WINDOW = 1000000  # [us]
+
+# Most datagrams handled per wake-up before the event loop gets a turn
+BATCH_LIMIT = 256
+
+MAX_DATAGRAM = 4096  # [bytes]
+
+# Asked of the kernel so Wi-Fi bursts queue up instead of being dropped
+# (Linux caps it at net.core.rmem_max)
+RECEIVE_BUFFER = 1 << 20  # [bytes]
+
+# Silence checks and /status refreshes
+HOUSEKEEPING_INTERVAL = 1.0  # [sec]
+
+
+class SequenceTracker:
+    """Lost, late and repeated datagrams in one Pico's SEQ: numbers"""
+
+    def __init__(self):
+        self.expected = None
+        self.missing = {}  # Recently skipped numbers, oldest first
+        self.last_timestamp = None
+        self.lost = 0
+        self.reordered = 0
+        self.duplicates = 0
+        self.restarts = 0
+
+    def reset(self):
+        """Forget the sequence (the Pico restarted)"""
+        self.expected = None
+        self.missing.clear()
+        self.last_timestamp = None
+
+    def check(self, seq):
+        """True if the datagram should be published, False if late or repeated"""
+        expected = self.expected
+        if expected is None or seq == expected:
+            self.expected = (seq + 1) % SEQUENCE_PERIOD
+            return True
+
+        ahead = (seq - expected) % SEQUENCE_PERIOD
+        if ahead < RESTART_GAP:
+            # Gap: count the skipped ones lost until they turn up late
+            self.lost += ahead
+            missing = self.missing
+            for skipped in range(max(0, ahead - MISSING_WINDOW), ahead):
+                missing[(expected + skipped) % SEQUENCE_PERIOD] = True
+            while len(missing) > MISSING_WINDOW:
+                del missing[next(iter(missing))]
+            self.expected = (seq + 1) % SEQUENCE_PERIOD
+            return True
+
+        if (expected - seq) % SEQUENCE_PERIOD <= RESTART_GAP:
+            if self.missing.pop(seq, None):
+                self.lost -= 1
+                self.reordered += 1
+            else:
+                self.duplicates += 1
+            return False
+
+        self.restarts += 1
+        self.reset()
+        self.expected = (seq + 1) % SEQUENCE_PERIOD
+        return True
+
+    def check_timestamp(self, timestamp):
+        """check() for Picos that send no SEQ: - catches samples stepping back in time"""
+        last = self.last_timestamp
+        if timestamp is None:
+            return True
+        if last is not None:
+            behind = (last - timestamp) % TICKS_PERIOD
+            if behind == 0:
+                self.duplicates += 1
+                return False
+            if behind <= REORDER_WINDOW:
+                self.reordered += 1
+                return False
+        self.last_timestamp = timestamp
+        return True
+
+
+class UdpPeer(DataSource):
+    """One Pico heard by a UdpSource; its samples arrive on the listener's thread"""
+
+    kind = 'udp'
+    shared_thread = True
+
+    def __init__(self, host, port, name=None):
+        super().__init__(name or f"udp-{host}")
+        self.host = host
+        self.port = port
+        self.sequence = SequenceTracker()
+        self.sequenced = False
+        self.datagrams = 0
+        self.reported_datagrams = 0
+        self.last_seen = None
+
+    def run(self, channel):
+        """Nothing to do - UdpSource publishes for every peer"""
+
+    def receive(self, datagram, port, now):
+        """Check one datagram's sequence and publish its samples"""
+        self.datagrams += 1
+        self.last_seen = now
+        if port != self.port:
+            # New source port: the Pico rebooted or rejoined Wi-Fi
+            print(f"🔄 {self.name}: now sending from port {port}")
+            self.port = port
+            self.sequence.restarts += 1
+            self.sequence.reset()
+
+        lines = datagram.decode(errors='replace').splitlines()
+        seq = None
+        if lines and lines[0].startswith(SEQUENCE_PREFIX):
+            try:
+                seq = int(lines[0][len(SEQUENCE_PREFIX):])
+            except ValueError:
+                pass
+            lines = lines[1:]
+        if seq is not None:
+            self.sequenced = True
+            if not self.sequence.check(seq):
+                return
+
+        channel = self.channel
+        published = False
+        for line in lines:
+            line = line.strip()
+            sample = self.parse_line(line) if line else None
+            if sample is None:
+                continue
+            if seq is None and not self.sequence.check_timestamp(sample.timestamp):
+                continue
+            channel.publish_sample(sample)
+            published = True
+        if published:
+            channel.set_connected(True)
+
+    def link_stats(self):
+        """Datagram counts and loss for /status"""
+        sequence = self.sequence
+        expected = self.datagrams - sequence.duplicates - sequence.reordered + sequence.lost
+        return {
+            "sender": f"{self.host}:{self.port}",
+            "sequenced": self.sequenced,
+            "datagrams": self.datagrams,
+            "lost": sequence.lost,
+            "reordered": sequence.reordered,
+            "duplicates": sequence.duplicates,
+            "restarts": sequence.restarts,
+            "loss_percent": round(100.0 * sequence.lost / expected, 3) if expected else 0.0,
+        }
+
+    def status(self):
+        return {
+            "pico_connected": bool(self.channel and self.channel.connected),
+            "udp": self.link_stats(),
+        }
+
+    def collect_metrics(self):
+        sequence = self.sequence
+        return [
+            ('bridge_udp_datagrams_total', 'counter', "Datagrams received from this Pico", self.datagrams),
+            ('bridge_udp_lost_datagrams_total', 'counter', "Datagrams missing from the SEQ: numbers",
+             sequence.lost),
+            ('bridge_udp_reordered_datagrams_total', 'counter', "Datagrams that arrived after a newer one (dropped)",
+             sequence.reordered),
+            ('bridge_udp_duplicate_datagrams_total', 'counter', "Datagrams received twice (dropped)",
+             sequence.duplicates),
+            ('bridge_udp_restarts_total', 'counter', "Pico restarts seen in the sequence or source port",
+             sequence.restarts),
+        ]
+
+
+class TelemetryProtocol(asyncio.DatagramProtocol):
+    """Hands each datagram, with everything queued behind it, to UdpSource as one batch"""
+
+    def __init__(self, source):
+        self.source = source
+
+    def datagram_received(self, data, addr):
+        self.source.receive_batch(self.source.drain([(data, addr)]))
+
+    def error_received(self, exc):
+        print(f"⚠️ UDP receive error: {exc}")
+
+
+class UdpSource(DataSource):
+    """Receives DATA: lines from Wi-Fi Picos sending UDP datagrams"""
+
+    kind = 'udp'
+
+    def __init__(self, port=DEFAULT_PICO_NETWORK_PORT, host='', name=None):
+        super().__init__(name or 'udp')
+        self.host = host
+        self.port = port
+        self.sock = None
+        self.serving = False
+        self.receive_buffer = None
+        self.peers = {}  # Sender IP -> UdpPeer, replaced (not changed) when one is added
+
+        self.datagrams = 0
+        self.bytes = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+    def open(self):
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+            self.receive_buffer = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+            self.sock.bind((self.host, self.port))
+            self.sock.setblocking(False)
+            print(f"📡 Listening for UDP packets on port {self.port}...")
+            return True
+        except OSError as e:
+            print(f"❌ UDP listen failed: {e}")
+            return False
+
+    def run(self, channel):
+        """Ingest thread body: an asyncio event loop serving the socket until stopped"""
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(lambda: TelemetryProtocol(self), sock=self.sock)
+        self.serving = True
+        try:
+            while self.running:
+                await asyncio.sleep(HOUSEKEEPING_INTERVAL)
+                self.housekeeping(time.time())
+        finally:
+            self.serving = False
+            transport.close()
+
+    def drain(self, batch):
+        """Read whatever else is already queued on the socket, without blocking"""
+        recvfrom = self.sock.recvfrom
+        try:
+            while len(batch) < BATCH_LIMIT:
+                batch.append(recvfrom(MAX_DATAGRAM))
+        except OSError:
+            pass  # Nothing left (BlockingIOError); real errors reach error_received
+        return batch
+
+    def receive_batch(self, batch):
+        now = time.time()
+        self.batches += 1
+        self.datagrams += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for datagram, address in batch:
+            self.bytes += len(datagram)
+            peer = self.peers.get(address[0]) or self.add_peer(address[0], address[1])
+            peer.receive(datagram, address[1], now)
+
+    def add_peer(self, host, port):
+        """A new Pico: the first shares this source's channel, others get their own"""
+        peer = UdpPeer(host, port)
+        peer.running = True
+        if self.peers and self.add_channel:
+            self.add_channel(peer)
+        else:
+            peer.channel = self.channel
+        self.peers = {**self.peers, host: peer}
+        print(f"📡 Pico at {host}:{port} -> {peer.channel.id}")
+        return peer
+
+    def housekeeping(self, now):
+        """Mark silent Picos disconnected and publish fresh loss numbers"""
+        self.channel.sample_cpu(now)  # Whichever Picos are sending
+        for peer in self.peers.values():
+            channel = peer.channel
+            if channel.connected and now - peer.last_seen > SILENCE_TIMEOUT:
+                print(f"❌ No data from {peer.host} for {SILENCE_TIMEOUT:.0f}s")
+                channel.set_connected(False)
+            elif peer.datagrams != peer.reported_datagrams:
+                peer.reported_datagrams = peer.datagrams
+                channel.refresh_status()
+
+    def close(self):
+        # A serving event loop closes the socket itself once running is cleared
+        if self.sock and not self.serving:
+            self.sock.close()
+
+    def listener_stats(self):
+        return {
+            "port": self.port,
+            "senders": len(self.peers),
+            "datagrams": self.datagrams,
+            "bytes": self.bytes,
+            "batches": self.batches,
+            "average_batch": round(self.datagrams / self.batches, 2) if self.batches else None,
+            "largest_batch": self.largest_batch,
+            "receive_buffer": self.receive_buffer,
+        }
+
+    def status(self):
+        primary = next(iter(self.peers.values()), None)
+        status = primary.status() if primary else {"pico_connected": False}
+        status["udp_port"] = self.port
+        status["udp_listener"] = self.listener_stats()
+        return status
+
+    def collect_metrics(self):
+        primary = next(iter(self.peers.values()), None)
+        metrics = primary.collect_metrics() if primary else []
+        return metrics + [
+            ('bridge_udp_listener_datagrams_total', 'counter', "Datagrams received on the UDP port", self.datagrams),
+            ('bridge_udp_listener_bytes_total', 'counter', "Bytes received on the UDP port", self.bytes),
+            ('bridge_udp_batches_total', 'counter', "Wake-ups that drained the UDP socket", self.batches),
+            ('bridge_udp_senders', 'gauge', "Picos heard on the UDP port", len(self.peers)),
+        ]
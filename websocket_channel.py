@@ -0,0 +1,281 @@
+"""
+WebSocket Channel - two-way /ws connection for live tuning
+Telemetry goes down the socket as JSON text messages (the same sample and
+status events /stream sends) and tuning commands come up:
+
+    -> {"type": "command", "name": "Kp", "value": 0.08}
+    <- {"type": "command_sent", "data": {"id": 7, "name": "Kp", "value": 0.08}}
+    <- {"type": "command", "data": {"id": 7, ..., "ack_ms": 4.1, "round_trip_ms": 13.8, "error": null}}
+    <- {"type": "sample", "data": {...}}
+
+round_trip_ms is measured from writing the command to the serial port until
+the first sample Isabel computed with the new value arrives. Only the
+RFC 6455 subset browsers use is implemented (no extensions or subprotocols).
+
+Commands move the real servo, so not every client may send them. Browsers
+always send an Origin header, which stops any page on any site from driving
+the rig: only origins on the bridge's allowlist may command. Scripts such as
+tune.py send no Origin and are allowed, unless the bridge was started with
+a command token - then every client needs /ws?token=<token>. Telemetry is
+sent to every client either way, as on /stream.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import queue
+import socket
+import struct
+import threading
+from urllib.parse import urlsplit
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+MAX_MESSAGE_SIZE = 65536
+KEEPALIVE_SECONDS = 15.0
+
+
+def accept_key(key):
+    """Sec-WebSocket-Accept value for a client's Sec-WebSocket-Key"""
+    return base64.b64encode(hashlib.sha1(key.encode() + WEBSOCKET_GUID).digest()).decode()
+
+
+def encode_frame(opcode, payload, mask=False):
+    """Encode one final frame (clients must mask, servers must not)"""
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 65536:
+        header.append(mask_bit | 126)
+        header += struct.pack('>H', length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack('>Q', length)
+    if not mask:
+        return bytes(header) + payload
+    key = os.urandom(4)
+    return bytes(header) + key + apply_mask(payload, key)
+
+
+def apply_mask(payload, key):
+    # XOR with the 4-byte key repeated, done as one big-integer operation
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    masked = int.from_bytes(payload, 'big') ^ int.from_bytes(repeated, 'big')
+    return masked.to_bytes(len(payload), 'big')
+
+
+def read_exact(rfile, size):
+    data = rfile.read(size)
+    if len(data) < size:
+        raise ConnectionError("WebSocket closed mid-frame")
+    return data
+
+
+def read_frame(rfile):
+    """Read one frame; returns (fin, opcode, payload)"""
+    first, second = read_exact(rfile, 2)
+    fin = bool(first & 0x80)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack('>H', read_exact(rfile, 2))
+    elif length == 127:
+        length, = struct.unpack('>Q', read_exact(rfile, 8))
+    if length > MAX_MESSAGE_SIZE:
+        raise ValueError("WebSocket message too large")
+    key = read_exact(rfile, 4) if second & 0x80 else None
+    payload = read_exact(rfile, length)
+    if key:
+        payload = apply_mask(payload, key)
+    return fin, opcode, payload
+
+
+def command_refusal(headers, query, allowed_origins=(), token=None):
+    """None if this client may send tuning commands, otherwise why not"""
+    if token:
+        if hmac.compare_digest(query.get('token', '').encode(), token.encode()):
+            return None
+        return "Commands need the bridge's token (/ws?token=...)"
+    origin = headers.get('Origin')
+    if origin is None or origin.rstrip('/').lower() in allowed_origins:
+        return None
+    return f"Commands are not allowed from {origin}"
+
+
+def format_ws_event(event, body):
+    """Broadcaster encoder: wrap an already serialized body as a text frame"""
+    return encode_frame(OP_TEXT, b'{"type": "' + event.encode() + b'", "data": ' + body + b'}')
+
+
+class WebSocketConnection:
+    """Frame-level reads and thread-safe writes on an upgraded connection"""
+
+    def __init__(self, rfile, wfile, mask=False):
+        self.rfile = rfile
+        self.wfile = wfile
+        self.mask = mask
+        self.write_lock = threading.Lock()
+        self.closed = False
+
+    def send_raw(self, frame):
+        with self.write_lock:
+            self.wfile.write(frame)
+            self.wfile.flush()
+
+    def send_frame(self, opcode, payload=b''):
+        self.send_raw(encode_frame(opcode, payload, self.mask))
+
+    def send_json(self, message):
+        self.send_frame(OP_TEXT, json.dumps(message).encode())
+
+    def receive(self):
+        """Next complete text/binary message, or None once the peer closes"""
+        fragments = []
+        while True:
+            fin, opcode, payload = read_frame(self.rfile)
+            if opcode == OP_PING:
+                self.send_frame(OP_PONG, payload)
+            elif opcode == OP_PONG:
+                pass
+            elif opcode == OP_CLOSE:
+                if not self.closed:
+                    self.closed = True
+                    self.send_frame(OP_CLOSE, payload[:2])
+                return None
+            else:
+                fragments.append(payload)
+                if sum(len(fragment) for fragment in fragments) > MAX_MESSAGE_SIZE:
+                    raise ValueError("WebSocket message too large")
+                if fin:
+                    return b''.join(fragments)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self.send_frame(OP_CLOSE, struct.pack('>H', 1000))
+            except OSError:
+                pass
+
+
+def handle_message(ws, channel, message, refusal=None):
+    """Apply one message from a /ws client"""
+    try:
+        request = json.loads(message)
+    except ValueError:
+        ws.send_json({"type": "error", "data": {"message": "Messages must be JSON"}})
+        return
+
+    if not isinstance(request, dict) or request.get("type") != "command":
+        ws.send_json({"type": "error", "data": {"message": "Unknown message type"}})
+        return
+
+    if refusal:
+        ws.send_json({"type": "error", "data": {"message": refusal, "name": request.get("name")}})
+        return
+
+    try:
+        command = channel.source.send_command(request.get("name"), request.get("value"))
+    except (ValueError, TypeError, ConnectionError, OSError) as e:
+        ws.send_json({"type": "error", "data": {"message": str(e), "name": request.get("name")}})
+        return
+    ws.send_json({"type": "command_sent", "data": {key: command[key] for key in ("id", "name", "value")}})
+
+
+def serve_websocket(handler, channel, refusal=None, keepalive=KEEPALIVE_SECONDS):
+    """Upgrade a /ws request and run it until the client leaves
+
+    refusal (from command_refusal) makes the connection telemetry-only.
+    """
+    key = handler.headers.get('Sec-WebSocket-Key')
+    if 'websocket' not in handler.headers.get('Upgrade', '').lower() or not key:
+        handler.send_error(400, "Expected a WebSocket upgrade")
+        return
+
+    handler.send_response(101, "Switching Protocols")
+    handler.send_header('Upgrade', 'websocket')
+    handler.send_header('Connection', 'Upgrade')
+    handler.send_header('Sec-WebSocket-Accept', accept_key(key))
+    handler.end_headers()
+    handler.wfile.flush()
+    handler.close_connection = True
+
+    # Idle sockets are kept alive with pings instead of timing out
+    handler.connection.settimeout(None)
+    ws = WebSocketConnection(handler.rfile, handler.wfile)
+    client = channel.stream.subscribe(format_ws_event)
+
+    def write_loop():
+        try:
+            while not ws.closed:
+                try:
+                    message = client.get(timeout=keepalive)
+                except queue.Empty:
+                    ws.send_frame(OP_PING)
+                    continue
+                ws.send_raw(message)
+        except OSError:
+            pass  # Client disconnected; the read loop will notice too
+
+    try:
+        # Current state first so the client can render immediately
+        ws.send_json({"type": "status", "data": channel.get_status()})
+        latest = channel.get_latest_data()
+        if latest:
+            ws.send_raw(format_ws_event('sample', latest.to_json()))
+
+        writer = threading.Thread(target=write_loop, daemon=True, name='ws-writer')
+        writer.start()
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+            handle_message(ws, channel, message, refusal)
+    except (OSError, ConnectionError, ValueError):
+        pass  # Disconnected or sent something we won't parse
+    finally:
+        channel.stream.unsubscribe(client)
+        ws.close()
+
+
+def connect(url, timeout=5.0):
+    """Open a client connection (used by tune.py); returns a WebSocketConnection"""
+    parts = urlsplit(url)
+    sock = socket.create_connection((parts.hostname, parts.port or 80), timeout=timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    key = base64.b64encode(os.urandom(16)).decode()
+    target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+    request = (
+        f"GET {target} HTTP/1.1\r\n"
+        f"Host: {parts.netloc}\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\n"
+        "Sec-WebSocket-Version: 13\r\n\r\n"
+    )
+    sock.sendall(request.encode())
+
+    rfile = sock.makefile('rb')
+    status_line = rfile.readline().decode(errors='replace')
+    headers = {}
+    while True:
+        line = rfile.readline().decode(errors='replace').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if ' 101 ' not in status_line or headers.get('sec-websocket-accept') != accept_key(key):
+        sock.close()
+        raise ConnectionError(f"WebSocket upgrade refused: {status_line.strip()}")
+    return WebSocketConnection(rfile, sock.makefile('wb'), mask=True)